@@ -16,6 +16,21 @@ class DBItemType(Enum):
     TABLE = "table"
 
 
+class SearchMode(Enum):
+    CONTAINS = "Contains"
+    FULL_TEXT = "Full Text"
+    SIMILAR = "Similar"
+
+
+class ScriptMode(Enum):
+    # Commit after every statement, earlier statements stay if one fails
+    PER_STATEMENT = "Commit Each Statement"
+    # One transaction, nothing is kept if a statement fails
+    TRANSACTION = "Single Transaction"
+    # Consecutive statements without results are sent as one query string
+    BATCHED = "Batched"
+
+
 # Database Elements
 class DBType(Enum):
     SQLITE = "sqlite"
@@ -55,6 +70,8 @@ class ConnectionConfig:
     password: Optional[str] = None
     openai_url: str = "http://localhost:11434"
     limit: int = 1000
+    cache_mb: int = 256
+    cache_ttl: float = 300.0
 
 
 @dataclass
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import List, Tuple, Union, Dict, Any
 from data_types import Field
 from pathlib import Path
+import polars as pl
 
 
 class AbstractDatabaseManager(ABC):
@@ -65,6 +66,21 @@ class AbstractDatabaseManager(ABC):
     ) -> Union[str, Tuple[List[str], List[Tuple[Any, ...]]]]:
         pass
 
+    def fetch_frame(
+        self, dbname: str, query: str, params: Tuple[Any, ...] | None = None
+    ) -> Union[str, pl.DataFrame]:
+        raise NotImplementedError("This method is not implemented")
+
+    def get_table_frame(
+        self,
+        dbname: str,
+        table_name: str,
+        limit: int = 1000,
+        random: bool = False,
+        columns: List[str] | None = None,
+    ) -> Tuple[pl.DataFrame, bool]:
+        raise NotImplementedError("This method is not implemented")
+
     @abstractmethod
     def get_tables_and_fields_and_types(self, dbname: str) -> Dict[str, List[Field]]:
         pass
@@ -73,6 +89,14 @@ class AbstractDatabaseManager(ABC):
     def get_tables_and_fields(self, dbname: str) -> Dict[str, List[str]]:
         pass
 
+    @abstractmethod
+    def get_table_fields(self, dbname: str, table_name: str) -> List[Field]:
+        pass
+
+    @abstractmethod
+    def get_column_types(self, dbname: str, table_name: str) -> List[Field]:
+        pass
+
     @abstractmethod
     def get_fields(self, dbname: str, table_name: str) -> Dict[str, list[str]]:
         pass
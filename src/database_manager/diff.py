@@ -0,0 +1,123 @@
+"""
+Build the queries run by the table diff.
+
+Rows are placed in buckets by a prefix of the md5 of their key, so both sides
+agree on the buckets whatever the key's type or distribution. Each bucket is
+summarised on the server by its row count and a sum of row hashes, and only
+buckets whose summaries differ are split further by a longer prefix.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from sql_text import name_parts
+
+DiffQuery = Tuple[str, Tuple[Any, ...]]
+
+# Hex digits added to the bucket prefix at each level, 256 times the buckets
+PREFIX_STEP = 2
+# An md5 has this many hex digits
+MAX_PREFIX_LENGTH = 32
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_table(name: str) -> str:
+    """
+    A table name, optionally schema qualified, with each part quoted. Parts
+    already quoted are kept as written, others keep their case.
+    """
+    return ".".join(
+        part if part.startswith('"') else quote_identifier(part)
+        for part in name_parts(name)
+    )
+
+
+def source_expression(table: str | None = None, query: str | None = None) -> str:
+    """
+    The FROM item a side is read from, aliased as t. A query's `%` are
+    escaped as the diff queries take parameters.
+    """
+    if query is not None:
+        return f"({query.strip().rstrip(';').replace('%', '%%')}) AS t"
+    assert table is not None, "A table or a query is required"
+    return f"{quote_table(table)} AS t"
+
+
+def key_expression(key_columns: List[str]) -> str:
+    """
+    The text of a row's key, the same on both sides if the key columns have
+    the same types
+    """
+    columns = ", ".join(f"t.{quote_identifier(c)}" for c in key_columns)
+    return f"ROW({columns})::text"
+
+
+def _bucket(key_columns: List[str], prefix_length: int) -> str:
+    return f"left(md5({key_expression(key_columns)}), {int(prefix_length)})"
+
+
+def _prefix_filter(
+    key_columns: List[str], prefixes: List[str] | None
+) -> Tuple[str, Tuple[Any, ...]]:
+    if prefixes is None:
+        return "", ()
+    by_length: Dict[int, List[str]] = {}
+    for prefix in prefixes:
+        by_length.setdefault(len(prefix), []).append(prefix)
+    conditions = " OR ".join(
+        f"{_bucket(key_columns, length)} = ANY(%s)" for length in by_length
+    )
+    return f"WHERE {conditions}", tuple(by_length.values())
+
+
+def bucket_query(
+    source: str,
+    key_columns: List[str],
+    prefix_length: int,
+    prefixes: List[str] | None = None,
+) -> DiffQuery:
+    """
+    The row count and checksum of each bucket, limited to the buckets inside
+    `prefixes` if given.
+
+    The checksum adds up the first 64 bits of each row's md5, so it doesn't
+    depend on the order rows are read in.
+    """
+    where, params = _prefix_filter(key_columns, prefixes)
+    return (
+        f"""
+        SELECT {_bucket(key_columns, prefix_length)} AS bucket,
+            count(*),
+            sum(('x' || left(md5(t::text), 16))::bit(64)::bigint)
+        FROM {source}
+        {where}
+        GROUP BY 1
+        """,
+        params,
+    )
+
+
+def row_hash_query(
+    source: str, key_columns: List[str], prefixes: List[str]
+) -> DiffQuery:
+    """
+    The md5 of the key, the key and the md5 of each row in the buckets, which
+    may have prefixes of different lengths. Rows are ordered by the md5 of
+    their key, then the key, byte by byte so both sides can be merged as they
+    are read.
+    """
+    where, params = _prefix_filter(key_columns, prefixes)
+    return (
+        f"""
+        SELECT md5(key) AS key_hash, key, row_hash
+        FROM (
+            SELECT {key_expression(key_columns)} AS key, md5(t::text) AS row_hash
+            FROM {source}
+            {where}
+        ) AS hashed
+        ORDER BY key_hash COLLATE "C", key COLLATE "C"
+        """,
+        params,
+    )
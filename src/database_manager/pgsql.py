@@ -2,6 +2,13 @@ import psycopg2
 import io
 import json
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from decimal import Decimal
+from uuid import uuid4
 from sqlalchemy import (
     create_engine,
     Table,
@@ -9,12 +16,11 @@ from sqlalchemy import (
     MetaData,
     String,
     Integer,
-    text,
-    inspect,
 )
 from sqlalchemy.exc import IntegrityError, ProgrammingError
 import traceback
 import polars as pl
+import pyarrow.parquet as pq
 from pathlib import Path
 from warning_types import (
     DatabaseWarning,
@@ -24,12 +30,420 @@ from warning_types import (
     issue_warning,
     unable_to_connect_to_database,
 )
-from psycopg2.extensions import connection as PsycopgConnection
-from typing import Optional, List, Tuple, Union, Dict, Any
-from data_types import Field
+from psycopg2.extensions import (
+    connection as PsycopgConnection,
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_INERROR,
+    TRANSACTION_STATUS_INTRANS,
+    TRANSACTION_STATUS_UNKNOWN,
+)
+from typing import Optional, List, Tuple, Union, Dict, Any, Callable, Iterator
+from urllib.parse import quote
+from data_types import Field, ScriptMode
+from sql_text import is_query, returns_rows
 from database_manager.abstract import AbstractDatabaseManager
 
 
+def unique_column_names(columns: List[str]) -> List[str]:
+    """
+    Suffix duplicated column names (e.g. `id` from a join) so they can be used
+    as DataFrame column names
+    """
+    seen: Dict[str, int] = {}
+    names = []
+    for col in columns:
+        if col in seen:
+            seen[col] += 1
+            names.append(f"{col}_{seen[col]}")
+        else:
+            seen[col] = 0
+            names.append(col)
+    return names
+
+
+def rows_to_frame(columns: List[str], rows: List[Tuple[Any, ...]]) -> pl.DataFrame:
+    """
+    Build a DataFrame from the tuples returned by a psycopg2 cursor
+    """
+    return pl.DataFrame(
+        rows,
+        schema=unique_column_names(columns),
+        orient="row",
+        strict=False,
+        infer_schema_length=None,
+    )
+
+
+# connectorx reports errors from the server (as opposed to decoding ones)
+# with the message of tokio-postgres, which starts with this
+CONNECTORX_SERVER_ERROR = "db error"
+
+# Rows in the first batch of a streamed query, small so rows show quickly.
+# Each later batch is twice the size, up to `STREAM_BATCH_ROWS`
+FIRST_BATCH_ROWS = 200
+STREAM_BATCH_ROWS = 20_000
+
+# The polars type of the Python values psycopg2 returns for each type OID,
+# so every batch of a streamed query has the same schema
+OID_DTYPES: Dict[int, pl.DataType] = {
+    16: pl.Boolean(),  # bool
+    17: pl.Binary(),  # bytea
+    18: pl.String(),  # char
+    19: pl.String(),  # name
+    20: pl.Int64(),  # int8
+    21: pl.Int16(),  # int2
+    23: pl.Int32(),  # int4
+    25: pl.String(),  # text
+    26: pl.Int64(),  # oid
+    114: pl.String(),  # json
+    700: pl.Float32(),  # float4
+    701: pl.Float64(),  # float8
+    1042: pl.String(),  # bpchar
+    1043: pl.String(),  # varchar
+    1082: pl.Date(),  # date
+    1083: pl.Time(),  # time
+    1114: pl.Datetime("us"),  # timestamp
+    1184: pl.Datetime("us", "UTC"),  # timestamptz
+    1186: pl.Duration("us"),  # interval
+    2950: pl.String(),  # uuid
+    3802: pl.String(),  # jsonb
+}
+NUMERIC_OID = 1700
+# The widest numeric polars holds as a decimal
+MAX_DECIMAL_PRECISION = 38
+
+# Values psycopg2 returns as Python objects polars can't hold as the type above
+OID_CONVERTERS: Dict[int, Callable[[Any], Any]] = {
+    17: bytes,  # memoryview
+    114: json.dumps,
+    3802: json.dumps,
+}
+
+
+def column_dtype(
+    type_code: int, precision: int | None, scale: int | None
+) -> pl.DataType:
+    """
+    The polars type of a result column, from `cursor.description`. Types
+    without one (arrays, ranges, enums...) are shown as text.
+    """
+    if type_code == NUMERIC_OID:
+        if precision is not None and scale is not None:
+            # Postgres also allows a negative scale, or one above the precision
+            if 0 <= scale <= precision <= MAX_DECIMAL_PRECISION:
+                return pl.Decimal(precision, scale)
+        # Unconstrained (e.g. sum(bigint)), or wider than a polars decimal.
+        # Shown as text, as a float would round it.
+        return pl.String()
+    return OID_DTYPES.get(type_code, pl.String())
+
+
+def _finite_decimal(value: Decimal) -> Decimal | None:
+    # Any numeric can hold NaN, which a polars decimal can't (it panics)
+    return value if value.is_finite() else None
+
+
+def _decimal_text(value: Decimal) -> str:
+    # Without an exponent, e.g. 0.0000001 rather than 1E-7
+    return format(value, "f")
+
+
+def column_converter(dtype: pl.DataType, type_code: int) -> Callable[[Any], Any] | None:
+    """
+    Applied to each non null value of a result column before it is put in
+    a column of `dtype`, None to keep the values psycopg2 returns
+    """
+    if type_code == NUMERIC_OID:
+        return _finite_decimal if isinstance(dtype, pl.Decimal) else _decimal_text
+    if converter := OID_CONVERTERS.get(type_code):
+        return converter
+    return None if type_code in OID_DTYPES else str
+
+
+@dataclass
+class ResultSchema:
+    """
+    The fixed schema streamed batches are built with
+    """
+
+    names: List[str]
+    dtypes: List[pl.DataType]
+    # Applied to each non null value of the column first, None to keep it
+    converters: List[Callable[[Any], Any] | None]
+
+    @classmethod
+    def from_description(cls, description: Any) -> "ResultSchema":
+        names = unique_column_names([c.name for c in description])
+        dtypes = [column_dtype(c.type_code, c.precision, c.scale) for c in description]
+        converters = [
+            column_converter(dtype, c.type_code)
+            for dtype, c in zip(dtypes, description)
+        ]
+        return cls(names, dtypes, converters)
+
+    def frame(self, rows: List[Tuple[Any, ...]]) -> pl.DataFrame:
+        """
+        A batch of rows as a DataFrame. A column with a value that doesn't
+        fit its type is shown as text, from this batch on, with a warning.
+        """
+        columns = list(zip(*rows)) if rows else [()] * len(self.names)
+        series = []
+        for i, values in enumerate(columns):
+            name, dtype, convert = self.names[i], self.dtypes[i], self.converters[i]
+            if convert is not None:
+                values = [None if v is None else convert(v) for v in values]
+            try:
+                series.append(pl.Series(name, values, dtype=dtype, strict=True))
+            except (TypeError, ValueError, OverflowError, pl.exceptions.PolarsError):
+                issue_warning(
+                    f"Column '{name}' has values that don't fit {dtype}, "
+                    "showing it as text",
+                    QueryWarning,
+                )
+                self.dtypes[i], self.converters[i] = pl.String(), str
+                values = [None if v is None else str(v) for v in values]
+                series.append(pl.Series(name, values, dtype=pl.String()))
+        return pl.DataFrame(series)
+
+
+@dataclass
+class StatementResult:
+    """
+    The outcome of one statement of a script, or one batch of statements
+    (see `ScriptMode.BATCHED`)
+    """
+
+    statement: str
+    # Seconds, including the round trip
+    duration: float
+    # Rows returned or affected, -1 if not known
+    rows: int
+    frame: pl.DataFrame | None = None
+    notices: List[str] = field(default_factory=list)
+    error: str | None = None
+
+
+class ResultCursor:
+    """
+    A query's rows read a batch at a time from a named cursor that stays
+    open between fetches, so the query runs once however many pages are
+    read, and no page repeats or skips rows of another.
+
+    The cursor is declared by the first fetch, in a transaction on its
+    manager's connection. Nothing else may use that connection until the
+    cursor is closed (connecting again rolls the transaction back), and the
+    cursor should be closed when done as it holds the query's snapshot.
+    """
+
+    def __init__(
+        self,
+        manager: "DatabaseManager",
+        dbname: str,
+        query: str,
+        params: Tuple[Any, ...] | None = None,
+        snapshot: str | None = None,
+    ) -> None:
+        """
+        Args:
+            snapshot: Read as of a snapshot exported by another transaction
+                with `pg_export_snapshot()`, which must stay open until the
+                cursor is done
+        """
+        self.manager = manager
+        self.dbname = dbname
+        self.query = query.strip().rstrip(";")
+        self.params = params
+        self.snapshot = snapshot
+        self._conn: PsycopgConnection | None = None
+        self._cursor: Any = None
+        self._schema: ResultSchema | None = None
+        # Rows fetched or skipped so far
+        self.position = 0
+        self.exhausted = False
+        self.closed = False
+
+    def _open(self) -> Any:
+        if self._cursor is not None:
+            return self._cursor
+        if self.closed:
+            raise psycopg2.InterfaceError("The cursor is closed")
+        manager = self.manager
+        if not manager.connect(self.dbname) or not (conn := manager.conn):
+            raise psycopg2.OperationalError("Unable to connect to the database")
+        self._conn = conn
+        manager._result_cursor = self
+        cursor = conn.cursor(name=f"rows_{uuid4().hex[:8]}")
+        # If declaring fails, `close` still ends the transaction
+        if self.snapshot is not None:
+            # Must be the first statements of the transaction
+            with conn.cursor() as setup:
+                setup.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                setup.execute("SET TRANSACTION SNAPSHOT %s", (self.snapshot,))
+        cursor.execute(self.query, self.params)
+        self._cursor = cursor
+        return cursor
+
+    def skip_to(self, position: int) -> None:
+        """
+        Move forward to a row without sending the rows before it, e.g. past
+        pages that were served from a cache
+        """
+        if position > self.position:
+            self._open().scroll(position - self.position)
+            self.position = position
+
+    def fetch(self, max_rows: int) -> pl.DataFrame:
+        """
+        The next `max_rows` rows (at least one), fewer once the result runs
+        out. Every batch has the same schema, see `ResultSchema`.
+
+        Raises:
+            psycopg2.Error: If the query fails or is cancelled
+        """
+        manager = self.manager
+        manager._cancelled = False
+        manager._query_running = True
+        try:
+            cursor = self._open()
+            rows = cursor.fetchmany(max_rows)
+        finally:
+            manager._query_running = False
+        if self._schema is None:
+            # Only known once the first rows are fetched
+            self._schema = ResultSchema.from_description(cursor.description)
+        self.position += len(rows)
+        self.exhausted = len(rows) < max_rows
+        return self._schema.frame(rows)
+
+    def stream(
+        self, max_rows: int | None = None, max_batch: int = STREAM_BATCH_ROWS
+    ) -> Iterator[pl.DataFrame]:
+        """
+        Fetch up to `max_rows` more rows (all of them if None), yielding them
+        in batches as they arrive. The first batch has `FIRST_BATCH_ROWS`
+        rows and each batch after it doubles, up to `max_batch`. A result
+        with no rows yields one empty batch.
+
+        The cursor is closed once the result runs out, if a fetch fails, or
+        if the iterator is closed early, otherwise it stays open for the
+        next call.
+
+        Raises:
+            psycopg2.Error: If the query fails or is cancelled
+        """
+        size = FIRST_BATCH_ROWS
+        remaining = max_rows
+        first = self._schema is None
+        try:
+            while not self.exhausted and remaining != 0:
+                if remaining is not None:
+                    size = min(size, remaining)
+                frame = self.fetch(size)
+                if frame.height or first:
+                    yield frame
+                first = False
+                if remaining is not None:
+                    remaining -= frame.height
+                size = min(size * 2, max_batch)
+        except BaseException:
+            # Including GeneratorExit, when a stream is stopped
+            self.close()
+            raise
+        if self.exhausted:
+            self.close()
+
+    def estimate_rows(self) -> int | None:
+        """
+        The planner's estimate of all the rows of the query, planned in the
+        cursor's transaction so the cursor stays open
+        """
+        self._open()
+        assert self._conn is not None
+        try:
+            with self._conn.cursor() as cur:
+                cur.execute(f"EXPLAIN (FORMAT JSON) {self.query}", self.params)
+                return plan_rows(cur.fetchone()[0])
+        except psycopg2.Error:
+            return None
+
+    def close(self) -> None:
+        """
+        Close the cursor and end its transaction, safe to call more than once
+        """
+        if self.closed:
+            return
+        self.closed = True
+        manager, conn = self.manager, self._conn
+        if conn is None or conn.closed or manager._result_cursor is not self:
+            # Never declared, or the connection has moved on and the
+            # transaction it was in is gone
+            return
+        manager._result_cursor = None
+        try:
+            if self._cursor is not None:
+                self._cursor.close()
+        except psycopg2.Error:
+            # The transaction was aborted, e.g. by a cancel
+            pass
+        if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+
+
+def plan_rows(plan: Any) -> int:
+    """
+    The rows at the top of an `EXPLAIN (FORMAT JSON)` plan
+    """
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+# Tables a database export writes at once, each on its own connection
+EXPORT_WORKERS = 4
+
+# Codecs offered for Parquet exports, "none" writes uncompressed pages
+PARQUET_COMPRESSIONS = ("zstd", "snappy", "lz4", "gzip", "none")
+
+
+@dataclass
+class ParquetExportOptions:
+    compression: str = "zstd"
+    # Rows in each row group, the unit readers can skip or read in parallel
+    row_group_rows: int = 128 * 1024
+    # Rows are written out before the buffered batches exceed this
+    memory_mb: int = 256
+
+
+@dataclass
+class ExportProgress:
+    rows: int
+    # In memory size of the rows read
+    size_bytes: int
+    # Seconds since the export started
+    elapsed: float
+
+
+def batch_statements(statements: List[str]) -> List[List[str]]:
+    """
+    Group consecutive statements that don't return rows, so each group can
+    be sent in one round trip. A statement with results is a group of its own,
+    as only the last result of a query string can be read.
+    """
+    batches: List[List[str]] = []
+    batch: List[str] = []
+    for statement in statements:
+        if returns_rows(statement):
+            if batch:
+                batches.append(batch)
+                batch = []
+            batches.append([statement])
+        else:
+            batch.append(statement)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
 class DatabaseManager(AbstractDatabaseManager):
     def __init__(
         self, host: str, port: int, username: str, password: str | None
@@ -41,11 +455,31 @@ class DatabaseManager(AbstractDatabaseManager):
         self.password = password
         self.conn: Optional[PsycopgConnection] = None
         self.current_database: str | None = None
+        # Identifies this manager's sessions in pg_stat_activity, see `cancel`
+        self.application_name = f"pg_browser-{uuid4().hex[:8]}"
+        self._query_running = False
+        self._arrow_query_running = False
+        self._cancelled = False
+        # The cursor whose transaction the connection is in, see `ResultCursor`
+        self._result_cursor: ResultCursor | None = None
+        # (database, table) -> fields, see `get_column_types`
+        self._field_cache: Dict[Tuple[str, str], List[Field]] = {}
+        # (database, table, column) -> values, see `get_common_values`
+        self._common_values_cache: Dict[Tuple[str, str, str], List[str]] = {}
 
     def get_connection_url(self) -> str:
         dbname = self.current_database
         return f"postgresql://{self.username}:{self.password}@{self.host}:{self.port}/{dbname}"
 
+    def _arrow_uri(self, dbname: str) -> str:
+        """
+        Connection URI for connectorx, credentials must be percent encoded
+        """
+        user = quote(self.username, safe="")
+        password = quote(self.password or "", safe="")
+        app = quote(self.application_name, safe="")
+        return f"postgresql://{user}:{password}@{self.host}:{self.port}/{dbname}?application_name={app}"
+
     def configure_connection(
         self, host: str, port: int, username: str, password: str
     ) -> None:
@@ -55,24 +489,97 @@ class DatabaseManager(AbstractDatabaseManager):
         self.password = password
         self.conn = None  # Reset the connection so it will be re-established with new parameters
 
+    def copy(self) -> "DatabaseManager":
+        """
+        A manager with the same credentials but its own connection,
+        for use on a worker thread
+        """
+        return DatabaseManager(self.host, self.port, self.username, self.password)
+
+    def same_server(self, other: "DatabaseManager") -> bool:
+        """
+        Whether both managers connect with the same settings
+        """
+        return (self.host, self.port, self.username, self.password) == (
+            other.host,
+            other.port,
+            other.username,
+            other.password,
+        )
+
     def connect(self, dbname: str = "postgres") -> bool:
+        # Reuse the open connection, reconnecting on every call dominated
+        # the time taken to move between tables
+        if (conn := self.conn) and not conn.closed and self.current_database == dbname:
+            try:
+                # Reads what the server sent without a round trip, so a
+                # connection it closed (e.g. on restart) is noticed here
+                # rather than by the next query
+                conn.poll()
+                status = conn.get_transaction_status()
+                if status in (TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_INERROR):
+                    # Don't hold the locks and snapshot of an earlier read
+                    conn.rollback()
+                    self._result_cursor = None
+                if not conn.closed and status != TRANSACTION_STATUS_UNKNOWN:
+                    return True
+            except psycopg2.Error:
+                # Dropped, reconnect below
+                pass
         try:
-            if self.conn:
+            if self.conn and not self.conn.closed:
                 self.conn.close()
-            self.conn = psycopg2.connect(
-                host=self.host,
-                port=self.port,
-                user=self.username,
-                password=self.password,
-                dbname=dbname,
-                sslmode="prefer",
-            )
+            self.conn = self._new_connection(dbname)
             self.current_database = dbname
+            self._result_cursor = None
             return True
         except psycopg2.Error as e:
             unable_to_connect_to_database(e)
             return False
 
+    def _new_connection(self, dbname: str) -> PsycopgConnection:
+        return psycopg2.connect(
+            host=self.host,
+            port=self.port,
+            user=self.username,
+            password=self.password,
+            dbname=dbname,
+            sslmode="prefer",
+            application_name=self.application_name,
+        )
+
+    def cancel(self) -> None:
+        """
+        Cancel the query this manager is running, safe to call from another
+        thread (e.g. the GUI thread while a worker runs the query)
+        """
+        self._cancelled = True
+        if self._query_running and (conn := self.conn):
+            try:
+                conn.cancel()
+            except psycopg2.Error as e:
+                issue_warning(f"Unable to cancel query: {e}", QueryWarning)
+        if self._arrow_query_running:
+            # connectorx opens its own connection, find it by application name
+            try:
+                cancel_conn = self._new_connection(self.current_database or "postgres")
+                try:
+                    with cancel_conn.cursor() as cur:
+                        cur.execute(
+                            """
+                            SELECT pg_cancel_backend(pid)
+                            FROM pg_stat_activity
+                            WHERE application_name = %s
+                            AND pid <> pg_backend_pid()
+                        """,
+                            (self.application_name,),
+                        )
+                    cancel_conn.commit()
+                finally:
+                    cancel_conn.close()
+            except psycopg2.Error as e:
+                issue_warning(f"Unable to cancel query: {e}", QueryWarning)
+
     def dump_schema(self) -> str:
         db_url = self.get_connection_url()
         engine = create_engine(db_url)
@@ -284,6 +791,35 @@ class DatabaseManager(AbstractDatabaseManager):
             issue_warning("Unable to get database connection", ConnectionWarning)
             return [], [], False
 
+    def get_table_frame(
+        self,
+        dbname: str,
+        table_name: str,
+        limit: int = 1000,
+        random: bool = False,
+        columns: List[str] | None = None,
+    ) -> Tuple[pl.DataFrame, bool]:
+        """
+        Columnar equivalent of `get_table_contents`.
+
+        A missing table makes the query fail, so there is no separate
+        existence check round trip.
+
+        Args:
+            columns: Only select these columns, all columns if None
+        """
+        projection = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+        order = " ORDER BY RANDOM()" if random else ""
+        result = self.fetch_frame(
+            dbname,
+            f'SELECT {projection} FROM "{table_name}"{order} LIMIT %s',
+            (limit,),
+        )
+        if isinstance(result, str):
+            issue_warning(f"Error fetching table contents: {result}", TableWarning)
+            return pl.DataFrame(), False
+        return result, True
+
     def get_column_names(self, table_name, cur) -> list[str]:
         # Get column names
         cur.execute(
@@ -307,6 +843,7 @@ class DatabaseManager(AbstractDatabaseManager):
 
         if conn := self.conn:
             try:
+                self._query_running = True
                 with conn.cursor() as cur:
                     cur.execute(query, params)
                     if cur.description:
@@ -321,10 +858,169 @@ class DatabaseManager(AbstractDatabaseManager):
             except psycopg2.Error as e:
                 self.conn.rollback()
                 return f"Error executing query: {str(e)}"
+            finally:
+                self._query_running = False
         else:
             issue_warning("Unable to get database connection", ConnectionWarning)
             return "Error: No database connection available."
 
+    def fetch_frame(
+        self, dbname: str, query: str, params: Tuple[Any, ...] | None = None
+    ) -> Union[str, pl.DataFrame]:
+        """
+        Run a query and return the result as a columnar DataFrame.
+
+        A single query (see `sql_text.is_query`) is streamed by connectorx
+        with `COPY (query) TO STDOUT WITH (FORMAT binary)` straight into
+        Arrow buffers, so no Python object is created per cell. Anything else
+        (DML, DDL, SHOW, multiple statements), a missing connectorx, or a result
+        connectorx can't decode falls back to `execute_custom_query`. An
+        error raised by the server is returned as is, the query is never run
+        twice.
+
+        Returns:
+            The DataFrame, or a message string like `execute_custom_query`
+        """
+        self._cancelled = False
+        if not self.connect(dbname):
+            issue_warning("Unable to get database connection", ConnectionWarning)
+            return "Error: Unable to connect to the database."
+
+        if is_query(query) and (conn := self.conn):
+            # connectorx does not take parameters, so bind them client side
+            # with the same escaping psycopg2 would use
+            sql = query.strip().rstrip(";")
+            if params:
+                with conn.cursor() as cur:
+                    sql = cur.mogrify(sql, params).decode(conn.encoding)
+            try:
+                self._arrow_query_running = True
+                return pl.read_database_uri(
+                    sql,
+                    self._arrow_uri(dbname),
+                    engine="connectorx",
+                    protocol="binary",
+                )
+            except ImportError:
+                pass
+            except Exception as e:
+                if self._cancelled:
+                    return "Error executing query: cancelled"
+                if CONNECTORX_SERVER_ERROR in str(e):
+                    # The server ran (and rejected) the query, running it
+                    # again would repeat any side effects, e.g. nextval()
+                    return f"Error executing query: {e}"
+                # e.g. a type connectorx can't decode, psycopg2 can handle it
+                issue_warning(f"Falling back to row fetch: {e}", QueryWarning)
+            finally:
+                self._arrow_query_running = False
+
+        result = self.execute_custom_query(dbname, query, params)
+        if isinstance(result, str):
+            return result
+        columns, rows = result
+        return rows_to_frame(columns, rows)
+
+    def stream_query(
+        self,
+        dbname: str,
+        query: str,
+        params: Tuple[Any, ...] | None = None,
+        max_batch: int = STREAM_BATCH_ROWS,
+        snapshot: str | None = None,
+    ) -> Iterator[pl.DataFrame]:
+        """
+        Run a query through a server side cursor, yielding its rows in
+        batches as they arrive rather than once the whole result is fetched,
+        see `ResultCursor.stream`. The query must be a single read only
+        statement, as it is wrapped in `DECLARE CURSOR`. Closing the iterator
+        early closes the cursor.
+
+        Args:
+            snapshot: See `ResultCursor`
+
+        Raises:
+            psycopg2.Error: If the query fails or is cancelled
+        """
+        self._cancelled = False
+        cursor = self.open_cursor(dbname, query, params, snapshot)
+        try:
+            yield from cursor.stream(max_batch=max_batch)
+        finally:
+            cursor.close()
+
+    def open_cursor(
+        self,
+        dbname: str,
+        query: str,
+        params: Tuple[Any, ...] | None = None,
+        snapshot: str | None = None,
+    ) -> ResultCursor:
+        """
+        A cursor to fetch a read only query's rows from a page at a time,
+        declared by its first fetch. This manager must not run anything else
+        until the cursor is closed.
+        """
+        return ResultCursor(self, dbname, query, params, snapshot)
+
+    def run_script(
+        self,
+        dbname: str,
+        statements: List[str],
+        mode: ScriptMode = ScriptMode.PER_STATEMENT,
+    ) -> Iterator[StatementResult]:
+        """
+        Run statements (e.g. from `sql_text.split_statements`) in order on
+        this manager's connection, yielding the timing, rows and notices of
+        each as it finishes. Stops at the first statement that fails.
+
+        See `ScriptMode` for when statements are committed. Except in a
+        single transaction, statements run in autocommit mode so those that
+        can't run inside a transaction block (VACUUM, CREATE INDEX
+        CONCURRENTLY, CREATE DATABASE...) work. Closing the iterator early
+        rolls back whatever is not committed.
+        """
+        if not self.connect(dbname) or not (conn := self.conn):
+            raise psycopg2.OperationalError("Unable to connect to the database")
+        if mode == ScriptMode.BATCHED:
+            batches = batch_statements(statements)
+        else:
+            batches = [[statement] for statement in statements]
+        try:
+            conn.autocommit = mode != ScriptMode.TRANSACTION
+            for batch in batches:
+                self._cancelled = False
+                sql = ";\n".join(batch)
+                result = StatementResult(sql, 0.0, -1)
+                del conn.notices[:]
+                started = time.perf_counter()
+                try:
+                    self._query_running = True
+                    with conn.cursor() as cur:
+                        cur.execute(sql)
+                        if cur.description:
+                            columns = [desc[0] for desc in cur.description]
+                            result.frame = rows_to_frame(columns, cur.fetchall())
+                        result.rows = cur.rowcount
+                except psycopg2.Error as e:
+                    if not conn.autocommit:
+                        conn.rollback()
+                    result.error = str(e).strip()
+                finally:
+                    self._query_running = False
+                result.duration = time.perf_counter() - started
+                result.notices = [notice.strip() for notice in conn.notices]
+                yield result
+                if result.error:
+                    return
+            if mode == ScriptMode.TRANSACTION:
+                conn.commit()
+        finally:
+            if not conn.closed:
+                if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                conn.autocommit = False
+
     # def get_tables(self, dbname: str) -> List[str]:
     #     """
     #     Get a list of tables in the specified database
@@ -403,46 +1099,435 @@ class DatabaseManager(AbstractDatabaseManager):
         }
         return tables_and_fields
 
-    # TODO this is inefficient, Only need to get the fields from the table
-    # TODO this should use the Database type from data_types.py
-    def get_fields(self, dbname: str, table_name: str) -> Dict[str, list[str]]:
-        tables_and_fields_and_types = self.get_tables_and_fields_and_types(dbname)
-        tables_and_fields = {
-            table: [field.name for field in fields]
-            for table, fields in tables_and_fields_and_types.items()
-            if table == table_name
-        }
-        return tables_and_fields
+    def get_table_fields(self, dbname: str, table_name: str) -> List[Field]:
+        """
+        The fields of a single table, in column order
+        """
+        if not self.connect(dbname):
+            return []
 
-    # TODO when this is called, must rebuild the tree
-    def export_table_to_parquet(self, dbname: str, table_name: str, path: Path) -> bool:
+        if conn := self.conn:
+            try:
+                with conn.cursor() as cur:
+                    # Extension types (e.g. citext) are all USER-DEFINED,
+                    # name them by their type instead
+                    cur.execute(
+                        """
+                        SELECT column_name,
+                            CASE WHEN data_type = 'USER-DEFINED'
+                                THEN udt_name ELSE data_type END
+                        FROM information_schema.columns
+                        WHERE table_schema = 'public'
+                        AND table_name = %s
+                        ORDER BY ordinal_position
+                    """,
+                        (table_name,),
+                    )
+                    return [
+                        Field(name=column_name, type=data_type)
+                        for column_name, data_type in cur.fetchall()
+                    ]
+            except psycopg2.Error as e:
+                issue_warning(f"Error fetching table fields: {e}", QueryWarning)
+                return []
+        else:
+            issue_warning("Unable to get database connection", ConnectionWarning)
+            return []
+
+    def get_completion_catalog(
+        self, dbname: str
+    ) -> Tuple[Dict[str, List[str]], List[str]]:
+        """
+        Everything the editor completes, in one catalog query: the columns of
+        each table, view and materialized view, and the names of the
+        functions in public and pg_catalog
+
+        Returns:
+            The columns by table and the function names, both empty if the
+            catalog could not be read
+        """
+        result = self.execute_custom_query(
+            dbname,
+            """
+            SELECT c.relname, a.attname
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_attribute a
+                ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+            WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+            UNION ALL
+            SELECT DISTINCT NULL, p.proname
+            FROM pg_proc p
+            JOIN pg_namespace n ON n.oid = p.pronamespace
+            WHERE n.nspname IN ('public', 'pg_catalog')
+            AND p.prokind IN ('f', 'a', 'w')
+            AND p.proname NOT LIKE '\\_%'
+            """,
+        )
+        if isinstance(result, str):
+            issue_warning(f"Unable to read the catalog: {result}", QueryWarning)
+            return {}, []
+        columns: Dict[str, List[str]] = {}
+        functions = []
+        for table, name in result[1]:
+            if table is None:
+                functions.append(name)
+            else:
+                names = columns.setdefault(table, [])
+                if name is not None:
+                    names.append(name)
+        return columns, functions
+
+    def get_table_indexes(self, dbname: str, table_name: str) -> List[Tuple[str, str]]:
+        """
+        The name and definition of each valid index on the table
+        """
         if not self.connect(dbname):
-            issue_warning("Unable to connect to the database", ConnectionWarning)
+            return []
+
+        if conn := self.conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        SELECT c.relname, pg_get_indexdef(i.indexrelid)
+                        FROM pg_index i
+                        JOIN pg_class c ON c.oid = i.indexrelid
+                        JOIN pg_class t ON t.oid = i.indrelid
+                        JOIN pg_namespace n ON n.oid = t.relnamespace
+                        WHERE n.nspname = 'public'
+                        AND t.relname = %s
+                        AND i.indisvalid
+                    """,
+                        (table_name,),
+                    )
+                    return cur.fetchall()
+            except psycopg2.Error as e:
+                issue_warning(f"Error fetching indexes: {e}", QueryWarning)
+                return []
+        else:
+            issue_warning("Unable to get database connection", ConnectionWarning)
+            return []
+
+    def has_extension(self, dbname: str, extension: str) -> bool:
+        result = self.execute_custom_query(
+            dbname, "SELECT 1 FROM pg_extension WHERE extname = %s", (extension,)
+        )
+        return isinstance(result, tuple) and bool(result[1])
+
+    def create_extension(self, dbname: str, extension: str) -> bool:
+        result = self.execute_custom_query(
+            dbname, f'CREATE EXTENSION IF NOT EXISTS "{extension}"'
+        )
+        if isinstance(result, str) and result.startswith("Error"):
+            issue_warning(f"Unable to create {extension}: {result}", QueryWarning)
             return False
+        return True
+
+    def estimate_table_rows(self, dbname: str, table_name: str) -> int:
+        """
+        The planner's estimate of the number of rows, this doesn't scan the table
+        """
+        result = self.execute_custom_query(
+            dbname,
+            """
+            SELECT reltuples::bigint FROM pg_class
+            WHERE oid = to_regclass(%s)
+            """,
+            (f'public."{table_name}"',),
+        )
+        if isinstance(result, tuple) and result[1]:
+            # -1 for tables that have never been vacuumed or analyzed
+            return max(int(result[1][0][0]), 0)
+        return 0
+
+    def estimate_query_rows(
+        self, dbname: str, query: str, params: Tuple[Any, ...] | None = None
+    ) -> int | None:
+        """
+        The planner's estimate of the rows a query returns, from
+        `EXPLAIN (FORMAT JSON)`, the query itself is not run
+        """
+        result = self.execute_custom_query(
+            dbname, f"EXPLAIN (FORMAT JSON) {query.strip().rstrip(';')}", params
+        )
+        if isinstance(result, str) or not result[1]:
+            return None
+        return plan_rows(result[1][0][0])
+
+    def get_table_modification_counts(self, dbname: str) -> Dict[str, Tuple[int, ...]]:
+        """
+        Counters from pg_stat_user_tables that change whenever a table is
+        written, by any session. The statistics are flushed with a delay of
+        about a second.
+        """
+        result = self.execute_custom_query(
+            dbname,
+            """
+            SELECT relname, n_tup_ins, n_tup_upd, n_tup_del, n_live_tup
+            FROM pg_stat_user_tables
+            WHERE schemaname = 'public'
+            """,
+        )
+        if isinstance(result, str):
+            issue_warning(f"Unable to read table statistics: {result}", QueryWarning)
+            return {}
+        return {row[0]: tuple(row[1:]) for row in result[1]}
+
+    def explain(
+        self, dbname: str, query: str, analyze: bool = False
+    ) -> Union[str, Dict[str, Any]]:
+        """
+        The plan of a query from `EXPLAIN (FORMAT JSON)`. With `analyze` the
+        query is run to time each node and count its buffers, in a
+        transaction that is always rolled back so DML leaves no changes.
 
+        Returns:
+            The first element of the JSON ("Plan", "Planning Time"...), or an
+            error message
+        """
+        options = "FORMAT JSON, ANALYZE, BUFFERS" if analyze else "FORMAT JSON"
+        if not self.connect(dbname) or not (conn := self.conn):
+            issue_warning("Unable to get database connection", ConnectionWarning)
+            return "Error: Unable to connect to the database."
+        self._cancelled = False
         try:
-            # Create SQLAlchemy engine
-            # NOTE Polars uses sqlalchemy anyway
-            # (can use builtin Rust one but it fails ocassionally)
-            engine = create_engine(self.get_connection_url())
+            self._query_running = True
+            with conn.cursor() as cur:
+                cur.execute(f"EXPLAIN ({options}) {query.strip().rstrip(';')}")
+                plan = cur.fetchone()[0]  # type: ignore
+        except psycopg2.Error as e:
+            return f"Error explaining query: {str(e)}"
+        finally:
+            self._query_running = False
+            conn.rollback()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]
+
+    def get_index_build_progress(
+        self, dbname: str, table_name: str
+    ) -> Tuple[str, float] | None:
+        """
+        The phase and fraction done of an index being built on the table,
+        None if no build is running
+        """
+        result = self.execute_custom_query(
+            dbname,
+            """
+            SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total
+            FROM pg_stat_progress_create_index
+            WHERE relid = to_regclass(%s)
+            """,
+            (f'public."{table_name}"',),
+        )
+        if not (isinstance(result, tuple) and result[1]):
+            return None
+        phase, blocks_done, blocks_total, tuples_done, tuples_total = result[1][0]
+        if blocks_total:
+            return phase, blocks_done / blocks_total
+        if tuples_total:
+            return phase, tuples_done / tuples_total
+        return phase, 0.0
+
+    def create_index_concurrently(
+        self,
+        dbname: str,
+        index_name: str,
+        table_name: str,
+        method: str,
+        expression: str,
+    ) -> bool:
+        """
+        Build an index without blocking writes to the table.
 
-            # Check if table_name is valid
-            allowed_tables = self.get_tables_and_fields(dbname)
-            if table_name not in allowed_tables:
-                raise ValueError(
-                    "Invalid Table Passed to Export Despite Being Selected from Tree"
-                )
+        This can take a long time on large tables, run it on a worker thread
+        with its own manager.
+        """
+        if not self.connect(dbname):
+            return False
+
+        if conn := self.conn:
+            try:
+                # CONCURRENTLY can't run inside a transaction block
+                conn.autocommit = True
+                self._query_running = True
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{index_name}" '
+                        f'ON "{table_name}" USING {method} ({expression})'
+                    )
+                return True
+            except psycopg2.Error as e:
+                issue_warning(f"Error creating index: {e}", QueryWarning)
+                # A failed concurrent build leaves an invalid index behind
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"')
+                except psycopg2.Error:
+                    pass
                 return False
+            finally:
+                self._query_running = False
+                conn.autocommit = False
+        else:
+            issue_warning("Unable to get database connection", ConnectionWarning)
+            return False
 
-            # Use text to create the query safely
-            query = text(f'SELECT * FROM "{text(table_name)}"')
+    def get_column_types(self, dbname: str, table_name: str) -> List[Field]:
+        """
+        `get_table_fields`, cached until `invalidate_field_cache` is called
+        """
+        key = (dbname, table_name)
+        if (fields := self._field_cache.get(key)) is None:
+            fields = self.get_table_fields(dbname, table_name)
+            if fields:
+                self._field_cache[key] = fields
+        return fields
+
+    def get_common_values(self, dbname: str, table_name: str, column: str) -> List[str]:
+        """
+        Values of a column from the planner's statistics, the most common
+        first and then the histogram bounds. Only pg_stats is read, not the
+        table, so columns that were never analyzed have none.
 
-            # Read the table into a Polars DataFrame
-            df = pl.read_database(query, engine)
+        Cached until `invalidate_field_cache` is called.
+        """
+        key = (dbname, table_name, column)
+        if (values := self._common_values_cache.get(key)) is not None:
+            return values
+        # anyarray can't be cast to text[] directly, only through its text form
+        result = self.execute_custom_query(
+            dbname,
+            """
+            SELECT most_common_vals::text::text[], histogram_bounds::text::text[]
+            FROM pg_stats
+            WHERE schemaname = 'public' AND tablename = %s AND attname = %s
+            """,
+            (table_name, column),
+        )
+        if isinstance(result, str):
+            issue_warning(f"Unable to read statistics: {result}", QueryWarning)
+            return []
+        values = []
+        for common, bounds in result[1]:
+            values.extend(common or [])
+            values.extend(bounds or [])
+        values = list(dict.fromkeys(v for v in values if v is not None))
+        self._common_values_cache[key] = values
+        return values
+
+    def invalidate_field_cache(self, dbname: str | None = None) -> None:
+        """
+        Forget cached column types and statistics, e.g. after DDL, for one or
+        all databases
+        """
+        if dbname is None:
+            self._field_cache.clear()
+            self._common_values_cache.clear()
+        else:
+            for key in [k for k in self._field_cache if k[0] == dbname]:
+                del self._field_cache[key]
+            for key in [k for k in self._common_values_cache if k[0] == dbname]:
+                del self._common_values_cache[key]
 
-            # Write the Polars DataFrame to Parquet file
-            df.write_parquet(path)
+    # TODO this should use the Database type from data_types.py
+    def get_fields(self, dbname: str, table_name: str) -> Dict[str, list[str]]:
+        fields = self.get_table_fields(dbname, table_name)
+        if not fields:
+            return {}
+        return {table_name: [field.name for field in fields]}
+
+    def stream_table_to_parquet(
+        self,
+        dbname: str,
+        table_name: str,
+        path: Path,
+        options: ParquetExportOptions | None = None,
+        snapshot: str | None = None,
+    ) -> Iterator[ExportProgress]:
+        """
+        Export a table to Parquet without holding it in memory: rows are read
+        through a server side cursor (see `stream_query`) and written a row
+        group at a time with pyarrow's ParquetWriter. Yields the progress
+        after each batch read. If it fails or is closed early the file is
+        removed.
+
+        Args:
+            snapshot: Read the table as of an exported snapshot, see
+                `stream_query`
 
+        Raises:
+            psycopg2.Error: If reading the table fails or is cancelled
+        """
+        options = options or ParquetExportOptions()
+        started = time.monotonic()
+        query = 'SELECT * FROM "{}"'.format(table_name.replace('"', '""'))
+        compression = None if options.compression == "none" else options.compression
+        # Half the ceiling, the other half is for the Arrow copy when flushing
+        buffer_limit = options.memory_mb * 1024**2 // 2
+        buffered: List[pl.DataFrame] = []
+        buffered_rows = buffered_bytes = rows = size_bytes = 0
+        writer = None
+        complete = False
+        try:
+            for frame in self.stream_query(
+                dbname,
+                query,
+                max_batch=min(STREAM_BATCH_ROWS, options.row_group_rows),
+                snapshot=snapshot,
+            ):
+                buffered.append(frame)
+                buffered_rows += frame.height
+                buffered_bytes += frame.estimated_size()
+                rows += frame.height
+                size_bytes += frame.estimated_size()
+                if (
+                    buffered_rows >= options.row_group_rows
+                    or buffered_bytes >= buffer_limit
+                ):
+                    table = pl.concat(buffered, how="vertical_relaxed").to_arrow()
+                    buffered, buffered_rows, buffered_bytes = [], 0, 0
+                    if writer is None:
+                        writer = pq.ParquetWriter(
+                            path, table.schema, compression=compression
+                        )
+                    writer.write_table(table, row_group_size=options.row_group_rows)
+                yield ExportProgress(rows, size_bytes, time.monotonic() - started)
+            if buffered:
+                # The rest, or an empty table to write the schema
+                table = pl.concat(buffered, how="vertical_relaxed").to_arrow()
+                if writer is None:
+                    writer = pq.ParquetWriter(
+                        path, table.schema, compression=compression
+                    )
+                writer.write_table(table, row_group_size=options.row_group_rows)
+            complete = True
+        finally:
+            if writer is not None:
+                writer.close()
+            if not complete:
+                # Failed or stopped, don't leave a truncated file behind
+                path.unlink(missing_ok=True)
+
+    # TODO when this is called, must rebuild the tree
+    def export_table_to_parquet(
+        self,
+        dbname: str,
+        table_name: str,
+        path: Path,
+        options: ParquetExportOptions | None = None,
+    ) -> bool:
+        """
+        `stream_table_to_parquet`, run to the end
+        """
+        if not self.connect(dbname):
+            issue_warning("Unable to connect to the database", ConnectionWarning)
+            return False
+
+        try:
+            for _ in self.stream_table_to_parquet(dbname, table_name, path, options):
+                pass
             return True
         except Exception as e:
             issue_warning(f"Error exporting table to Parquet: {e}", QueryWarning)
@@ -512,34 +1597,114 @@ class DatabaseManager(AbstractDatabaseManager):
             issue_warning(f"Error importing Parquet file to table: {e}", QueryWarning)
             return False
 
-    def export_database_to_parquet(self, dbname: str, directory: Path) -> bool:
-        if not self.connect(dbname):
-            issue_warning("Unable to connect to the database", ConnectionWarning)
+    def export_database_to_parquet(
+        self,
+        dbname: str,
+        directory: Path,
+        workers: int = EXPORT_WORKERS,
+        options: ParquetExportOptions | None = None,
+    ) -> bool:
+        """
+        Export every table to `directory` as `<table>.parquet`, with the
+        columns of each and the snapshot read in `metadata.json`.
+
+        A leader transaction exports its snapshot (`pg_export_snapshot()`)
+        and `workers` connections read the tables as of it, so together they
+        are consistent as if read at one point in time. Tables are taken
+        biggest first, so a large one doesn't start last and run alone.
+        `options.memory_mb` is shared between the workers, so the export as
+        a whole stays within it however many run at once.
+        """
+        try:
+            leader = self._new_connection(dbname)
+        except psycopg2.Error as e:
+            unable_to_connect_to_database(e)
             return False
 
         try:
-            engine = create_engine(self.get_connection_url())
-            inspector = inspect(engine)
+            leader.set_session(isolation_level="REPEATABLE READ", readonly=True)
+            with leader.cursor() as cur:
+                cur.execute("SELECT pg_export_snapshot()")
+                snapshot = cur.fetchone()[0]
+                # Read in the snapshot, so it lists the tables the workers see
+                cur.execute(
+                    """
+                    SELECT c.relname,
+                        (SELECT sum(pg_total_relation_size(p.relid))
+                         FROM pg_partition_tree(c.oid) p) AS size,
+                        (SELECT json_agg(json_build_object(
+                                'name', a.attname,
+                                'type', format_type(a.atttypid, a.atttypmod)
+                            ) ORDER BY a.attnum)
+                         FROM pg_attribute a
+                         WHERE a.attrelid = c.oid AND a.attnum > 0
+                            AND NOT a.attisdropped) AS columns
+                    FROM pg_class c
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = 'public'
+                        AND c.relkind IN ('r', 'p')
+                        AND NOT c.relispartition
+                    ORDER BY size DESC NULLS LAST
+                    """
+                )
+                tables = cur.fetchall()
 
-            # Create the directory if it doesn't exist
             os.makedirs(directory, exist_ok=True)
+            pending: queue.SimpleQueue[str] = queue.SimpleQueue()
+            for table_name, _, _ in tables:
+                pending.put(table_name)
+            failed = threading.Event()
+            # The error that stopped the export, the others it cancelled follow
+            errors: List[Exception] = []
+            errors_lock = threading.Lock()
+            managers = [self.copy() for _ in range(max(1, min(workers, len(tables))))]
+            options = options or ParquetExportOptions()
+            worker_options = replace(
+                options, memory_mb=max(1, options.memory_mb // len(managers))
+            )
 
-            metadata = {}
-
-            for table_name in inspector.get_table_names():
-                # Export table to Parquet
-                query = f'SELECT * FROM "{table_name}"'
-                df = pl.read_database(query, engine)
-                parquet_path = directory / f"{table_name}.parquet"
-                df.write_parquet(parquet_path)
-
-                # Store metadata
-                columns = inspector.get_columns(table_name)
-                metadata[table_name] = [
-                    {"name": col["name"], "type": str(col["type"])} for col in columns
-                ]
-
-            # Write metadata to JSON file
+            def export_tables(manager: DatabaseManager) -> None:
+                try:
+                    while not failed.is_set():
+                        try:
+                            table_name = pending.get_nowait()
+                        except queue.Empty:
+                            return
+                        for _ in manager.stream_table_to_parquet(
+                            dbname,
+                            table_name,
+                            directory / f"{table_name}.parquet",
+                            worker_options,
+                            snapshot,
+                        ):
+                            if failed.is_set():
+                                return
+                except BaseException as e:
+                    # Including panics from polars, which aren't Exceptions
+                    with errors_lock:
+                        if not failed.is_set():
+                            errors.append(e)
+                        # Stop the other workers, their tables would be wasted
+                        failed.set()
+                    for other in managers:
+                        if other is not manager:
+                            other.cancel()
+                finally:
+                    if manager.conn:
+                        manager.conn.close()
+
+            with ThreadPoolExecutor(max_workers=len(managers)) as executor:
+                executor.map(export_tables, managers)
+            if errors:
+                # A panic isn't an Exception, report it like one
+                raise Exception(str(errors[0])) from errors[0]
+
+            metadata = {
+                "snapshot_id": snapshot,
+                "tables": {
+                    table_name: columns or [] for table_name, _, columns in tables
+                },
+            }
             with open(directory / "metadata.json", "w") as f:
                 json.dump(metadata, f, indent=2)
 
@@ -547,6 +1712,8 @@ class DatabaseManager(AbstractDatabaseManager):
         except Exception as e:
             issue_warning(f"Error exporting database to Parquet: {e}", QueryWarning)
             return False
+        finally:
+            leader.close()
 
     # TODO this method does not work, consider simply calling the table method above
     def import_database_from_parquet(self, dbname: str, directory: Path) -> bool:
@@ -572,6 +1739,7 @@ class DatabaseManager(AbstractDatabaseManager):
     def drop_table(self, dbname: str, table_name: str) -> bool:
         if not self.connect(dbname):
             return False
+        self._field_cache.pop((dbname, table_name), None)
 
         if conn := self.conn:
             try:
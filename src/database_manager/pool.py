@@ -0,0 +1,83 @@
+import queue
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterator, List
+
+from database_manager.pgsql import DatabaseManager
+
+
+class PoolClosed(Exception):
+    pass
+
+
+class ManagerPool:
+    """
+    A bounded pool of DatabaseManagers, each with its own connection, for
+    running queries from several worker threads at once.
+
+    At most `size` connections are opened, `acquire` blocks until one is free.
+    Once closed, connections are closed as they are released and `acquire`
+    raises `PoolClosed`.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, size: int) -> None:
+        self.db_manager = db_manager
+        self.size = size
+        self._idle: queue.LifoQueue[DatabaseManager] = queue.LifoQueue()
+        self._managers: List[DatabaseManager] = []
+        self._lock = Lock()
+        self._closed = False
+
+    @contextmanager
+    def acquire(self) -> Iterator[DatabaseManager]:
+        manager = self._get()
+        try:
+            yield manager
+        finally:
+            self._release(manager)
+
+    def _get(self) -> DatabaseManager:
+        try:
+            manager = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._closed:
+                    raise PoolClosed()
+                if len(self._managers) < self.size:
+                    manager = self.db_manager.copy()
+                    self._managers.append(manager)
+                    return manager
+            manager = self._idle.get()
+        if self._closed:
+            # Pass it on to wake the next thread waiting
+            self._release(manager)
+            raise PoolClosed()
+        return manager
+
+    def _release(self, manager: DatabaseManager) -> None:
+        if self._closed and manager.conn:
+            manager.conn.close()
+        self._idle.put(manager)
+
+    def cancel_all(self) -> None:
+        """
+        Cancel the queries running on every connection in the pool
+        """
+        for manager in list(self._managers):
+            manager.cancel()
+
+    def close(self) -> None:
+        """
+        Close the connections that aren't in use, and the others as they are
+        released
+        """
+        with self._lock:
+            self._closed = True
+        idle = []
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for manager in idle:
+            self._release(manager)
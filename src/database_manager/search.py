@@ -0,0 +1,325 @@
+"""
+Build the queries run by the search bar.
+
+Each builder returns the query and its parameters, without a LIMIT, so its
+results can be read a page at a time from a cursor (see
+`DatabaseManager.open_cursor`) or bounded by `paged_query`.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
+
+from data_types import Field
+
+# Text search configuration used for both the query and the index,
+# the planner only uses an expression index if the expressions match
+TS_CONFIG = "english"
+
+# Postgres truncates identifiers longer than this
+MAX_IDENTIFIER_LENGTH = 63
+
+# Without a trigram index a similarity search scans about this many rows
+SAMPLE_TARGET_ROWS = 100_000
+
+# Rows a prefix completion query returns
+COMPLETION_LIMIT = 20
+
+# Fixed so every page of a sampled search reads the same sample
+SAMPLE_SEED = 0
+
+SearchQuery = Tuple[str, Tuple[Any, ...] | None]
+
+# information_schema.columns.data_type values (udt_name for extension types,
+# see `DatabaseManager.get_table_fields`), grouped by how they are searched
+INTEGER_TYPES = {"smallint", "integer", "bigint"}
+NUMERIC_TYPES = {"numeric", "real", "double precision"}
+TIMESTAMP_TYPES = {"timestamp without time zone", "timestamp with time zone"}
+TEXT_TYPES = {"text", "character varying", "character", "name", "citext"}
+BOOLEAN_VALUES = {"true": True, "t": True, "false": False, "f": False}
+
+
+@dataclass
+class ParsedTerm:
+    """
+    A search term, parsed once as each type a column could have
+    """
+
+    text: str
+    integer: Optional[int] = None
+    number: Optional[Decimal] = None
+    uuid: Optional[UUID] = None
+    day: Optional[date] = None
+    boolean: Optional[bool] = None
+
+
+def parse_term(term: str) -> ParsedTerm:
+    parsed = ParsedTerm(text=term)
+    try:
+        parsed.integer = int(term)
+    except ValueError:
+        pass
+    try:
+        number = Decimal(term)
+        if number.is_finite():
+            parsed.number = number
+    except InvalidOperation:
+        pass
+    try:
+        parsed.uuid = UUID(term)
+    except ValueError:
+        pass
+    try:
+        parsed.day = date.fromisoformat(term)
+    except ValueError:
+        pass
+    parsed.boolean = BOOLEAN_VALUES.get(term.lower())
+    return parsed
+
+
+def typed_predicates(
+    fields: List[Field], term: str
+) -> List[Tuple[str, Tuple[Any, ...]]]:
+    """
+    A predicate (and its parameters) for each field the term could match,
+    index friendly equality and range predicates first.
+
+    Columns whose type the term can't be (e.g. `abc` on an integer column)
+    are skipped rather than cast to text, casting can never use an index.
+    """
+    parsed = parse_term(term)
+    exact: List[Tuple[str, Tuple[Any, ...]]] = []
+    text: List[Tuple[str, Tuple[Any, ...]]] = []
+    for field in fields:
+        column = f'"{field.name}"'
+        match field.type:
+            case t if t in INTEGER_TYPES and parsed.integer is not None:
+                exact.append((f"{column} = %s", (parsed.integer,)))
+            case t if t in NUMERIC_TYPES and parsed.number is not None:
+                exact.append((f"{column} = %s", (parsed.number,)))
+            case "uuid" if parsed.uuid is not None:
+                exact.append((f"{column} = %s::uuid", (str(parsed.uuid),)))
+            case "date" if parsed.day is not None:
+                exact.append((f"{column} = %s::date", (parsed.day,)))
+            case t if t in TIMESTAMP_TYPES and parsed.day is not None:
+                # A range rather than casting the column keeps it sargable
+                exact.append(
+                    (
+                        f"{column} >= %s::date AND {column} < %s::date + 1",
+                        (parsed.day, parsed.day),
+                    )
+                )
+            case "boolean" if parsed.boolean is not None:
+                exact.append((f"{column} = %s", (parsed.boolean,)))
+            case t if t in TEXT_TYPES:
+                text.append((f"{column} ILIKE %s", (f"%{term}%",)))
+    return exact + text
+
+
+def typed_search_query(table: str, fields: List[Field], term: str) -> SearchQuery:
+    """
+    Rows where any field matches the term, comparing each column by its type
+    """
+    predicates = typed_predicates(fields, term)
+    if not predicates:
+        # Nothing in the table can hold this term
+        return f'SELECT * FROM "{table}" WHERE false', None
+    conditions = " OR ".join(f"({p})" for p, _ in predicates)
+    params = tuple(param for _, ps in predicates for param in ps)
+    query = f"""
+    SELECT * FROM "{table}"
+    WHERE {conditions}
+    """
+    return query, params
+
+
+def paged_query(search_query: SearchQuery, limit: int, offset: int = 0) -> SearchQuery:
+    """
+    One page of a search's results. Builders leave the query open so it
+    can be paged, or planned as a whole by `DatabaseManager.estimate_query_rows`.
+
+    Without an ORDER BY on a unique key, pages of separate LIMIT/OFFSET
+    queries may overlap or skip rows, and every page scans the rows before
+    it. Read pages in order from one cursor instead (see
+    `DatabaseManager.open_cursor`), this then identifies a page for caching.
+    """
+    query, params = search_query
+    return f"{query.rstrip()}\nLIMIT %s OFFSET %s", (params or ()) + (limit, offset)
+
+
+def tsvector_expression(field: str) -> str:
+    return f"to_tsvector('{TS_CONFIG}'::regconfig, \"{field}\")"
+
+
+def tsquery_expression() -> str:
+    return f"websearch_to_tsquery('{TS_CONFIG}'::regconfig, %s)"
+
+
+def all_rows_query(table: str) -> SearchQuery:
+    return f'SELECT * FROM "{table}"', None
+
+
+def contains_query(table: str, fields: List[str], term: str) -> SearchQuery:
+    """
+    Rows where any of the fields contain the term, ignoring case
+    """
+    conditions = [f'"{f}" ILIKE %s' for f in fields]
+    query = f"""
+    SELECT * FROM "{table}"
+    WHERE {" OR ".join(conditions)}
+    """
+    return query, tuple(f"%{term}%" for _ in fields)
+
+
+def full_text_query(table: str, field: str, term: str) -> SearchQuery:
+    """
+    Rows whose field matches a web search style query (e.g. `"a phrase" -not`),
+    best match first
+    """
+    vector = tsvector_expression(field)
+    tsquery = tsquery_expression()
+    query = f"""
+    SELECT *, ts_rank({vector}, {tsquery}) AS "rank"
+    FROM "{table}"
+    WHERE {vector} @@ {tsquery}
+    ORDER BY "rank" DESC
+    """
+    return query, (term, term)
+
+
+def similar_query(table: str, field: str, term: str) -> SearchQuery:
+    """
+    Rows whose field contains the term or is similar to it (pg_trgm), most
+    similar first. Both predicates can use a trigram index.
+    """
+    query = f"""
+    SELECT *, similarity("{field}", %s) AS "similarity"
+    FROM "{table}"
+    WHERE "{field}" ILIKE %s OR "{field}" %% %s
+    ORDER BY "similarity" DESC
+    """
+    return query, (term, f"%{term}%", term)
+
+
+def sample_percent(estimated_rows: int) -> float:
+    """
+    The TABLESAMPLE percentage that reads about `SAMPLE_TARGET_ROWS` rows
+    """
+    if estimated_rows <= SAMPLE_TARGET_ROWS:
+        return 100.0
+    return max(round(100 * SAMPLE_TARGET_ROWS / estimated_rows, 2), 0.01)
+
+
+def sampled_contains_query(
+    table: str, fields: List[str], term: str, percent: float
+) -> SearchQuery:
+    """
+    `contains_query` over a random sample of the table's pages
+    """
+    conditions = [f'"{f}" ILIKE %s' for f in fields]
+    query = f"""
+    SELECT * FROM "{table}" TABLESAMPLE SYSTEM ({float(percent)}) REPEATABLE ({SAMPLE_SEED})
+    WHERE {" OR ".join(conditions)}
+    """
+    return query, tuple(f"%{term}%" for _ in fields)
+
+
+def sampled_similar_query(
+    table: str, field: str, term: str, percent: float
+) -> SearchQuery:
+    """
+    `similar_query` over a random sample of the table's pages
+    """
+    query = f"""
+    SELECT *, similarity("{field}", %s) AS "similarity"
+    FROM "{table}" TABLESAMPLE SYSTEM ({float(percent)}) REPEATABLE ({SAMPLE_SEED})
+    WHERE "{field}" ILIKE %s OR "{field}" %% %s
+    ORDER BY "similarity" DESC
+    """
+    return query, (term, f"%{term}%", term)
+
+
+def _mentions_field(definition: str, field: str) -> bool:
+    # pg_get_indexdef only quotes identifiers that need it
+    return re.search(rf'[\s(]"?{re.escape(field)}"?[)\s:]', definition) is not None
+
+
+def index_name(table: str, field: str, suffix: str) -> str:
+    return f"{table}_{field}_{suffix}"[:MAX_IDENTIFIER_LENGTH]
+
+
+def full_text_index_definition(field: str) -> Tuple[str, str]:
+    """
+    The access method and expression of an index `full_text_query` can use
+    """
+    return "gin", tsvector_expression(field)
+
+
+def has_full_text_index(indexes: List[Tuple[str, str]], field: str) -> bool:
+    """
+    Whether one of the (name, definition) pairs from
+    `DatabaseManager.get_table_indexes` is a GIN index on the field's tsvector
+    """
+    # pg_get_indexdef always prints the config with its cast
+    expression = f"to_tsvector('{TS_CONFIG}'::regconfig"
+    return any(
+        "USING gin" in definition
+        and expression in definition
+        and _mentions_field(definition, field)
+        for _, definition in indexes
+    )
+
+
+def similar_index_definition(field: str) -> Tuple[str, str]:
+    """
+    The access method and expression of an index `similar_query` can use
+    """
+    return "gin", f'"{field}" gin_trgm_ops'
+
+
+def has_trigram_index(indexes: List[Tuple[str, str]], field: str) -> bool:
+    """
+    Whether one of the (name, definition) pairs from
+    `DatabaseManager.get_table_indexes` is a trigram index on the field
+    """
+    return any(
+        ("gin_trgm_ops" in definition or "gist_trgm_ops" in definition)
+        and _mentions_field(definition, field)
+        for _, definition in indexes
+    )
+
+
+def supports_prefix_search(indexes: List[Tuple[str, str]], field: str) -> bool:
+    """
+    Whether one of the (name, definition) pairs from
+    `DatabaseManager.get_table_indexes` is a btree index that `LIKE 'prefix%'`
+    can use. Outside the C locale that needs a pattern_ops opclass or C collation.
+    """
+    return any(
+        "USING btree" in definition
+        and _mentions_field(definition, field)
+        and ("_pattern_ops" in definition or 'COLLATE "C"' in definition)
+        for _, definition in indexes
+    )
+
+
+def escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def prefix_query(
+    table: str, field: str, prefix: str, limit: int = COMPLETION_LIMIT
+) -> SearchQuery:
+    """
+    Distinct values of the field starting with the prefix, for completion
+    """
+    query = f"""
+    SELECT DISTINCT "{field}"::text FROM "{table}"
+    WHERE "{field}" LIKE %s
+    ORDER BY 1
+    LIMIT %s
+    """
+    return query, (f"{escape_like(prefix)}%", limit)
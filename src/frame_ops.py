@@ -0,0 +1,95 @@
+"""
+Vectorised operations on loaded results, these run on worker threads and
+return row indices for `DataFrameModel` rather than copies of the rows.
+"""
+
+import re
+from typing import List, Tuple
+
+import polars as pl
+
+from database_manager.search import parse_term
+
+ROW_INDEX = "__row"
+
+
+def _no_rows() -> pl.Series:
+    return pl.Series(ROW_INDEX, [], dtype=pl.UInt32)
+
+
+def filter_rows(
+    frame: pl.DataFrame, term: str, columns: List[str] | None = None
+) -> pl.Series:
+    """
+    The indices of the rows where any of the columns matches the term.
+
+    Like `search.typed_predicates`, the term is parsed once and compared with
+    each column by its type: a case insensitive substring match on strings,
+    equality on numbers, booleans and dates.
+    """
+    parsed = parse_term(term)
+    contains = f"(?i){re.escape(term)}"
+    predicates = []
+    for name in columns or frame.columns:
+        dtype = frame.schema[name]
+        column = pl.col(name)
+        if dtype == pl.String:
+            predicates.append(column.str.contains(contains))
+        elif dtype.is_integer():
+            if parsed.integer is not None:
+                predicates.append(column == parsed.integer)
+        elif dtype.is_float() or dtype == pl.Decimal:
+            if parsed.number is not None:
+                predicates.append(column.cast(pl.Float64) == float(parsed.number))
+        elif dtype == pl.Boolean:
+            if parsed.boolean is not None:
+                predicates.append(column == parsed.boolean)
+        elif dtype == pl.Date:
+            if parsed.day is not None:
+                predicates.append(column == parsed.day)
+        elif dtype == pl.Datetime:
+            if parsed.day is not None:
+                predicates.append(column.dt.date() == parsed.day)
+        elif dtype.is_nested():
+            # Lists and structs (e.g. arrays and json) can't be cast to
+            # strings, match their printed form
+            predicates.append(
+                column.map_elements(str, return_dtype=pl.String).str.contains(contains)
+            )
+        elif dtype not in (pl.Object, pl.Binary):
+            # e.g. categoricals and uuids, match their text
+            predicates.append(column.cast(pl.String).str.contains(contains))
+    if not predicates:
+        return _no_rows()
+    return (
+        frame.with_row_index(ROW_INDEX)
+        .filter(pl.any_horizontal(predicates))
+        .get_column(ROW_INDEX)
+    )
+
+
+# (column, descending)
+SortKey = Tuple[str, bool]
+
+
+def sort_rows(frame: pl.DataFrame, keys: List[SortKey]) -> pl.Series:
+    """
+    The row indices that sort the frame by the keys, the first key first.
+
+    Columns are compared by their native type so numbers and dates sort by
+    value rather than by their text, NULLs sort last in either direction.
+    """
+    columns = []
+    for name, _ in keys:
+        column = pl.col(name)
+        if frame.schema[name] == pl.Object:
+            # Python objects can't be compared natively, sort by their text
+            column = column.map_elements(str, return_dtype=pl.String)
+        columns.append(column)
+    return frame.select(
+        pl.arg_sort_by(
+            columns,
+            descending=[descending for _, descending in keys],
+            nulls_last=True,
+        )
+    ).to_series()
@@ -0,0 +1,277 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import polars as pl
+from PySide6.QtCore import QThreadPool, Signal
+from PySide6.QtWidgets import (
+    QCheckBox,
+    QDialog,
+    QFormLayout,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QPushButton,
+    QSpinBox,
+    QTreeWidget,
+    QTreeWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from database_manager.pgsql import DatabaseManager, rows_to_frame
+from database_manager.pool import ManagerPool
+from database_manager.search import paged_query, typed_predicates, typed_search_query
+from workers import Worker
+
+# Rows shown under each table that matched
+PREVIEW_ROWS = 3
+
+
+@dataclass
+class GlobalSearchHit:
+    database: str
+    table: str
+    rows: pl.DataFrame
+
+
+def list_search_targets(
+    pool: ManagerPool, databases: List[str] | None
+) -> List[Tuple[str, str]]:
+    """
+    The (database, table) pairs to probe, every database if `databases` is None
+    """
+    with pool.acquire() as db_manager:
+        if databases is None:
+            databases = db_manager.list_databases()
+        return [
+            (database, table)
+            for database in databases
+            for table, table_type in db_manager.list_tables(database)
+            # Views could be arbitrarily expensive to scan
+            if table_type == "BASE TABLE"
+        ]
+
+
+def probe_table(
+    pool: ManagerPool,
+    database: str,
+    table: str,
+    term: str,
+    limit: int,
+    timeout_ms: int,
+) -> GlobalSearchHit | None:
+    """
+    Search one table for the term, giving up after `timeout_ms`
+    """
+    with pool.acquire() as db_manager:
+        fields = db_manager.get_column_types(database, table)
+        if not typed_predicates(fields, term):
+            # No column of this table can hold the term
+            return None
+        query, params = paged_query(typed_search_query(table, fields, term), limit)
+        # SET LOCAL ends with the transaction execute_custom_query commits
+        query = f"SET LOCAL statement_timeout = {int(timeout_ms)}; {query}"
+        result = db_manager.execute_custom_query(database, query, params)
+    if isinstance(result, str) or not result[1]:
+        return None
+    columns, rows = result
+    return GlobalSearchHit(database, table, rows_to_frame(columns, rows))
+
+
+class GlobalSearchDialog(QDialog):
+    """
+    Search every table, and optionally every database, for a value.
+
+    Each table is probed with a LIMITed, type aware query through a bounded
+    pool of connections, and matches are listed as they arrive.
+    """
+
+    # Emitted with (database, table) when a match is double clicked
+    table_selected = Signal(str, str)
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        current_database: str,
+        parent: QWidget | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Global Search")
+        self.db_manager = db_manager
+        self.current_database = current_database
+        self.thread_pool = QThreadPool()
+        self.manager_pool: ManagerPool | None = None
+        # Incremented for every search, late results of older ones are dropped
+        self._generation = 0
+        self._pending = 0
+        self._searched = 0
+        self._matched = 0
+        self.initUI()
+
+    def initUI(self) -> None:
+        layout = QVBoxLayout()
+
+        self.term_edit = QLineEdit()
+        self.term_edit.setPlaceholderText("Value to search for, e.g. a customer id")
+        self.term_edit.returnPressed.connect(self.start_search)
+
+        self.all_databases = QCheckBox("Search every database")
+
+        # Hard cap on concurrent queries, so production isn't overloaded
+        self.concurrency = QSpinBox()
+        self.concurrency.setRange(1, 16)
+        self.concurrency.setValue(4)
+
+        self.timeout = QSpinBox()
+        self.timeout.setRange(1, 600)
+        self.timeout.setValue(5)
+        self.timeout.setSuffix(" s")
+
+        self.row_limit = QSpinBox()
+        self.row_limit.setRange(1, 1000)
+        self.row_limit.setValue(10)
+
+        form = QFormLayout()
+        form.addRow("Search for:", self.term_edit)
+        form.addRow("", self.all_databases)
+        form.addRow("Concurrent queries:", self.concurrency)
+        form.addRow("Timeout per table:", self.timeout)
+        form.addRow("Rows per table:", self.row_limit)
+        layout.addLayout(form)
+
+        buttons = QHBoxLayout()
+        self.search_button = QPushButton("Search")
+        self.search_button.clicked.connect(self.start_search)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_search)
+        self.cancel_button.setEnabled(False)
+        buttons.addWidget(self.search_button)
+        buttons.addWidget(self.cancel_button)
+        layout.addLayout(buttons)
+
+        self.results = QTreeWidget()
+        self.results.setHeaderLabels(["Database", "Table", "Matches"])
+        self.results.itemDoubleClicked.connect(self.on_result_activated)
+        layout.addWidget(self.results)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.resize(700, 500)
+        self.setLayout(layout)
+
+    def start_search(self) -> None:
+        term = self.term_edit.text().strip()
+        if not term:
+            return
+        self.cancel_search()
+        self.results.clear()
+        self._searched = self._matched = 0
+
+        concurrency = self.concurrency.value()
+        self.thread_pool.setMaxThreadCount(concurrency)
+        self.manager_pool = ManagerPool(self.db_manager, concurrency)
+        generation = self._generation
+        databases = None if self.all_databases.isChecked() else [self.current_database]
+
+        worker = Worker(list_search_targets, self.manager_pool, databases)
+        worker.signals.finished.connect(
+            lambda targets: self._probe_targets(generation, term, targets)
+        )
+        worker.signals.error.connect(
+            lambda error: self._on_listing_failed(generation, error)
+        )
+        self.thread_pool.start(worker)
+        self.status_label.setText("Listing tables...")
+        self.search_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+
+    def _probe_targets(
+        self, generation: int, term: str, targets: List[Tuple[str, str]]
+    ) -> None:
+        if generation != self._generation or self.manager_pool is None:
+            return
+        self._pending = len(targets)
+        if not targets:
+            self.status_label.setText("No tables to search")
+            self._finish()
+            return
+        for database, table in targets:
+            worker = Worker(
+                probe_table,
+                self.manager_pool,
+                database,
+                table,
+                term,
+                self.row_limit.value(),
+                self.timeout.value() * 1000,
+            )
+            worker.signals.finished.connect(
+                lambda hit: self._on_probe_finished(generation, hit)
+            )
+            worker.signals.error.connect(
+                lambda _error: self._on_probe_finished(generation, None)
+            )
+            self.thread_pool.start(worker)
+        self._update_status()
+
+    def _on_listing_failed(self, generation: int, error: str) -> None:
+        if generation != self._generation:
+            return
+        self.status_label.setText(error)
+        self._finish()
+
+    def _on_probe_finished(self, generation: int, hit: GlobalSearchHit | None) -> None:
+        if generation != self._generation:
+            return
+        self._pending -= 1
+        self._searched += 1
+        if hit is not None:
+            self._matched += 1
+            self._add_hit(hit)
+        self._update_status()
+        if self._pending <= 0:
+            self._finish()
+
+    def _add_hit(self, hit: GlobalSearchHit) -> None:
+        limit = self.row_limit.value()
+        count = f"{hit.rows.height}+" if hit.rows.height >= limit else hit.rows.height
+        item = QTreeWidgetItem(self.results, [hit.database, hit.table, str(count)])
+        for row in hit.rows.head(PREVIEW_ROWS).iter_rows(named=True):
+            preview = ", ".join(f"{k}={v}" for k, v in row.items())
+            child = QTreeWidgetItem(item, ["", "", preview])
+            child.setToolTip(2, preview)
+
+    def _update_status(self) -> None:
+        total = self._searched + max(self._pending, 0)
+        self.status_label.setText(
+            f"Searched {self._searched}/{total} tables, {self._matched} with matches"
+        )
+
+    def _finish(self) -> None:
+        self.search_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        if self.manager_pool:
+            self.manager_pool.close()
+
+    def cancel_search(self) -> None:
+        """
+        Drop the probes that haven't started and cancel the running ones
+        """
+        self._generation += 1
+        self.thread_pool.clear()
+        if self.manager_pool:
+            self.manager_pool.cancel_all()
+        self._pending = 0
+        self._finish()
+        if self._searched:
+            self.status_label.setText(self.status_label.text() + " (cancelled)")
+
+    def on_result_activated(self, item: QTreeWidgetItem) -> None:
+        if item.parent():
+            item = item.parent()
+        self.table_selected.emit(item.text(0), item.text(1))
+
+    def closeEvent(self, event) -> None:
+        self.cancel_search()
+        super().closeEvent(event)
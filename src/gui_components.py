@@ -1,8 +1,17 @@
 from typing import List, Dict, Tuple, Any
 
-from PySide6.QtCore import Qt
+import polars as pl
+from PySide6.QtCore import (
+    Qt,
+    QAbstractTableModel,
+    QModelIndex,
+    QThreadPool,
+    QTimer,
+    Signal,
+)
 from data_types import Field
 from PySide6.QtWidgets import (
+    QApplication,
     QTreeWidget,
     QTreeWidgetItem,
     QTableView,
@@ -12,10 +21,12 @@ from PySide6.QtWidgets import (
     QInputDialog,
     QLineEdit,
 )
-from PySide6.QtGui import QStandardItemModel, QStandardItem, QAction
+from PySide6.QtGui import QAction
 from database_manager.pgsql import DatabaseManager
 
 from data_types import DBItemType
+from frame_ops import SortKey, sort_rows
+from workers import Worker
 
 
 class DBTablesTree(QTreeWidget):
@@ -98,6 +109,39 @@ class DBTablesTree(QTreeWidget):
                     assert False, "Attempted to get a table from a non-table selection"
         return None
 
+    def select_table(self, db_name: str, table_name: str) -> bool:
+        """
+        Make a table the current item, as if the user had clicked it
+        """
+        for i in range(self.topLevelItemCount()):
+            db_item = self.topLevelItem(i)
+            if db_item.text(0) != db_name:
+                continue
+            for j in range(db_item.childCount()):
+                table_item = db_item.child(j)
+                if table_item.text(0).split()[0] == table_name:
+                    self.setCurrentItem(table_item)
+                    return True
+        return False
+
+    def get_neighbouring_tables(self) -> List[str]:
+        """
+        The tables directly above and below the current table, in the same database
+        """
+        neighbours = []
+        if (current_item := self.currentItem()) is None:
+            return neighbours
+        if self._get_db_item_type(current_item) != DBItemType.TABLE:
+            return neighbours
+        for item in (self.itemAbove(current_item), self.itemBelow(current_item)):
+            if (
+                item is not None
+                and item.parent() is current_item.parent()
+                and self._get_db_item_type(item) == DBItemType.TABLE
+            ):
+                neighbours.append(item.text(0).split()[0])
+        return neighbours
+
     def is_selected_database(self) -> bool:
         """
         A callback function that returns whether the selected item is a database
@@ -263,18 +307,399 @@ class DBFieldsView(QTreeWidget):
         return item.text(0).split()[0]
 
 
+# Shift clicking a header adds a column to the sort, up to this many
+MAX_SORT_KEYS = 4
+
+# Column width estimation, see `estimate_column_chars`
+WIDTH_SAMPLE_ROWS = 50
+MIN_COLUMN_WIDTH = 40
+MAX_COLUMN_WIDTH = 400
+
+# `TableView.scrolled_to_end` fires this many scroll steps before the last row
+FETCH_MARGIN_ROWS = 20
+
+
+def _fixed_type_chars(dtype: pl.DataType) -> int | None:
+    """
+    The display width of types whose width doesn't depend on the value
+    """
+    if dtype == pl.Boolean:
+        return 5
+    if dtype == pl.Date:
+        return 10
+    if dtype == pl.Time:
+        return 15
+    if dtype == pl.Datetime:
+        return 26
+    return None
+
+
+def estimate_column_chars(
+    frame: pl.DataFrame, sample_rows: int = WIDTH_SAMPLE_ROWS
+) -> List[int]:
+    """
+    Estimate the width of each column in characters from its type and a
+    sample of rows, rather than measuring every cell
+    """
+    sample = frame.head(sample_rows)
+    widths = []
+    for series in sample.get_columns():
+        chars = len(series.name)
+        if fixed := _fixed_type_chars(series.dtype):
+            widths.append(max(chars, fixed))
+            continue
+        try:
+            longest = series.cast(pl.String).str.len_chars().max()
+        except Exception:
+            # e.g. Object columns polars can't cast, these are rare and small
+            longest = max((len(str(v)) for v in series), default=0)
+        if series.null_count():
+            longest = max(longest or 0, len("None"))
+        widths.append(max(chars, int(longest or 0)))  # type:ignore
+    return widths
+
+
+class DataFrameModel(QAbstractTableModel):
+    """
+    A read only table model backed by a Polars DataFrame.
+
+    Cells are formatted in `data` as the view paints them, so the result
+    stays in columnar buffers rather than one QStandardItem per cell.
+    Filtering and sorting never copy the frame, they set a view of row
+    indices into it.
+    """
+
+    def __init__(
+        self,
+        frame: pl.DataFrame,
+        parent: QWidget | None = None,
+        complete: bool = False,
+        source: Tuple[str, str] | None = None,
+    ) -> None:
+        """
+        Args:
+            frame: The rows to show
+            complete: Whether the frame holds every row of its table or query,
+                so it can be searched without going back to the server
+            source: The (database, table) the frame was read from, None for
+                query results
+        """
+        super().__init__(parent)
+        self.complete = complete
+        self.source = source
+        self.set_frame(frame)
+
+    def set_frame(self, frame: pl.DataFrame) -> None:
+        self.frame = frame
+        # Only the columns the view paints are pulled out of the frame
+        self._columns: Dict[int, pl.Series] = {}
+        # Row indices into the frame, see `_update_view`
+        self._filter: pl.Series | None = None
+        self._order: pl.Series | None = None
+        self._rows: pl.Series | None = None
+        self.sort_keys: List[SortKey] = []
+        # Incremented for every sort, only the latest is applied
+        self._sort_generation = 0
+
+    def _column(self, column: int) -> pl.Series:
+        if (series := self._columns.get(column)) is None:
+            series = self._columns[column] = self.frame.to_series(column)
+        return series
+
+    def _update_view(self) -> None:
+        """
+        Combine the filtered rows and the sort order into the rows to show
+        """
+        if self._order is None:
+            self._rows = self._filter
+        elif self._filter is None:
+            self._rows = self._order
+        else:
+            self._rows = self._order.filter(self._order.is_in(self._filter))
+
+    def set_filter(self, rows: pl.Series | None) -> None:
+        """
+        Only show these rows of the frame (e.g. from `frame_ops.filter_rows`),
+        None to show every row
+        """
+        self.beginResetModel()
+        self._filter = rows
+        self._update_view()
+        self.endResetModel()
+
+    def append_frame(self, frame: pl.DataFrame) -> None:
+        """
+        Add rows after the existing ones, e.g. the next page of a search.
+        If the rows are sorted they are shown last until the sort is redone.
+        """
+        if frame.is_empty():
+            return
+        start = self.frame.height
+        # A page fetched without connectorx may infer narrower types
+        combined = pl.concat([self.frame, frame], how="vertical_relaxed")
+        added = pl.int_range(start, combined.height, dtype=pl.UInt32, eager=True)
+        if self._filter is not None:
+            # The new rows haven't been filtered, keep them out of view
+            self.beginResetModel()
+            self.frame = combined
+            self._columns.clear()
+            if self._order is not None:
+                self._order = pl.concat([self._order, added])
+            self._update_view()
+            self.endResetModel()
+        else:
+            first = self.rowCount()
+            self.beginInsertRows(QModelIndex(), first, first + frame.height - 1)
+            self.frame = combined
+            self._columns.clear()
+            if self._order is not None:
+                self._order = pl.concat([self._order, added])
+            self._update_view()
+            self.endInsertRows()
+        if self.sort_keys:
+            self._start_sort()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        if self._rows is not None:
+            return self._rows.len()
+        return self.frame.height
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return self.frame.width
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        row = index.row()
+        if self._rows is not None:
+            row = self._rows[row]
+        return str(self._column(index.column())[row])
+
+    def headerData(
+        self,
+        section: int,
+        orientation: Qt.Orientation,
+        role: int = Qt.ItemDataRole.DisplayRole,
+    ) -> Any:
+        if orientation == Qt.Orientation.Horizontal:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return self.frame.columns[section]
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return self._sort_tooltip(self.frame.columns[section])
+            return None
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return str(section + 1)
+
+    def _sort_tooltip(self, name: str) -> str | None:
+        for position, (column, descending) in enumerate(self.sort_keys, 1):
+            if column == name:
+                direction = "descending" if descending else "ascending"
+                return f"Sort key {position} ({direction}), shift click to add keys"
+        return None
+
+    def sort(
+        self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder
+    ) -> None:
+        """
+        Sort by a column, holding shift adds it to the existing sort.
+
+        The permutation is computed on a worker thread, the rows shown
+        change once it is ready.
+        """
+        if column < 0 or column >= self.frame.width:
+            return
+        key = (self.frame.columns[column], order == Qt.SortOrder.DescendingOrder)
+        shift = Qt.KeyboardModifier.ShiftModifier
+        if QApplication.keyboardModifiers() & shift:
+            keys = [k for k in self.sort_keys if k[0] != key[0]] + [key]
+            self.sort_keys = keys[-MAX_SORT_KEYS:]
+        else:
+            self.sort_keys = [key]
+
+        self._start_sort()
+
+    def _start_sort(self) -> None:
+        self._sort_generation += 1
+        worker = Worker(
+            _sort_job, self._sort_generation, self.frame, list(self.sort_keys)
+        )
+        worker.signals.finished.connect(self._apply_order)
+        QThreadPool.globalInstance().start(worker)
+
+    def _apply_order(self, result: Tuple[int, pl.Series]) -> None:
+        generation, order = result
+        if generation != self._sort_generation:
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._order = order
+        self._update_view()
+        self.layoutChanged.emit()
+
+
+def _sort_job(
+    generation: int, frame: pl.DataFrame, keys: List[SortKey]
+) -> Tuple[int, pl.Series]:
+    # Runs on a worker thread
+    return generation, sort_rows(frame, keys)
+
+
 class TableView(QTableView):
+    # Emitted with the columns that should be selected when the user shows
+    # or hides a column of a table (see `update_content`)
+    columns_changed = Signal(list)
+    # Emitted when the view is scrolled to its last rows, so more can be fetched
+    scrolled_to_end = Signal()
+
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__(parent)
         self.setSortingEnabled(True)
+        # All the columns of the table being shown, None for query results
+        self.all_columns: List[str] | None = None
+        header = self.horizontalHeader()
+        header.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        header.customContextMenuRequested.connect(self.show_header_menu)
+
+        # Columns are measured exactly only once they are scrolled into view
+        self._exactly_sized: set[int] = set()
+        self._size_timer = QTimer(self)
+        self._size_timer.setSingleShot(True)
+        self._size_timer.setInterval(50)
+        self._size_timer.timeout.connect(self._size_visible_columns)
+        self.horizontalScrollBar().valueChanged.connect(self._size_timer.start)
+        self.verticalScrollBar().valueChanged.connect(self._on_vertical_scroll)
+
+    def _on_vertical_scroll(self, value: int) -> None:
+        scroll_bar = self.verticalScrollBar()
+        if (
+            scroll_bar.maximum() > 0
+            and value >= scroll_bar.maximum() - FETCH_MARGIN_ROWS
+        ):
+            self.scrolled_to_end.emit()
+
+    def update_content(
+        self,
+        frame: pl.DataFrame,
+        all_columns: List[str] | None = None,
+        complete: bool = False,
+        source: Tuple[str, str] | None = None,
+    ) -> None:
+        """
+        Show a frame.
+
+        Args:
+            frame: The rows to show
+            all_columns: If the frame is a projection of a table, all of its
+                columns. Showing or hiding a column then emits
+                `columns_changed` so it can be re-queried, otherwise columns
+                are only hidden in the view.
+            complete: See `DataFrameModel`
+            source: See `DataFrameModel`
+        """
+        self.all_columns = all_columns
+        previous = self.model()
+        self.setModel(DataFrameModel(frame, self, complete=complete, source=source))
+        if previous is not None:
+            # The view is the parent, so old models (and frames) would pile up
+            previous.deleteLater()
+        # resizeColumnsToContents measures every cell of every column, which
+        # stalls on wide tables, so estimate and refine what's on screen
+        self._estimate_column_widths(frame)
+        self._size_timer.start()
+
+    def _estimate_column_widths(self, frame: pl.DataFrame) -> None:
+        self._exactly_sized.clear()
+        char_width = self.fontMetrics().averageCharWidth()
+        # Room for the padding and the sort indicator
+        padding = 2 * char_width + 16
+        for column, chars in enumerate(estimate_column_chars(frame)):
+            width = chars * char_width + padding
+            self.setColumnWidth(
+                column, min(max(width, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH)
+            )
+
+    def _size_visible_columns(self) -> None:
+        """
+        Size the columns in the viewport to their contents (of the visible rows)
+        """
+        if (model := self.model()) is None or not model.columnCount():
+            return
+        header = self.horizontalHeader()
+        first = header.visualIndexAt(0)
+        last = header.visualIndexAt(self.viewport().width() - 1)
+        if first < 0:
+            return
+        if last < 0:
+            last = model.columnCount() - 1
+        for visual in range(first, last + 1):
+            column = header.logicalIndex(visual)
+            if column in self._exactly_sized or self.isColumnHidden(column):
+                continue
+            self._exactly_sized.add(column)
+            width = max(self.sizeHintForColumn(column), header.sectionSizeHint(column))
+            self.setColumnWidth(column, min(width, MAX_COLUMN_WIDTH))
+
+    def resizeEvent(self, event) -> None:
+        super().resizeEvent(event)
+        self._size_timer.start()
+
+    def show_header_menu(self, position) -> None:
+        model = self.model()
+        if not isinstance(model, DataFrameModel):
+            return
+        header = self.horizontalHeader()
+        menu = QMenu(self)
+
+        section = header.logicalIndexAt(position)
+        if section >= 0:
+            name = model.frame.columns[section]
+            hide_action = menu.addAction(f"Hide {name}")
+            hide_action.triggered.connect(lambda: self._set_column_visible(name, False))
+        show_all_action = menu.addAction("Show All Columns")
+        show_all_action.triggered.connect(self._show_all_columns)
+
+        columns_menu = menu.addMenu("Columns")
+        for name in self.all_columns or model.frame.columns:
+            action = columns_menu.addAction(name)
+            action.setCheckable(True)
+            action.setChecked(self._is_column_visible(name))
+            # Bind name now, rather than the last value of the loop
+            action.toggled.connect(
+                lambda checked, name=name: self._set_column_visible(name, checked)
+            )
+
+        menu.exec(header.mapToGlobal(position))
+
+    def _is_column_visible(self, name: str) -> bool:
+        model = self.model()
+        assert isinstance(model, DataFrameModel)
+        if name not in model.frame.columns:
+            return False
+        return not self.isColumnHidden(model.frame.columns.index(name))
+
+    def _set_column_visible(self, name: str, visible: bool) -> None:
+        model = self.model()
+        assert isinstance(model, DataFrameModel)
+        if self.all_columns is None:
+            if name in model.frame.columns:
+                self.setColumnHidden(model.frame.columns.index(name), not visible)
+            return
 
-    def update_content(self, col_names: List[str], rows: List[List[Any]]) -> None:
-        model = QStandardItemModel()
-        model.setHorizontalHeaderLabels(col_names)
-
-        for row in rows:
-            items = [QStandardItem(str(item)) for item in row]
-            model.appendRow(items)
-
-        self.setModel(model)
-        self.resizeColumnsToContents()
+        shown = set(model.frame.columns)
+        if visible:
+            shown.add(name)
+        else:
+            shown.discard(name)
+        if shown:
+            self.columns_changed.emit([c for c in self.all_columns if c in shown])
+
+    def _show_all_columns(self) -> None:
+        if self.all_columns is not None:
+            self.columns_changed.emit(list(self.all_columns))
+        elif model := self.model():
+            for column in range(model.columnCount()):
+                self.setColumnHidden(column, False)
@@ -22,9 +22,13 @@ def postgres(
     ),
     openai_url: str = typer.Option("http://localhost:11434", help="OpenAI API URL"),
     limit: int = typer.Option(1000, help="Limit of rows to display"),
+    cache_mb: int = typer.Option(256, help="Memory for cached table pages (MB)"),
+    cache_ttl: float = typer.Option(300, help="Seconds before a cached page expires"),
 ) -> None:
     qt_app = QApplication(sys.argv)
-    conf = ConnectionConfig(host, port, username, password, openai_url, limit)
+    conf = ConnectionConfig(
+        host, port, username, password, openai_url, limit, cache_mb, cache_ttl
+    )
     main_window = MainWindow(conf)
     main_window.show()
     sys.exit(qt_app.exec())
@@ -6,8 +6,9 @@
 # *** External Imports
 import os
 import sys
-from typing import Tuple
-from PySide6.QtCore import QSettings, Qt
+import time
+from typing import Dict, List, Tuple
+from PySide6.QtCore import QSettings, Qt, QThreadPool, QTimer
 from PySide6.QtWidgets import (
     QApplication,
     QComboBox,
@@ -30,13 +31,41 @@ from warning_types import UserError
 from gui_components import DBTablesTree, TableView
 from data_types import ConnectionConfig, Pane, Database, Table, DBItemType
 from connection_widget import ConnectionWidget
-from database_manager.pgsql import DatabaseManager
+from database_manager.pgsql import EXPORT_WORKERS, DatabaseManager
 from warning_types import TreeWarning, issue_warning, OpenAIWarning
 from sql_query import DBTreeDisplay
 from search_bar import SearchWidget
 from sql_query import SQLQueryEditor
 from openai_query import OpenAIQueryManager
 from menu import MenuManager
+from result_cache import (
+    FrameCache,
+    ModificationCounts,
+    ModificationTracker,
+    PageKey,
+    QueryKey,
+)
+from sql_text import (
+    calls_volatile_function,
+    is_ddl,
+    is_query,
+    is_read_only,
+    referenced_tables,
+    split_statements,
+)
+from workers import Worker
+from global_search import GlobalSearchDialog
+from table_diff import TableDiffDialog
+from parquet_export import ParquetExportDialog
+from query_stream import QueryStream
+from script_runner import ScriptRunnerDialog
+from plan_viewer import PlanViewer
+from query_history import QueryHistory, QueryHistoryDialog
+from query_tabs import QueryTabs
+from sql_completion import SchemaIndex, changed_tables
+
+# How often pg_stat_user_tables is checked for writes by other sessions
+MODIFICATION_POLL_MS = 10_000
 
 # ** Main Function
 
@@ -120,12 +149,35 @@ class CustomCentralWidget(QWidget):
         self.open_ai_query_manager = OpenAIQueryManager(url=conf.openai_url)
         self.main_window = main_window
         self.setWindowTitle("PySide6 Minimal Example")
-        self._initialize_ui()
-        # Get first db_tree_item
-        self.on_different_db_selected(Database(name=self.db_tree.get_first_db()))
+        # Recently viewed table pages, neighbours are prefetched into this.
+        # Query and search results are kept in it too, see `QueryKey`
+        self.page_cache = FrameCache(conf.cache_mb * 1024**2, conf.cache_ttl)
+        # Tables written by other sessions are dropped from the cache
+        self.modification_tracker = ModificationTracker()
+        self.modification_timer = QTimer(self)
+        self.modification_timer.setInterval(MODIFICATION_POLL_MS)
+        self.modification_timer.timeout.connect(self._poll_table_modifications)
+        self.prefetch_pool = QThreadPool()
+        # A single thread so the prefetch connection is never shared
+        self.prefetch_pool.setMaxThreadCount(1)
+        self._prefetching: set[PageKey] = set()
+        # The schema of each database the editors complete from
+        self.completion_indexes: Dict[str, SchemaIndex] = {}
+        # Incremented on reconnecting, catalogs read before are dropped
+        self._catalog_generation = 0
+        # The generation of each database whose catalog is being read, so
+        # it is only read once however often it is asked for meanwhile
+        self._loading_completions: Dict[str, int] = {}
+        # Every query the user runs, with its timing
+        self.history = QueryHistory(main_window.settings, parent=self)  # type:ignore # (Can't Import MainWindow as circular)
         # Take random samples from the database
         self.random_sample: bool = False
         self.limit: int = conf.limit  # Default limit for table content
+        self._initialize_ui()
+        # Get first db_tree_item
+        self.on_different_db_selected(Database(name=self.db_tree.get_first_db()))
+        self._poll_table_modifications()
+        self.modification_timer.start()
 
     def _initialize_ui(self):
         self._setup_widgets()
@@ -144,6 +196,23 @@ class CustomCentralWidget(QWidget):
 
         self.output_text_edit = self._create_output_text_edit()
         self.table_view = TableView()
+        self.table_view.columns_changed.connect(self.on_table_columns_changed)
+        # Query results are streamed into the table view as they arrive
+        self.query_stream = QueryStream(self.table_view)
+        self.query_stream.completed.connect(self._on_query_streamed)
+        self.query_stream.page_loaded.connect(self._on_query_page_loaded)
+        self.query_stream.stopped.connect(self._on_query_stream_stopped)
+        self.query_stream.failed.connect(self._on_query_stream_failed)
+        # The cache key, tables and text of the query being streamed
+        # Tables are None if the result isn't cached, see `_is_cacheable`
+        self._streaming_query: Tuple[QueryKey, List[str] | None, str] | None = None
+        self.history.slow_query.connect(self._on_slow_query)
+        # Editors that run in parallel, each on its own connection
+        self.query_tabs = QueryTabs(self.db_manager, self.history, limit=self.limit)
+        self.query_tabs.statement_run.connect(self._on_script_statement)
+        self.query_tabs.completions_needed.connect(self.load_completions)
+        # The (database, table) whose contents are in the table view
+        self.shown_table: Tuple[str, str] | None = None
         self.connection_widget = ConnectionWidget(self.db_manager)
 
         self.query_edit = self._create_query_box()
@@ -192,23 +261,15 @@ class CustomCentralWidget(QWidget):
             if not file_path.endswith(".parquet"):
                 file_path += ".parquet"
 
-            # Call the export method
-            success = self.db_manager.export_table_to_parquet(
-                current_db, current_table, Path(file_path)
+            # Streamed in the background, see `ParquetExportDialog`
+            self.parquet_export_dialog = ParquetExportDialog(
+                self.db_manager,
+                current_db,
+                current_table,
+                Path(file_path),
+                self.main_window,
             )
-
-            if success:
-                QMessageBox.information(
-                    self.main_window,
-                    "Export Successful",
-                    f"Table '{current_table}' exported successfully to {file_path}",
-                )
-            else:
-                QMessageBox.warning(
-                    self.main_window,
-                    "Export Failed",
-                    f"Failed to export table '{current_table}'",
-                )
+            self.parquet_export_dialog.show()
 
     def import_table_from_parquet(self):
         # Get the currently selected database
@@ -266,22 +327,49 @@ class CustomCentralWidget(QWidget):
         directory = QFileDialog.getExistingDirectory(
             self.main_window, "Select Directory for Export"
         )
-        if directory:
-            success = self.db_manager.export_database_to_parquet(
-                current_db, Path(directory)
+        if not directory:
+            return
+        workers, ok = QInputDialog.getInt(
+            self.main_window,
+            "Export Database",
+            "Tables exported at once:",
+            EXPORT_WORKERS,
+            1,
+            max(os.cpu_count() or 1, EXPORT_WORKERS),
+        )
+        if not ok:
+            return
+        # The tables are read on connections of their own
+        worker = Worker(
+            self.db_manager.copy().export_database_to_parquet,
+            current_db,
+            Path(directory),
+            workers,
+        )
+        worker.signals.finished.connect(
+            lambda success: self._on_database_exported(current_db, directory, success)
+        )
+        QThreadPool.globalInstance().start(worker)
+        self.status_bar.showMessage(
+            f"Exporting database '{current_db}' to {directory}..."
+        )
+
+    def _on_database_exported(
+        self, database: str, directory: str, success: bool
+    ) -> None:
+        self.status_bar.clearMessage()
+        if success:
+            QMessageBox.information(
+                self.main_window,
+                "Export Successful",
+                f"Database '{database}' exported successfully to {directory}",
+            )
+        else:
+            QMessageBox.warning(
+                self.main_window,
+                "Export Failed",
+                f"Failed to export database '{database}'",
             )
-            if success:
-                QMessageBox.information(
-                    self.main_window,
-                    "Export Successful",
-                    f"Database '{current_db}' exported successfully to {directory}",
-                )
-            else:
-                QMessageBox.warning(
-                    self.main_window,
-                    "Export Failed",
-                    f"Failed to export database '{current_db}'",
-                )
 
     def create_database(self) -> Tuple[str, bool]:
         db_name, ok = QInputDialog.getText(
@@ -326,6 +414,31 @@ class CustomCentralWidget(QWidget):
                         f"Failed to import database '{db_name}' from {directory}",
                     )
 
+    # ****** Global Search
+    def show_global_search(self) -> None:
+        """
+        Search every table for a value, see `GlobalSearchDialog`
+        """
+        if not hasattr(self, "global_search_dialog"):
+            self.global_search_dialog = GlobalSearchDialog(
+                self.db_manager, self.get_current_database(), self.main_window
+            )
+            self.global_search_dialog.table_selected.connect(self.db_tree.select_table)
+        self.global_search_dialog.current_database = self.get_current_database()
+        self.global_search_dialog.show()
+        self.global_search_dialog.raise_()
+
+    def show_table_diff(self) -> None:
+        """
+        Compare two tables or queries, see `TableDiffDialog`
+        """
+        if not hasattr(self, "table_diff_dialog"):
+            self.table_diff_dialog = TableDiffDialog(
+                self.db_manager, self.get_current_database(), self.main_window
+            )
+        self.table_diff_dialog.show()
+        self.table_diff_dialog.raise_()
+
     # ****** AI Search
     def on_ai_search(self) -> None:
         print("---")
@@ -362,22 +475,330 @@ class CustomCentralWidget(QWidget):
         if table := self.db_tree.get_selected_table():
             return table
 
-    def execute_custom_query(self) -> None:
+    def execute_custom_query(self, use_cache: bool = True) -> None:
         """
         Excecutes a query from the query_edit box
         On the Database selected in the `db_tree`
         by passing it to `db_manager.execute_custom_query`
         Finally updates the `table_view` with the result
+
+        Results of queries that only read user tables are cached (see
+        `_is_cacheable`), `use_cache=False` runs the query regardless.
         """
         # TODO finish this and add to menu
         current_database = self.get_current_database()
         query = self.query_edit.toPlainText()
-        result = self.db_manager.execute_custom_query(current_database, query)
+        self.query_stream.cancel()
+        read_only = is_read_only(query)
+        cacheable = self._is_cacheable(current_database, query)
+        key = QueryKey.of(current_database, query)
+        if use_cache and cacheable and (frame := self.page_cache.get(key)) is not None:
+            self.shown_table = None
+            self.table_view.update_content(frame, complete=True)
+            self.status_bar.showMessage(
+                "Served from cache, Ctrl+Alt+E runs the query again"
+            )
+            return
+
+        if read_only and is_query(query):
+            # Show the first rows as soon as they arrive, only the first
+            # `limit` of them are fetched unless more are asked for. Only a
+            # single query can be declared as a cursor, see `is_query`.
+            self.shown_table = None
+            tables = list(referenced_tables(query) or ()) if cacheable else None
+            self._streaming_query = (key, tables, query)
+            self.query_stream.start(
+                self.query_db_manager, current_database, query, limit=self.limit
+            )
+            return
+
+        started = time.perf_counter()
+        result = self.db_manager.fetch_frame(current_database, query)
+        duration = time.perf_counter() - started
+        if isinstance(result, str):
+            error = result if result.startswith("Error") else None
+            self.history.record(current_database, query, duration, error=error)
+        else:
+            self.history.record(
+                current_database,
+                query,
+                duration,
+                result.height,
+                result.estimated_size(),
+            )
+        if not read_only:
+            # The statement may have modified tables, don't show stale pages
+            self._invalidate_written_tables(current_database, query)
 
         # TODO should this be a method?
-        if isinstance(result, tuple) and len(result) == 2:
-            columns, rows = result
-            self.table_view.update_content(columns, [list(row) for row in rows])
+        if isinstance(result, str):
+            self.output_text_edit.append(result)
+        else:
+            if cacheable:
+                tables = [(current_database, t) for t in referenced_tables(query) or ()]
+                self.page_cache.put(key, result, tables=tables)
+            self.shown_table = None
+            self.table_view.update_content(result, complete=True)
+            self.status_bar.showMessage(f"{result.height:,} rows")
+
+    def _is_cacheable(self, database: str, query: str) -> bool:
+        """
+        Whether a query's result can be answered from the cache: it only
+        reads user tables whose writes the modification poll notices, all
+        of them known (see `referenced_tables`), and calls no function whose
+        result changes on its own (e.g. now())
+        """
+        if not (tables := referenced_tables(query)):
+            return False
+        return (
+            is_read_only(query)
+            and not calls_volatile_function(query)
+            and self.modification_tracker.tracks(database, tables)
+        )
+
+    def explain_query(self, analyze: bool = False) -> None:
+        """
+        Show the plan of the query box's query, see `PlanViewer`
+        """
+        if not hasattr(self, "plan_viewer"):
+            self.plan_viewer = PlanViewer(self.db_manager, self.main_window)
+        self.plan_viewer.show()
+        self.plan_viewer.raise_()
+        self.plan_viewer.explain(
+            self.get_current_database(), self.query_edit.toPlainText(), analyze
+        )
+
+    def run_script(self) -> None:
+        """
+        Run the query box as a script of statements, see `ScriptRunnerDialog`
+        """
+        if not hasattr(self, "script_runner_dialog"):
+            self.script_runner_dialog = ScriptRunnerDialog(
+                self.db_manager, self.history, self.main_window
+            )
+            self.script_runner_dialog.statement_run.connect(self._on_script_statement)
+        self.script_runner_dialog.show()
+        self.script_runner_dialog.raise_()
+        self.script_runner_dialog.run(
+            self.get_current_database(), self.query_edit.toPlainText()
+        )
+
+    def new_query_tab(self) -> None:
+        """
+        Open a query tab with the query box's text, see `QueryTabs`
+        """
+        self.query_tabs.new_tab(
+            self.get_current_database(), self.query_edit.toPlainText()
+        )
+
+    def _on_script_statement(self, database: str, statement: str) -> None:
+        # A batch of statements is reported as one
+        for part in split_statements(statement):
+            if not is_read_only(part):
+                self._invalidate_written_tables(database, part)
+
+    def _on_query_streamed(self, frame) -> None:
+        if self._streaming_query:
+            key, tables, query = self._streaming_query
+            if tables is not None:
+                self.page_cache.put(
+                    key, frame, tables=[(key.database, t) for t in tables]
+                )
+            self.history.record(
+                key.database,
+                query,
+                self.query_stream.elapsed,
+                frame.height,
+                frame.estimated_size(),
+            )
+            self._streaming_query = None
+
+    def _on_query_page_loaded(self, frame) -> None:
+        # Not cached, only a complete result can answer the query again
+        if self._streaming_query:
+            key, _, query = self._streaming_query
+            self.history.record(
+                key.database,
+                query,
+                self.query_stream.elapsed,
+                frame.height if frame is not None else 0,
+                frame.estimated_size() if frame is not None else None,
+            )
+        self.status_bar.showMessage(
+            f"First {self.query_stream.rows:,} rows, more are available"
+        )
+
+    def _on_query_stream_stopped(self, frame) -> None:
+        if self._streaming_query:
+            key, _, query = self._streaming_query
+            # Kept out of the timing statistics, it didn't run to the end
+            self.history.record(
+                key.database,
+                query,
+                self.query_stream.elapsed,
+                frame.height if frame is not None else 0,
+                error="Stopped",
+            )
+            self._streaming_query = None
+
+    def _on_query_stream_failed(self, error: str) -> None:
+        if self._streaming_query:
+            key, _, query = self._streaming_query
+            self.history.record(
+                key.database, query, self.query_stream.elapsed, error=error
+            )
+            self._streaming_query = None
+        self.output_text_edit.append(error)
+
+    def _on_slow_query(self, database: str, query: str, duration_ms: float) -> None:
+        self.output_text_edit.append(
+            f"Slow query, {duration_ms:,.0f} ms on {database}: {' '.join(query.split())}"
+        )
+
+    def show_query_history(self) -> None:
+        """
+        List past queries and their timings, see `QueryHistoryDialog`
+        """
+        if not hasattr(self, "query_history_dialog"):
+            self.query_history_dialog = QueryHistoryDialog(
+                self.history, self.main_window
+            )
+            self.query_history_dialog.query_selected.connect(
+                self.query_edit.setPlainText
+            )
+        self.query_history_dialog.refresh()
+        self.query_history_dialog.show()
+        self.query_history_dialog.raise_()
+
+    def _invalidate_written_tables(self, database: str, query: str) -> None:
+        tables = referenced_tables(query)
+        if is_ddl(query):
+            self._refresh_completions(database, changed_tables(query))
+        if is_ddl(query) or not tables:
+            self.page_cache.invalidate_database(database)
+            self.db_manager.invalidate_field_cache(database)
+        else:
+            self.page_cache.invalidate_tables(database, tables)
+
+    def load_completions(self, database: str) -> None:
+        """
+        Give the editors the schema of `database` to complete from, read
+        from the catalog in the background the first time
+        """
+        if (index := self.completion_indexes.get(database)) is not None:
+            self._set_completion_index(database, index)
+            return
+        generation = self._catalog_generation
+        if self._loading_completions.get(database) == generation:
+            return
+        self._loading_completions[database] = generation
+        worker = Worker(
+            self._read_completion_index,
+            self.prefetch_db_manager,
+            database,
+            generation,
+        )
+        worker.signals.finished.connect(self._on_completion_index)
+        worker.signals.error.connect(
+            lambda _error: self._completions_loaded(database, generation)
+        )
+        self.prefetch_pool.start(worker)
+
+    def _completions_loaded(self, database: str, generation: int) -> None:
+        if self._loading_completions.get(database) == generation:
+            del self._loading_completions[database]
+
+    def _read_completion_index(
+        self, db_manager: DatabaseManager, database: str, generation: int
+    ) -> Tuple[str, SchemaIndex | None, int]:
+        # Runs on the prefetch thread, must not touch any widgets
+        columns, functions = db_manager.get_completion_catalog(database)
+        if not columns and not functions:
+            return database, None, generation
+        return database, SchemaIndex(columns, functions), generation
+
+    def _on_completion_index(self, result: Tuple[str, SchemaIndex | None, int]) -> None:
+        database, index, generation = result
+        self._completions_loaded(database, generation)
+        if index is None or generation != self._catalog_generation:
+            return
+        self.completion_indexes[database] = index
+        self._set_completion_index(database, index)
+
+    def _set_completion_index(self, database: str, index: SchemaIndex) -> None:
+        if database == self.get_current_database():
+            self.query_edit.completion_index = index
+        self.query_tabs.set_completion_index(database, index)
+
+    def _refresh_completions(self, database: str, tables: set[str] | None) -> None:
+        """
+        Update the completions after DDL, re-reading only the changed tables'
+        columns when the statement is limited to tables
+        """
+        if database not in self.completion_indexes:
+            return
+        if tables is None:
+            del self.completion_indexes[database]
+            # A read already running may predate the DDL
+            self._loading_completions.pop(database, None)
+            self.load_completions(database)
+            return
+        worker = Worker(
+            self._read_table_columns,
+            self.prefetch_db_manager,
+            database,
+            tables,
+            self._catalog_generation,
+        )
+        worker.signals.finished.connect(self._on_table_columns)
+        self.prefetch_pool.start(worker)
+
+    def _read_table_columns(
+        self,
+        db_manager: DatabaseManager,
+        database: str,
+        tables: set[str],
+        generation: int,
+    ) -> Tuple[str, Dict[str, List[str]], int]:
+        # Runs on the prefetch thread, must not touch any widgets
+        columns = {
+            table: [
+                field.name for field in db_manager.get_table_fields(database, table)
+            ]
+            for table in tables
+        }
+        return database, columns, generation
+
+    def _on_table_columns(self, result: Tuple[str, Dict[str, List[str]], int]) -> None:
+        database, columns, generation = result
+        index = self.completion_indexes.get(database)
+        if index is None or generation != self._catalog_generation:
+            return
+        for table, names in columns.items():
+            if names:
+                index.set_table(table, names)
+            else:
+                # Dropped
+                index.remove_table(table)
+
+    def _poll_table_modifications(self) -> None:
+        if database := self.db_manager.current_database:
+            worker = Worker(
+                self._read_modification_counts, self.prefetch_db_manager, database
+            )
+            worker.signals.finished.connect(self._on_modification_counts)
+            self.prefetch_pool.start(worker)
+
+    def _read_modification_counts(
+        self, db_manager: DatabaseManager, database: str
+    ) -> Tuple[str, ModificationCounts]:
+        # Runs on the prefetch thread, must not touch any widgets
+        return database, db_manager.get_table_modification_counts(database)
+
+    def _on_modification_counts(self, result: Tuple[str, ModificationCounts]) -> None:
+        database, counts = result
+        if changed := self.modification_tracker.changed_tables(database, counts):
+            self.page_cache.invalidate_tables(database, changed)
 
     # ****** Field Tree
     # ******* On Changed
@@ -402,6 +823,14 @@ class CustomCentralWidget(QWidget):
     def update_db_tree(self) -> None:
         connection_info = self.connection_widget.get_connection_info()
         self.db_manager.configure_connection(**connection_info)
+        self.prefetch_db_manager = self.db_manager.copy()
+        self.query_stream.cancel()
+        self.query_db_manager = self.db_manager.copy()
+        self.page_cache.clear()
+        self.modification_tracker.clear()
+        self.db_manager.invalidate_field_cache()
+        self.completion_indexes.clear()
+        self._catalog_generation += 1
         try:
             databases = self.db_manager.list_databases()
             tables_dict = {db: self.db_manager.list_tables(db) for db in databases}
@@ -457,10 +886,13 @@ class CustomCentralWidget(QWidget):
         self.output_text_edit.clear()
         self.output_text_edit.append(f"Contents of database {database}:")
         self.table_view.setModel(None)
+        self.shown_table = None
         self.status_bar.showMessage(f"Selected database: {database}")
         self.field_tree.populate(database)
 
         self.query_edit.set_default_query(database)
+        self.query_edit.completion_index = None
+        self.load_completions(database.name)
 
     def on_different_table_selected(self, table: Table) -> None:
         if self._did_db_change(table.parent_db):
@@ -477,19 +909,111 @@ class CustomCentralWidget(QWidget):
         return False
 
     # ****** Table
-    def show_table_contents(self, dbname: str, table_name: str) -> None:
-        col_names, rows, success = self.db_manager.get_table_contents(
-            dbname, table_name, limit=self.limit, random=self.random_sample
-        )
+    def refresh_table_contents(self) -> None:
+        """
+        Re-query the selected table, bypassing the page cache
+        """
+        if table_name := self.get_current_table():
+            self.show_table_contents(
+                self.get_current_database(), table_name, refresh=True
+            )
+
+    # ******* Column Sets
+    def _column_set_key(self, dbname: str, table_name: str) -> str:
+        return f"columns/{dbname}/{table_name}"
+
+    def load_column_set(self, dbname: str, table_name: str) -> List[str]:
+        """
+        The columns saved for a table, an empty list for all columns
+        """
+        settings = self.main_window.settings  # type:ignore # (Can't Import MainWindow as circular)
+        value = settings.value(self._column_set_key(dbname, table_name), [])
+        # QSettings can hand back a single element list as a plain string
+        if isinstance(value, str):
+            return [value]
+        return list(value or [])
+
+    def save_column_set(
+        self, dbname: str, table_name: str, columns: List[str] | None
+    ) -> None:
+        settings = self.main_window.settings  # type:ignore # (Can't Import MainWindow as circular)
+        key = self._column_set_key(dbname, table_name)
+        if columns:
+            settings.setValue(key, columns)
+        else:
+            settings.remove(key)
+
+    def on_table_columns_changed(self, columns: List[str]) -> None:
+        """
+        Re-query the shown table with the columns the user chose
+        """
+        if not self.shown_table:
+            return
+        dbname, table_name = self.shown_table
+        if columns == self.table_view.all_columns:
+            columns = []
+        self.save_column_set(dbname, table_name, columns)
+        self.show_table_contents(dbname, table_name)
+
+    def _page_key(self, dbname: str, table_name: str) -> PageKey:
+        columns = tuple(self.load_column_set(dbname, table_name))
+        return PageKey(dbname, table_name, limit=self.limit, columns=columns)
+
+    def show_table_contents(
+        self, dbname: str, table_name: str, refresh: bool = False
+    ) -> None:
+        # The table replaces any query results still arriving
+        self.query_stream.cancel()
+        key = self._page_key(dbname, table_name)
+        # Random samples are meant to change, never cache them
+        use_cache = not self.random_sample
+        frame = self.page_cache.get(key) if use_cache and not refresh else None
+        if frame is not None:
+            success = True
+        else:
+            frame, success = self.db_manager.get_table_frame(
+                dbname,
+                table_name,
+                limit=self.limit,
+                random=self.random_sample,
+                columns=list(key.columns) or None,
+            )
+            if not success and key.columns:
+                # The saved columns may no longer exist. Any other failure
+                # (e.g. a dropped connection) keeps them for the next attempt
+                existing = {
+                    f.name for f in self.db_manager.get_table_fields(dbname, table_name)
+                }
+                remaining = [c for c in key.columns if c in existing]
+                if existing and len(remaining) < len(key.columns):
+                    self.save_column_set(dbname, table_name, remaining or None)
+                    return self.show_table_contents(dbname, table_name, refresh)
+            if success and use_cache:
+                self.page_cache.put(key, frame, tables=[(dbname, table_name)])
+        if use_cache:
+            self._prefetch_neighbouring_tables(dbname)
         if success:
-            self.table_view.update_content(col_names, rows)
+            # Hidden columns aren't in the frame, list them so they can be shown
+            if key.columns:
+                fields = self.db_manager.get_table_fields(dbname, table_name)
+                all_columns = [f.name for f in fields]
+            else:
+                all_columns = frame.columns
+            self.shown_table = (dbname, table_name)
+            self.table_view.update_content(
+                frame,
+                all_columns,
+                # A short page is the whole table, search it in memory
+                complete=frame.height < self.limit,
+                source=self.shown_table,
+            )
             self.output_text_edit.clear()
-            if rows:
+            if frame.height:
                 self.output_text_edit.append(
                     f"Contents of {table_name} (first 5 rows):"
                 )
-                for row in rows[:5]:
-                    self.output_text_edit.append(f"  - {row}")
+                for row in frame.head(5).iter_rows():
+                    self.output_text_edit.append(f"  - {list(row)}")
                 # TODO Dump the schema, refactor pgsql `get_tables_and_fields_and_types`
                 # to also have a get_tables_and_fields_method
             else:
@@ -503,6 +1027,34 @@ class CustomCentralWidget(QWidget):
             self.output_text_edit.append(f"Error: Table {table_name} does not exist.")
             self.status_bar.showMessage(f"Error: Table {table_name} not found")
             self.table_view.setModel(None)
+            self.shown_table = None
+
+    def _prefetch_neighbouring_tables(self, dbname: str) -> None:
+        """
+        Load the first page of the tables above and below the selection in the
+        background, so moving through the tree with the keyboard is instant
+        """
+        for table_name in self.db_tree.get_neighbouring_tables():
+            key = self._page_key(dbname, table_name)
+            if key in self._prefetching or key in self.page_cache:
+                continue
+            self._prefetching.add(key)
+            worker = Worker(self._prefetch_page, self.prefetch_db_manager, key)
+            self.prefetch_pool.start(worker)
+
+    def _prefetch_page(self, db_manager: DatabaseManager, key: PageKey) -> None:
+        # Runs on the prefetch thread, must not touch any widgets
+        try:
+            frame, success = db_manager.get_table_frame(
+                key.database,
+                key.table,
+                limit=key.limit,
+                columns=list(key.columns) or None,
+            )
+            if success:
+                self.page_cache.put(key, frame, tables=[(key.database, key.table)])
+        finally:
+            self._prefetching.discard(key)
 
     # ***** Layout Builders
 
@@ -524,9 +1076,10 @@ class CustomCentralWidget(QWidget):
 
         lower_pane = QSplitter(Qt.Orientation.Vertical)
         lower_pane.addWidget(left_sidebars)
+        lower_pane.addWidget(self.query_tabs)
         lower_pane.addWidget(self.output_text_edit)
         lower_pane.setHandleWidth(handle_size)
-        lower_pane.setSizes([400, 100])
+        lower_pane.setSizes([400, 300, 100])
 
         # Store the panes as an attribute so they can be
         # manipulated by menu items
@@ -547,6 +1100,11 @@ class CustomCentralWidget(QWidget):
                 widget=self.right_sidebar,
                 last_state=self.right_sidebar.isVisible(),
             ),
+            "query_tabs": Pane(
+                label="Query Tabs",
+                widget=self.query_tabs,
+                last_state=self.query_tabs.isVisible(),
+            ),
             "output": Pane(
                 label="Output",
                 widget=self.output_text_edit,
@@ -583,7 +1141,15 @@ class CustomCentralWidget(QWidget):
         return query_box
 
     def _create_search_bar(self):
-        search_bar = SearchWidget(self.db_manager, self.db_tree, self.table_view)
+        search_bar = SearchWidget(
+            self.db_manager,
+            self.db_tree,
+            self.table_view,
+            limit=self.limit,
+            cache=self.page_cache,
+            history=self.history,
+            cacheable=self._is_cacheable,
+        )
 
         return search_bar
 
@@ -615,6 +1181,7 @@ class CustomCentralWidget(QWidget):
         layout = QVBoxLayout()
         layout.addWidget(self.connection_widget)
         layout.addWidget(search_bar_widget)
+        layout.addWidget(self.query_stream)
         layout.addWidget(self.table_view)
 
         widget = QWidget()
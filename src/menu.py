@@ -66,6 +66,7 @@ class MenuManager:
             "field_tree": "F2",
             "right_sidebar": "F3",
             "output": "F4",
+            "query_tabs": "F6",
         }
 
         # Update the key attribute for each pane.
@@ -101,6 +102,50 @@ class MenuManager:
                     "Ctrl+E",
                     callback=lambda: self.central_widget.execute_custom_query(),
                 ),
+                "E&xplain Query": self._action_builder(
+                    "Ctrl+Alt+X",
+                    callback=lambda: self.central_widget.explain_query(analyze=False),
+                ),
+                "Explain A&nalyze Query": self._action_builder(
+                    "Ctrl+Alt+A",
+                    callback=lambda: self.central_widget.explain_query(analyze=True),
+                ),
+                "New &Query Tab": self._action_builder(
+                    "Ctrl+T",
+                    callback=self.central_widget.new_query_tab,
+                ),
+                "Run as &Script": self._action_builder(
+                    "Ctrl+Alt+R",
+                    callback=self.central_widget.run_script,
+                ),
+                "Execute Query (&Bypass Cache)": self._action_builder(
+                    "Ctrl+Alt+E",
+                    callback=lambda: self.central_widget.execute_custom_query(
+                        use_cache=False
+                    ),
+                ),
+                "Search Again (Bypass Cache)": self._action_builder(
+                    "Ctrl+Alt+F",
+                    callback=lambda: self.central_widget.search_bar.search_db(
+                        use_cache=False
+                    ),
+                ),
+                "Query &History": self._action_builder(
+                    "Ctrl+Shift+H",
+                    callback=self.central_widget.show_query_history,
+                ),
+                "Re&fresh Table": self._action_builder(
+                    "F5",
+                    callback=self.central_widget.refresh_table_contents,
+                ),
+                "&Global Search": self._action_builder(
+                    "Ctrl+Shift+F",
+                    callback=self.central_widget.show_global_search,
+                ),
+                "&Compare Tables": self._action_builder(
+                    "Ctrl+Alt+D",
+                    callback=self.central_widget.show_table_diff,
+                ),
                 "&AI Search": self._action_builder(
                     "Ctrl+R",
                     callback=lambda: self.central_widget.on_ai_search(),
@@ -0,0 +1,150 @@
+from pathlib import Path
+
+from PySide6.QtCore import QThreadPool
+from PySide6.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QFormLayout,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QSpinBox,
+    QVBoxLayout,
+    QWidget,
+)
+
+from database_manager.pgsql import (
+    PARQUET_COMPRESSIONS,
+    DatabaseManager,
+    ExportProgress,
+    ParquetExportOptions,
+)
+from workers import StreamWorker
+
+
+class ParquetExportDialog(QDialog):
+    """
+    Export a table to a Parquet file in row groups (see
+    `DatabaseManager.stream_table_to_parquet`), showing the rows written and
+    the throughput as it goes
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        database: str,
+        table: str,
+        path: Path,
+        parent: QWidget | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.setWindowTitle(f"Export {table} to Parquet")
+        self.database = database
+        self.table = table
+        self.path = path
+        # The export runs on a connection of its own
+        self.db_manager = db_manager.copy()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self._worker: StreamWorker | None = None
+        self.initUI()
+
+    def initUI(self) -> None:
+        layout = QVBoxLayout()
+        defaults = ParquetExportOptions()
+
+        form = QFormLayout()
+        self.compression = QComboBox()
+        self.compression.addItems(PARQUET_COMPRESSIONS)
+        self.compression.setCurrentText(defaults.compression)
+        self.row_group_rows = QSpinBox()
+        self.row_group_rows.setRange(1_000, 10_000_000)
+        self.row_group_rows.setSingleStep(16 * 1024)
+        self.row_group_rows.setValue(defaults.row_group_rows)
+        self.row_group_rows.setToolTip(
+            "Rows in each row group, the unit readers skip or read in parallel"
+        )
+        self.memory_mb = QSpinBox()
+        self.memory_mb.setRange(16, 64 * 1024)
+        self.memory_mb.setSuffix(" MB")
+        self.memory_mb.setValue(defaults.memory_mb)
+        self.memory_mb.setToolTip(
+            "Rows are written out before those held in memory exceed this"
+        )
+        form.addRow("File:", QLabel(str(self.path)))
+        form.addRow("Compression:", self.compression)
+        form.addRow("Rows per row group:", self.row_group_rows)
+        form.addRow("Memory limit:", self.memory_mb)
+        layout.addLayout(form)
+
+        buttons = QHBoxLayout()
+        self.export_button = QPushButton("Export")
+        self.export_button.clicked.connect(self.export)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel)
+        self.cancel_button.setEnabled(False)
+        buttons.addWidget(self.export_button)
+        buttons.addWidget(self.cancel_button)
+        layout.addLayout(buttons)
+
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        self.setLayout(layout)
+
+    def export(self) -> None:
+        options = ParquetExportOptions(
+            compression=self.compression.currentText(),
+            row_group_rows=self.row_group_rows.value(),
+            memory_mb=self.memory_mb.value(),
+        )
+        worker = StreamWorker(
+            self.db_manager.stream_table_to_parquet,
+            self.database,
+            self.table,
+            self.path,
+            options,
+        )
+        worker.signals.item.connect(self._on_progress)
+        worker.signals.finished.connect(self._on_finished)
+        worker.signals.error.connect(self._on_error)
+        self._worker = worker
+        self.thread_pool.start(worker)
+        self.status_label.setText("Exporting...")
+        self.export_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+
+    def cancel(self) -> None:
+        if worker := self._worker:
+            worker.stop()
+            self.db_manager.cancel()
+
+    def _on_progress(self, progress: ExportProgress) -> None:
+        elapsed = max(progress.elapsed, 1e-6)
+        self.status_label.setText(
+            f"{progress.rows:,} rows in {progress.elapsed:.1f}s, "
+            f"{progress.rows / elapsed:,.0f} rows/s, "
+            f"{progress.size_bytes / 1024**2 / elapsed:,.1f} MB/s"
+        )
+
+    def _on_finished(self, complete: bool) -> None:
+        self._worker = None
+        self.cancel_button.setEnabled(False)
+        if complete:
+            self.status_label.setText(
+                f"{self.status_label.text()}\nExported '{self.table}' to {self.path}"
+            )
+        else:
+            self.export_button.setEnabled(True)
+            self.status_label.setText("Cancelled")
+
+    def _on_error(self, error: str) -> None:
+        self._worker = None
+        self.export_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.status_label.setText(f"Failed to export '{self.table}': {error}")
+
+    def closeEvent(self, event) -> None:
+        self.cancel()
+        super().closeEvent(event)
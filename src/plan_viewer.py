@@ -0,0 +1,242 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from PySide6.QtCore import QThreadPool
+from PySide6.QtGui import QBrush, QColor
+from PySide6.QtWidgets import (
+    QDialog,
+    QLabel,
+    QTreeWidget,
+    QTreeWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from database_manager.pgsql import DatabaseManager
+from workers import Worker
+
+# Nodes with at least this share of the total self time are hotspots
+HOTSPOT_SHARE = 0.1
+# Row estimates off by this factor or more are flagged
+ESTIMATE_ERROR_FACTOR = 10
+
+# Plan keys shown as the node's detail, in this order
+DETAIL_KEYS = [
+    "Index Cond",
+    "Hash Cond",
+    "Merge Cond",
+    "Join Filter",
+    "Filter",
+    "Sort Key",
+    "Group Key",
+    "Recheck Cond",
+]
+
+PLAN_COLUMNS = ["Node", "Self", "Self %", "Rows", "Estimate", "Buffers", "Detail"]
+
+
+@dataclass
+class PlanStats:
+    """
+    One node of a plan, with what it cost on its own
+    """
+
+    node: Dict[str, Any]
+    # Milliseconds with ANALYZE, otherwise planner cost units
+    self_cost: float
+    # Actual over estimated rows, None without ANALYZE
+    estimate_ratio: float | None
+    children: List["PlanStats"] = field(default_factory=list)
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def _inclusive(node: Dict[str, Any], analyzed: bool) -> float:
+    if analyzed:
+        # Times are averaged over loops, parallel workers count as loops
+        return node.get("Actual Total Time", 0.0) * node.get("Actual Loops", 1)
+    return node.get("Total Cost", 0.0)
+
+
+def plan_stats(node: Dict[str, Any], analyzed: bool) -> PlanStats:
+    """
+    Work out each node's own cost (its total less its children's) and how far
+    off its row estimate was
+    """
+    children = [plan_stats(child, analyzed) for child in node.get("Plans", [])]
+    self_cost = _inclusive(node, analyzed) - sum(
+        _inclusive(child.node, analyzed) for child in children
+    )
+    ratio = None
+    if analyzed and node.get("Actual Loops", 0):
+        # Plan Rows is per loop too
+        loops = node["Actual Loops"]
+        actual = node.get("Actual Rows", 0) * loops
+        estimated = node.get("Plan Rows", 0) * loops
+        ratio = max(actual, 1) / max(estimated, 1)
+    return PlanStats(node, max(self_cost, 0.0), ratio, children)
+
+
+def describe_node(node: Dict[str, Any]) -> str:
+    text = node.get("Node Type", "?")
+    if join := node.get("Join Type"):
+        text = f"{join} {text}"
+    if relation := node.get("Relation Name"):
+        text += f" on {relation}"
+        if (alias := node.get("Alias")) and alias != relation:
+            text += f" {alias}"
+    if index := node.get("Index Name"):
+        text += f" using {index}"
+    return text
+
+
+def describe_estimate(ratio: float | None) -> str:
+    if ratio is None:
+        return ""
+    if ratio >= 1:
+        return f"{ratio:,.0f}x under" if ratio >= 2 else "ok"
+    return f"{1 / ratio:,.0f}x over" if ratio <= 0.5 else "ok"
+
+
+def describe_buffers(node: Dict[str, Any]) -> str:
+    """
+    Shared buffers hit and read, including the node's children
+    """
+    if "Shared Hit Blocks" not in node:
+        return ""
+    text = f"hit {node['Shared Hit Blocks']:,} read {node['Shared Read Blocks']:,}"
+    if temp := node.get("Temp Written Blocks"):
+        text += f" temp {temp:,}"
+    return text
+
+
+class PlanViewer(QDialog):
+    """
+    Show the plan of a query as a tree, with the time (or cost) each node
+    took on its own, how far off its row estimate was and its buffer use.
+    The nodes the query spent most of its time in are highlighted.
+    """
+
+    def __init__(
+        self, db_manager: DatabaseManager, parent: QWidget | None = None
+    ) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Query Plan")
+        self.db_manager = db_manager
+        self.explain_db_manager = db_manager.copy()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        # Incremented for every explain, late plans of older ones are dropped
+        self._generation = 0
+        self.initUI()
+
+    def initUI(self) -> None:
+        layout = QVBoxLayout()
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        layout.addWidget(self.summary_label)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(PLAN_COLUMNS)
+        self.tree.setAlternatingRowColors(True)
+        layout.addWidget(self.tree)
+        self.resize(1000, 600)
+        self.setLayout(layout)
+
+    def explain(self, database: str, query: str, analyze: bool) -> None:
+        """
+        Plan the query on `database`, running it too if `analyze`
+        """
+        self.explain_db_manager.cancel()
+        self._generation += 1
+        generation = self._generation
+        if not self.explain_db_manager.same_server(self.db_manager):
+            self.explain_db_manager = self.db_manager.copy()
+        self.tree.clear()
+        self.summary_label.setText(
+            "Running the query, changes will be rolled back..."
+            if analyze
+            else "Planning..."
+        )
+        worker = Worker(self.explain_db_manager.explain, database, query, analyze)
+        worker.signals.finished.connect(
+            lambda plan: self._on_plan(generation, plan, analyze)
+        )
+        worker.signals.error.connect(self.summary_label.setText)
+        self.thread_pool.start(worker)
+
+    def _on_plan(
+        self, generation: int, plan: str | Dict[str, Any], analyzed: bool
+    ) -> None:
+        if generation != self._generation:
+            return
+        if isinstance(plan, str):
+            self.summary_label.setText(plan)
+            return
+        root = plan_stats(plan["Plan"], analyzed)
+        total = sum(stats.self_cost for stats in root.walk()) or 1.0
+        self._add_node(self.tree, root, total, analyzed)
+        self.tree.expandAll()
+        for column in range(len(PLAN_COLUMNS) - 1):
+            self.tree.resizeColumnToContents(column)
+
+        if analyzed:
+            self.summary_label.setText(
+                f"Planning {plan.get('Planning Time', 0):,.2f} ms, "
+                f"execution {plan.get('Execution Time', 0):,.2f} ms. "
+                "Self time excludes child nodes, highlighted nodes took at "
+                f"least {HOTSPOT_SHARE:.0%} of it."
+            )
+        else:
+            self.summary_label.setText(
+                f"Estimated cost {root.node.get('Total Cost', 0):,.2f}. "
+                "Without ANALYZE self is the planner's cost, not time."
+            )
+
+    def _add_node(
+        self,
+        parent: QTreeWidget | QTreeWidgetItem,
+        stats: PlanStats,
+        total: float,
+        analyzed: bool,
+    ) -> None:
+        node = stats.node
+        share = stats.self_cost / total
+        if analyzed:
+            rows = f"{node.get('Actual Rows', 0):,} of {node.get('Plan Rows', 0):,}"
+            self_text = f"{stats.self_cost:,.2f} ms"
+        else:
+            rows = f"{node.get('Plan Rows', 0):,}"
+            self_text = f"{stats.self_cost:,.2f}"
+        if (loops := node.get("Actual Loops", 1)) > 1:
+            rows += f" x{loops:,}"
+        detail = "; ".join(f"{key}: {node[key]}" for key in DETAIL_KEYS if key in node)
+        item = QTreeWidgetItem(
+            parent,
+            [
+                describe_node(node),
+                self_text,
+                f"{share:.1%}",
+                rows,
+                describe_estimate(stats.estimate_ratio),
+                describe_buffers(node),
+                detail,
+            ],
+        )
+        item.setToolTip(PLAN_COLUMNS.index("Detail"), detail)
+        if share >= HOTSPOT_SHARE:
+            # Redder the more of the query's time the node took
+            color = QBrush(QColor(255, 0, 0, int(40 + 160 * share)))
+            for column in range(len(PLAN_COLUMNS)):
+                item.setBackground(column, color)
+        ratio = stats.estimate_ratio
+        if ratio is not None and (
+            ratio >= ESTIMATE_ERROR_FACTOR or ratio <= 1 / ESTIMATE_ERROR_FACTOR
+        ):
+            item.setForeground(
+                PLAN_COLUMNS.index("Estimate"), QBrush(QColor(230, 120, 0))
+            )
+        for child in stats.children:
+            self._add_node(item, child, total, analyzed)
@@ -0,0 +1,336 @@
+"""
+A local record of every query the user runs, for spotting slow queries and
+performance regressions over time.
+"""
+
+import math
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List
+
+from PySide6.QtCore import QObject, QSettings, QStandardPaths, Qt, Signal
+from PySide6.QtWidgets import (
+    QDialog,
+    QFormLayout,
+    QHeaderView,
+    QPushButton,
+    QSpinBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QTabWidget,
+    QVBoxLayout,
+    QWidget,
+)
+
+from sql_text import fingerprint
+
+SLOW_QUERY_SETTING = "history/slow_query_ms"
+DEFAULT_SLOW_QUERY_MS = 1000
+
+# Only this many of the latest runs are used for the statistics
+STATS_WINDOW = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    database TEXT NOT NULL,
+    query TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    duration_ms REAL NOT NULL,
+    rows INTEGER,
+    bytes INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS history_fingerprint_idx ON history (fingerprint);
+"""
+
+
+def default_history_path() -> Path:
+    data = QStandardPaths.writableLocation(
+        QStandardPaths.StandardLocation.GenericDataLocation
+    )
+    # Alongside QSettings("RS", "DbBrowser")
+    return Path(data) / "RS" / "DbBrowser" / "history.sqlite3"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Nearest rank percentile of sorted values
+    """
+    rank = max(math.ceil(fraction * len(values)), 1)
+    return values[rank - 1]
+
+
+@dataclass
+class HistoryEntry:
+    started: float
+    database: str
+    query: str
+    duration_ms: float
+    rows: int | None
+    size_bytes: int | None
+    error: str | None
+
+
+@dataclass
+class FingerprintStats:
+    fingerprint: str
+    runs: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+    last_run: float
+
+
+class QueryHistory(QObject):
+    """
+    Queries run by the user, stored in SQLite with their duration, rows,
+    bytes fetched and error.
+
+    `record` can be called from worker threads. Runs slower than the
+    threshold emit `slow_query` on the GUI thread. The threshold is read
+    from QSettings once, and written back when set, on the GUI thread.
+    """
+
+    # Emitted with (database, query, duration in ms) for slow runs
+    slow_query = Signal(str, str, float)
+
+    def __init__(
+        self,
+        settings: QSettings,
+        path: Path | None = None,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.settings = settings
+        # Kept here as QSettings isn't read from the threads calling `record`
+        self._slow_query_ms = int(
+            settings.value(SLOW_QUERY_SETTING, DEFAULT_SLOW_QUERY_MS)
+        )
+        self.path = path or default_history_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    @property
+    def slow_query_ms(self) -> int:
+        return self._slow_query_ms
+
+    @slow_query_ms.setter
+    def slow_query_ms(self, value: int) -> None:
+        self._slow_query_ms = int(value)
+        self.settings.setValue(SLOW_QUERY_SETTING, self._slow_query_ms)
+
+    def record(
+        self,
+        database: str,
+        query: str,
+        duration: float,
+        rows: int | None = None,
+        size_bytes: int | None = None,
+        error: str | None = None,
+    ) -> None:
+        """
+        Args:
+            duration: Seconds the query took
+            rows: Rows returned, None if it returned none
+            size_bytes: Size of the fetched result
+        """
+        duration_ms = duration * 1000
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO history
+                (started, database, query, fingerprint, duration_ms, rows, bytes, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    time.time() - duration,
+                    database,
+                    query.strip(),
+                    fingerprint(query),
+                    duration_ms,
+                    rows,
+                    size_bytes,
+                    error,
+                ),
+            )
+            self._db.commit()
+        if error is None and duration_ms >= self.slow_query_ms:
+            self.slow_query.emit(database, query, duration_ms)
+
+    def recent(self, limit: int = 500) -> List[HistoryEntry]:
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT started, database, query, duration_ms, rows, bytes, error
+                FROM history ORDER BY id DESC LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+    def fingerprint_stats(self) -> List[FingerprintStats]:
+        """
+        Duration percentiles of each fingerprint over the latest runs,
+        slowest p95 first
+        """
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT fingerprint, duration_ms, error IS NOT NULL, started
+                FROM history ORDER BY id DESC LIMIT ?
+                """,
+                (STATS_WINDOW,),
+            ).fetchall()
+        runs: Dict[str, List[float]] = {}
+        errors: Dict[str, int] = {}
+        last_run: Dict[str, float] = {}
+        for key, duration, failed, started in rows:
+            if failed:
+                errors[key] = errors.get(key, 0) + 1
+            else:
+                runs.setdefault(key, []).append(duration)
+            last_run[key] = max(last_run.get(key, 0.0), started)
+        stats = []
+        for key in last_run:
+            durations = sorted(runs.get(key, [])) or [0.0]
+            stats.append(
+                FingerprintStats(
+                    key,
+                    len(runs.get(key, [])),
+                    errors.get(key, 0),
+                    percentile(durations, 0.5),
+                    percentile(durations, 0.95),
+                    durations[-1],
+                    last_run[key],
+                )
+            )
+        return sorted(stats, key=lambda s: s.p95_ms, reverse=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM history")
+            self._db.commit()
+
+
+def _item(value: object, tooltip: str | None = None) -> QTableWidgetItem:
+    if isinstance(value, float):
+        item = QTableWidgetItem(f"{value:,.1f}")
+        item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
+    elif isinstance(value, int):
+        item = QTableWidgetItem(f"{value:,}")
+        item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
+    else:
+        item = QTableWidgetItem("" if value is None else str(value))
+    if tooltip:
+        item.setToolTip(tooltip)
+    return item
+
+
+def _one_line(query: str) -> str:
+    return " ".join(query.split())
+
+
+RECENT_COLUMNS = ["Started", "Database", "Time (ms)", "Rows", "Bytes", "Error", "Query"]
+STATS_COLUMNS = ["Runs", "Errors", "p50 (ms)", "p95 (ms)", "Max (ms)", "Query"]
+
+
+class QueryHistoryDialog(QDialog):
+    """
+    The latest queries, and duration percentiles of each distinct query
+    """
+
+    # Emitted with a query double clicked in the history, to run it again
+    query_selected = Signal(str)
+
+    def __init__(self, history: QueryHistory, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Query History")
+        self.history = history
+        self.initUI()
+        self.refresh()
+
+    def initUI(self) -> None:
+        layout = QVBoxLayout()
+
+        form = QFormLayout()
+        self.slow_query_ms = QSpinBox()
+        self.slow_query_ms.setRange(1, 3_600_000)
+        self.slow_query_ms.setSuffix(" ms")
+        self.slow_query_ms.setValue(self.history.slow_query_ms)
+        self.slow_query_ms.setToolTip("Queries slower than this are logged")
+        self.slow_query_ms.valueChanged.connect(self._set_slow_query_ms)
+        form.addRow("Slow query threshold:", self.slow_query_ms)
+        layout.addLayout(form)
+
+        self.tabs = QTabWidget()
+        self.recent_table = self._table(RECENT_COLUMNS)
+        self.recent_table.cellDoubleClicked.connect(self._on_recent_activated)
+        self.stats_table = self._table(STATS_COLUMNS)
+        self.tabs.addTab(self.recent_table, "Recent")
+        self.tabs.addTab(self.stats_table, "By Query")
+        layout.addWidget(self.tabs)
+
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        layout.addWidget(refresh_button)
+
+        self.resize(1000, 600)
+        self.setLayout(layout)
+
+    def _table(self, columns: List[str]) -> QTableWidget:
+        table = QTableWidget(0, len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        table.horizontalHeader().setSectionResizeMode(
+            len(columns) - 1, QHeaderView.ResizeMode.Stretch
+        )
+        table.verticalHeader().hide()
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        return table
+
+    def _set_slow_query_ms(self, value: int) -> None:
+        self.history.slow_query_ms = value
+
+    def refresh(self) -> None:
+        self._recent = self.history.recent()
+        self.recent_table.setRowCount(len(self._recent))
+        for row, entry in enumerate(self._recent):
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.started))
+            cells = [
+                _item(started),
+                _item(entry.database),
+                _item(entry.duration_ms),
+                _item(entry.rows),
+                _item(entry.size_bytes),
+                _item(entry.error, entry.error),
+                _item(_one_line(entry.query), entry.query),
+            ]
+            for column, item in enumerate(cells):
+                self.recent_table.setItem(row, column, item)
+
+        stats = self.history.fingerprint_stats()
+        self.stats_table.setRowCount(len(stats))
+        for row, s in enumerate(stats):
+            cells = [
+                _item(s.runs),
+                _item(s.errors),
+                _item(s.p50_ms),
+                _item(s.p95_ms),
+                _item(s.max_ms),
+                _item(s.fingerprint, s.fingerprint),
+            ]
+            for column, item in enumerate(cells):
+                self.stats_table.setItem(row, column, item)
+        for table in (self.recent_table, self.stats_table):
+            table.resizeColumnsToContents()
+
+    def _on_recent_activated(self, row: int, _column: int) -> None:
+        if 0 <= row < len(self._recent):
+            self.query_selected.emit(self._recent[row].query)
@@ -0,0 +1,338 @@
+import time
+from typing import Tuple, Any
+
+import polars as pl
+from PySide6.QtCore import QThreadPool, QTimer, Signal
+from PySide6.QtWidgets import QHBoxLayout, QLabel, QMessageBox, QPushButton, QWidget
+
+from database_manager.pgsql import DatabaseManager, ResultCursor
+from gui_components import DataFrameModel, TableView
+from workers import StreamWorker, Worker
+
+# How often the row count and throughput are redrawn while streaming
+STATS_INTERVAL_MS = 250
+
+# Fetching everything asks first if the planner expects more rows than this
+LARGE_FETCH_ROWS = 1_000_000
+
+
+class QueryStream(QWidget):
+    """
+    Streams a query's rows into a TableView as they arrive (see
+    `DatabaseManager.stream_query`), showing the rows read, the elapsed time
+    and the throughput, with buttons to pause or stop fetching.
+
+    With a limit only that many rows are fetched, then the next page or the
+    rest of the result can be fetched with the buttons. They read on from
+    the same cursor (see `ResultCursor`), so the query isn't run again.
+    """
+
+    # Emitted with every row of the result once all have been read
+    completed = Signal(object)
+    # Emitted with the rows read so far when a page ended with more to come
+    page_loaded = Signal(object)
+    # Emitted with the rows read so far when the user stops the fetch
+    stopped = Signal(object)
+    failed = Signal(str)
+
+    def __init__(
+        self,
+        table_view: TableView,
+        parent: QWidget | None = None,
+        pool: QThreadPool | None = None,
+    ) -> None:
+        """
+        Args:
+            table_view: Where the rows are shown
+            pool: Where the stream runs, shared to cap how many queries run
+                at once. By default a pool of its own.
+        """
+        super().__init__(parent)
+        self.table_view = table_view
+        if pool is None:
+            # One stream at a time, on the connection it was started with
+            pool = QThreadPool(self)
+            pool.setMaxThreadCount(1)
+        self.pool = pool
+        self._db_manager: DatabaseManager | None = None
+        # The latest query's rows, held open to fetch more of them
+        self._cursor: ResultCursor | None = None
+        self._limit: int | None = None
+        # Rows the current fetch stops at and has read, see `_fetch`
+        self._max_rows: int | None = None
+        self._page_rows = 0
+        self._more = False
+        self._worker: StreamWorker | None = None
+        self._model: DataFrameModel | None = None
+        # Incremented for every stream, batches of older streams are dropped
+        self._generation = 0
+        self._rows = 0
+        self._started = 0.0
+        self._first_rows: float | None = None
+        self._paused_at: float | None = None
+        self._paused_for = 0.0
+        self._finished_at: float | None = None
+
+        self.stats_label = QLabel()
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.setCheckable(True)
+        self.pause_button.toggled.connect(self._set_paused)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.clicked.connect(self.stop)
+        self.next_page_button = QPushButton("Fetch Next Page")
+        self.next_page_button.clicked.connect(self.fetch_next_page)
+        self.fetch_all_button = QPushButton("Fetch All")
+        self.fetch_all_button.clicked.connect(self.fetch_all)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(STATS_INTERVAL_MS)
+        self.stats_timer.timeout.connect(self._update_stats)
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.stats_label, 1)
+        layout.addWidget(self.next_page_button)
+        layout.addWidget(self.fetch_all_button)
+        layout.addWidget(self.pause_button)
+        layout.addWidget(self.stop_button)
+        self.setLayout(layout)
+        self._show_more(False)
+        self.hide()
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Seconds the latest stream has been fetching, not counting pauses
+        """
+        end = self._paused_at or self._finished_at or time.monotonic()
+        return max(end - self._started - self._paused_for, 0.0)
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    @property
+    def more(self) -> bool:
+        """
+        Whether the latest page was full, so more rows may follow
+        """
+        return self._more
+
+    def start(
+        self,
+        db_manager: DatabaseManager,
+        database: str,
+        query: str,
+        params: Tuple[Any, ...] | None = None,
+        limit: int | None = None,
+    ) -> None:
+        """
+        Stream the query's result into the table view, stopping any stream
+        already running. `db_manager` must not be used by another thread.
+
+        Args:
+            limit: Rows fetched before stopping to offer the next page, None
+                to fetch every row
+        """
+        self.stop()
+        self._close_cursor()
+        self._generation += 1
+        self._db_manager = db_manager
+        self._cursor = db_manager.open_cursor(database, query, params)
+        self._limit = limit
+        self._model = None
+        self._rows = 0
+        self._fetch(limit)
+
+    def fetch_next_page(self) -> None:
+        if self._more and not self.running:
+            self._fetch(self._limit)
+
+    def fetch_all(self) -> None:
+        """
+        Fetch the rest of the result, asking first if the planner expects it
+        to be large
+        """
+        if not self._more or self.running or not (cursor := self._cursor):
+            return
+        generation = self._generation
+        self.fetch_all_button.setEnabled(False)
+        self.stats_label.setText("Estimating the rows left...")
+        worker = Worker(cursor.estimate_rows)
+        worker.signals.finished.connect(
+            lambda estimate: self._on_estimate(generation, estimate)
+        )
+        worker.signals.error.connect(lambda _: self._on_estimate(generation, None))
+        self.pool.start(worker)
+
+    def _on_estimate(self, generation: int, estimate: int | None) -> None:
+        if generation != self._generation or self.running:
+            return
+        self.fetch_all_button.setEnabled(True)
+        self._update_stats()
+        if estimate is not None and estimate - self._rows > LARGE_FETCH_ROWS:
+            reply = QMessageBox.question(
+                self,
+                "Fetch All",
+                f"The planner estimates about {estimate - self._rows:,} more "
+                "rows, which may take a long time and a lot of memory.\n\n"
+                "Fetch them all?",
+            )
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        self._fetch(None)
+
+    def _fetch(self, max_rows: int | None) -> None:
+        """
+        Stream up to `max_rows` of the query after the rows already read
+        """
+        assert self._cursor is not None
+        generation = self._generation
+        self._more = False
+        self._max_rows = max_rows
+        self._page_rows = 0
+        self._started = time.monotonic()
+        self._first_rows = None
+        self._paused_at = None
+        self._paused_for = 0.0
+        self._finished_at = None
+
+        worker = StreamWorker(self._cursor.stream, max_rows)
+        worker.signals.item.connect(lambda frame: self._on_batch(generation, frame))
+        worker.signals.finished.connect(
+            lambda complete: self._on_finished(generation, complete)
+        )
+        worker.signals.error.connect(lambda error: self._on_error(generation, error))
+        self._worker = worker
+        self.pool.start(worker)
+
+        self._show_more(False)
+        self.pause_button.setChecked(False)
+        self.pause_button.setEnabled(True)
+        self.stop_button.setEnabled(True)
+        self._update_stats()
+        self.stats_timer.start()
+        self.show()
+
+    def _show_more(self, more: bool) -> None:
+        self.next_page_button.setVisible(more)
+        self.fetch_all_button.setVisible(more)
+        self.fetch_all_button.setEnabled(more)
+
+    def _close_cursor(self) -> None:
+        """
+        Close the latest query's cursor on the pool, off the GUI thread
+        """
+        if cursor := self._cursor:
+            self._cursor = None
+            self.pool.start(Worker(cursor.close))
+
+    def stop(self) -> None:
+        """
+        Stop fetching, the rows already read stay in the view
+        """
+        if worker := self._worker:
+            worker.stop()
+            if self._db_manager:
+                # Don't wait for a long fetch to return
+                self._db_manager.cancel()
+
+    def cancel(self) -> None:
+        """
+        Stop fetching and drop any rows still to arrive, e.g. because other
+        results are replacing them in the view
+        """
+        self.stop()
+        self._close_cursor()
+        self._generation += 1
+        if self.running:
+            self._finish()
+        self._more = False
+        self._show_more(False)
+        self.hide()
+
+    def _set_paused(self, paused: bool) -> None:
+        if not (worker := self._worker):
+            return
+        if paused:
+            worker.pause()
+            self._paused_at = time.monotonic()
+        else:
+            worker.resume()
+            if self._paused_at is not None:
+                self._paused_for += time.monotonic() - self._paused_at
+                self._paused_at = None
+        self.pause_button.setText("Resume" if paused else "Pause")
+        self._update_stats()
+
+    def _on_batch(self, generation: int, frame: pl.DataFrame) -> None:
+        if generation != self._generation:
+            return
+        if self._first_rows is None:
+            self._first_rows = time.monotonic() - self._started
+        if self._model is None:
+            self.table_view.update_content(frame, complete=False)
+            self._model = self.table_view.model()  # type: ignore
+        elif self._model is self.table_view.model():
+            self._model.append_frame(frame)
+        self._rows += frame.height
+        self._page_rows += frame.height
+
+    def _on_finished(self, generation: int, complete: bool) -> None:
+        if generation != self._generation:
+            return
+        self._finish()
+        model = self._model
+        if (
+            complete
+            and self._max_rows is not None
+            and self._page_rows >= self._max_rows
+        ):
+            # Stopped at the limit, the result may go on
+            self._more = True
+            self._show_more(True)
+            self._update_stats()
+            self.page_loaded.emit(model.frame if model is not None else None)
+        elif complete and model is not None:
+            model.complete = True
+            self.completed.emit(model.frame)
+        else:
+            self.stopped.emit(model.frame if model is not None else None)
+
+    def _on_error(self, generation: int, error: str) -> None:
+        if generation != self._generation:
+            return
+        self._finish()
+        self.failed.emit(error)
+
+    def _finish(self) -> None:
+        self._worker = None
+        if self._paused_at is not None:
+            self._paused_for += time.monotonic() - self._paused_at
+            self._paused_at = None
+        self._finished_at = time.monotonic()
+        self.stats_timer.stop()
+        self.pause_button.setChecked(False)
+        self.pause_button.setText("Pause")
+        self.pause_button.setEnabled(False)
+        self.stop_button.setEnabled(False)
+        self._update_stats()
+
+    def _update_stats(self) -> None:
+        elapsed = max(self.elapsed, 1e-6)
+        text = (
+            f"{self._rows:,} rows in {elapsed:.1f}s "
+            f"({self._rows / elapsed:,.0f} rows/s)"
+        )
+        if self._first_rows is not None:
+            text += f", first rows after {self._first_rows:.2f}s"
+        if self._paused_at is not None:
+            text += ", paused"
+        elif self.running:
+            text += ", fetching..."
+        elif self._more:
+            text += ", more rows available"
+        self.stats_label.setText(text)
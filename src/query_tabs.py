@@ -0,0 +1,290 @@
+import time
+from typing import Any, Tuple
+
+import polars as pl
+from PySide6.QtCore import Qt, QThreadPool, Signal
+from PySide6.QtGui import QKeySequence, QShortcut
+from PySide6.QtWidgets import (
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QSplitter,
+    QTabWidget,
+    QVBoxLayout,
+    QWidget,
+)
+
+from database_manager.pgsql import DatabaseManager
+from gui_components import TableView
+from query_history import QueryHistory
+from query_stream import QueryStream
+from sql_completion import SchemaIndex
+from sql_query import DBChooser, SQLQueryEditor
+from sql_text import is_query, is_read_only
+from workers import Worker
+
+# Queries every tab together may run at once, the rest wait for a free slot
+MAX_CONCURRENT_QUERIES = 4
+
+
+def _timed_fetch(
+    db_manager: DatabaseManager, database: str, query: str
+) -> Tuple[str | pl.DataFrame, float]:
+    # Runs on a worker thread
+    started = time.perf_counter()
+    result = db_manager.fetch_frame(database, query)
+    return result, time.perf_counter() - started
+
+
+class QueryTab(QWidget):
+    """
+    An editor and its results, running on a connection of its own so a long
+    query doesn't hold up browsing or the other tabs
+    """
+
+    # Emitted with (database, statement) when a statement that may write
+    # has run, so cached results can be dropped
+    statement_run = Signal(str, str)
+    # Emitted with the database chosen, whose schema the editor completes
+    completions_needed = Signal(str)
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        database: str,
+        pool: QThreadPool,
+        history: QueryHistory | None = None,
+        query: str = "",
+        limit: int | None = None,
+        parent: QWidget | None = None,
+    ) -> None:
+        """
+        Args:
+            db_manager: Used only by this tab, see `DatabaseManager.copy`
+            pool: Shared by every tab, its thread count caps concurrent queries
+            limit: Rows of a query fetched before asking for more, see
+                `QueryStream.start`
+        """
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.pool = pool
+        self.history = history
+        self.limit = limit
+        self._running: Tuple[str, str] | None = None
+        # Incremented for every run, late results of older runs are dropped
+        self._generation = 0
+
+        self.editor = SQLQueryEditor()
+        self.editor.setPlainText(query)
+        self.db_chooser = DBChooser(db_manager=db_manager)
+        self.db_chooser.setCurrentText(database)
+        self.db_chooser.currentTextChanged.connect(self._on_database_changed)
+        self.run_button = QPushButton("Run")
+        self.run_button.clicked.connect(self.run)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel)
+        self.cancel_button.setEnabled(False)
+        self.status_label = QLabel()
+        QShortcut(QKeySequence("Ctrl+Return"), self.editor, self.run)
+
+        self.table_view = TableView()
+        self.query_stream = QueryStream(self.table_view, pool=pool)
+        self.query_stream.completed.connect(self._on_stream_completed)
+        self.query_stream.page_loaded.connect(self._on_stream_page_loaded)
+        self.query_stream.stopped.connect(self._on_stream_stopped)
+        self.query_stream.failed.connect(self._on_stream_failed)
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.db_chooser)
+        controls.addWidget(self.run_button)
+        controls.addWidget(self.cancel_button)
+        controls.addWidget(self.status_label, 1)
+
+        results = QWidget()
+        results_layout = QVBoxLayout()
+        results_layout.setContentsMargins(0, 0, 0, 0)
+        results_layout.addWidget(self.query_stream)
+        results_layout.addWidget(self.table_view)
+        results.setLayout(results_layout)
+
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(self.editor)
+        splitter.addWidget(results)
+        splitter.setSizes([150, 350])
+
+        layout = QVBoxLayout()
+        layout.addLayout(controls)
+        layout.addWidget(splitter)
+        self.setLayout(layout)
+
+    def _on_database_changed(self, database: str) -> None:
+        self.editor.completion_index = None
+        self.completions_needed.emit(database)
+
+    def run(self) -> None:
+        query = self.editor.toPlainText()
+        database = self.db_chooser.currentText()
+        if not query.strip() or not database or self._running:
+            return
+        self._generation += 1
+        generation = self._generation
+        self._running = (database, query)
+        self.run_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        if self.pool.activeThreadCount() >= self.pool.maxThreadCount():
+            self.status_label.setText("Waiting for another tab's query to finish...")
+        else:
+            self.status_label.setText("Running...")
+
+        if is_read_only(query) and is_query(query):
+            # Only a single query can be declared as a cursor
+            self.query_stream.start(self.db_manager, database, query, limit=self.limit)
+            return
+        # The connection is needed, drop the rows of an earlier query
+        self.query_stream.cancel()
+        worker = Worker(_timed_fetch, self.db_manager, database, query)
+        worker.signals.finished.connect(
+            lambda result: self._on_fetched(generation, result)
+        )
+        worker.signals.error.connect(
+            lambda error: self._on_failed(generation, error, 0.0)
+        )
+        self.pool.start(worker)
+
+    def cancel(self) -> None:
+        if not self._running:
+            return
+        if self.query_stream.running:
+            self.query_stream.stop()
+        else:
+            self.db_manager.cancel()
+
+    def close_connection(self) -> None:
+        """
+        Stop whatever is running and close the tab's connection
+        """
+        self.query_stream.cancel()
+        self._generation += 1
+        self.db_manager.cancel()
+        if conn := self.db_manager.conn:
+            conn.close()
+
+    def _finish(self, message: str) -> None:
+        self._running = None
+        self.run_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.status_label.setText(message)
+
+    def _record(self, duration: float, *args: Any, **kwargs: Any) -> None:
+        if self.history is not None and self._running:
+            database, query = self._running
+            self.history.record(database, query, duration, *args, **kwargs)
+
+    def _on_fetched(
+        self, generation: int, result: Tuple[str | pl.DataFrame, float]
+    ) -> None:
+        if generation != self._generation or not self._running:
+            return
+        frame, duration = result
+        database, query = self._running
+        if isinstance(frame, str):
+            error = frame if frame.startswith("Error") else None
+            self._record(duration, error=error)
+            message = frame
+        else:
+            self._record(duration, frame.height, frame.estimated_size())
+            self.table_view.update_content(frame, complete=True)
+            message = f"{frame.height:,} rows in {duration * 1000:,.0f} ms"
+        if not is_read_only(query):
+            self.statement_run.emit(database, query)
+        self._finish(message)
+
+    def _on_failed(self, generation: int, error: str, duration: float) -> None:
+        if generation != self._generation:
+            return
+        self._record(duration, error=error)
+        self._finish(error)
+
+    def _on_stream_completed(self, frame: pl.DataFrame) -> None:
+        elapsed = self.query_stream.elapsed
+        self._record(elapsed, frame.height, frame.estimated_size())
+        self._finish(f"{frame.height:,} rows in {elapsed * 1000:,.0f} ms")
+
+    def _on_stream_page_loaded(self, frame: pl.DataFrame) -> None:
+        elapsed = self.query_stream.elapsed
+        self._record(elapsed, frame.height, frame.estimated_size())
+        self._finish(f"First {frame.height:,} rows, more are available")
+
+    def _on_stream_stopped(self, frame: pl.DataFrame | None) -> None:
+        rows = frame.height if frame is not None else 0
+        self._record(self.query_stream.elapsed, rows, error="Stopped")
+        self._finish(f"Stopped after {rows:,} rows")
+
+    def _on_stream_failed(self, error: str) -> None:
+        self._on_failed(self._generation, error, self.query_stream.elapsed)
+
+
+class QueryTabs(QTabWidget):
+    """
+    Query editors that run in parallel, each on its own connection. A shared
+    thread pool caps how many of their queries run on the server at once.
+    """
+
+    # See `QueryTab.statement_run` and `QueryTab.completions_needed`
+    statement_run = Signal(str, str)
+    completions_needed = Signal(str)
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        history: QueryHistory | None = None,
+        max_concurrent: int = MAX_CONCURRENT_QUERIES,
+        limit: int | None = None,
+        parent: QWidget | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.history = history
+        self.limit = limit
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_concurrent)
+        self._opened = 0
+        self.setTabsClosable(True)
+        self.tabCloseRequested.connect(self.close_tab)
+        self.hide()
+
+    def new_tab(self, database: str, query: str = "") -> QueryTab:
+        tab = QueryTab(
+            self.db_manager.copy(),
+            database,
+            self.pool,
+            self.history,
+            query,
+            limit=self.limit,
+        )
+        tab.statement_run.connect(self.statement_run)
+        tab.completions_needed.connect(self.completions_needed)
+        self._opened += 1
+        self.setCurrentIndex(self.addTab(tab, f"Query {self._opened}"))
+        self.show()
+        tab.editor.setFocus()
+        self.completions_needed.emit(database)
+        return tab
+
+    def set_completion_index(self, database: str, index: SchemaIndex) -> None:
+        """
+        Complete from `index` in the tabs querying `database`
+        """
+        for i in range(self.count()):
+            tab = self.widget(i)
+            if isinstance(tab, QueryTab) and tab.db_chooser.currentText() == database:
+                tab.editor.completion_index = index
+
+    def close_tab(self, index: int) -> None:
+        tab = self.widget(index)
+        if isinstance(tab, QueryTab):
+            tab.close_connection()
+        self.removeTab(index)
+        tab.deleteLater()
+        if self.count() == 0:
+            self.hide()
@@ -0,0 +1,168 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import polars as pl
+
+from sql_text import normalize_sql
+
+# (database, table) pairs an entry was read from, used for invalidation
+TableRef = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class PageKey:
+    """
+    Identifies a page of table contents shown in the table view
+    """
+
+    database: str
+    table: str
+    limit: int = 1000
+    # The projected columns, empty for all columns
+    columns: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class QueryKey:
+    """
+    Identifies the result of a read only query, e.g. a page of search results
+    """
+
+    database: str
+    # See `sql_text.normalize_sql`, so formatting doesn't miss the cache
+    sql: str
+    params: Tuple[Any, ...] = ()
+
+    @classmethod
+    def of(
+        cls, database: str, query: str, params: Iterable[Any] | None = None
+    ) -> "QueryKey":
+        return cls(database, normalize_sql(query), tuple(params or ()))
+
+
+# Per table counters from pg_stat_user_tables, see
+# `DatabaseManager.get_table_modification_counts`
+ModificationCounts = Dict[str, Tuple[int, ...]]
+
+
+class ModificationTracker:
+    """
+    Finds tables written by other sessions, by comparing snapshots of
+    pg_stat_user_tables counters for each database
+    """
+
+    def __init__(self) -> None:
+        self._counts: Dict[str, ModificationCounts] = {}
+
+    def tracks(self, database: str, tables: Iterable[str]) -> bool:
+        """
+        Whether writes to all the tables are noticed, i.e. they are user
+        tables in the latest snapshot. Views and system catalogs never are.
+        """
+        counts = self._counts.get(database)
+        return counts is not None and all(table in counts for table in tables)
+
+    def changed_tables(self, database: str, counts: ModificationCounts) -> List[str]:
+        """
+        Record a snapshot, returning the tables that changed since the last one
+        """
+        previous = self._counts.get(database)
+        self._counts[database] = counts
+        if previous is None:
+            return []
+        tables = set(counts) | set(previous)
+        return [t for t in tables if counts.get(t) != previous.get(t)]
+
+    def clear(self) -> None:
+        self._counts.clear()
+
+
+@dataclass
+class CacheEntry:
+    frame: pl.DataFrame
+    size: int
+    created: float
+    tables: frozenset[TableRef]
+
+
+class FrameCache:
+    """
+    A memory bounded LRU cache of DataFrames with a time to live.
+
+    The size of each frame is taken from `DataFrame.estimated_size`, the
+    least recently used frames are evicted once `max_bytes` is exceeded.
+    It's guarded by a lock so background prefetch workers can fill it.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024**2, ttl: float = 300.0) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[pl.DataFrame]:
+        with self._lock:
+            if (entry := self._entries.get(key)) is None:
+                return None
+            if time.monotonic() - entry.created > self.ttl:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry.frame
+
+    def put(
+        self, key: Hashable, frame: pl.DataFrame, tables: Iterable[TableRef] = ()
+    ) -> None:
+        size = frame.estimated_size()
+        if size > self.max_bytes:
+            # Caching this would evict everything else
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(
+                frame, size, time.monotonic(), frozenset(tables)
+            )
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tables(self, database: str, tables: Iterable[str]) -> None:
+        """
+        Drop every entry that was read from one of the tables
+        """
+        refs = {(database, t) for t in tables}
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.tables & refs]:
+                self._remove(key)
+
+    def invalidate_database(self, database: str) -> None:
+        with self._lock:
+            stale = [
+                k
+                for k, e in self._entries.items()
+                if any(db == database for db, _ in e.tables)
+            ]
+            for key in stale:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._size -= entry.size
@@ -0,0 +1,245 @@
+from typing import List
+
+from PySide6.QtCore import QThreadPool, Signal
+from PySide6.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QTabWidget,
+    QVBoxLayout,
+    QWidget,
+)
+
+from data_types import ScriptMode
+from database_manager.pgsql import DatabaseManager, StatementResult
+from gui_components import TableView
+from query_history import QueryHistory
+from sql_text import split_statements
+from workers import StreamWorker
+
+# Recorded in the history against the statements of a rolled back transaction
+ROLLED_BACK = "Rolled back"
+
+# Characters of each statement shown in the summary, the tooltip has the rest
+STATEMENT_PREVIEW_CHARS = 80
+
+STATEMENT_COLUMNS = ["#", "Statement", "Time (ms)", "Rows", "Notices", "Error"]
+
+
+class ScriptRunnerDialog(QDialog):
+    """
+    Run a script of several statements on one connection, listing the
+    duration, rows and notices of each and showing every result set in a
+    tab of its own.
+    """
+
+    # Emitted with (database, statement) for each statement that succeeded
+    # and was committed, so cached results of the tables it wrote can be
+    # dropped
+    statement_run = Signal(str, str)
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        history: QueryHistory | None = None,
+        parent: QWidget | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Run Script")
+        self.db_manager = db_manager
+        self.history = history
+        # Scripts run on their own connection, one at a time
+        self.runner_db_manager = db_manager.copy()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self._worker: StreamWorker | None = None
+        # Incremented for every run, late results of older runs are dropped
+        self._generation = 0
+        self._database = ""
+        self._mode = ScriptMode.PER_STATEMENT
+        self._total = 0.0
+        # In a single transaction, statements that ran but may still be
+        # rolled back, recorded once the script ends
+        self._uncommitted: List[StatementResult] = []
+        self.initUI()
+
+    def initUI(self) -> None:
+        layout = QVBoxLayout()
+
+        controls = QHBoxLayout()
+        self.mode_combo_box = QComboBox()
+        for mode in ScriptMode:
+            self.mode_combo_box.addItem(mode.value, mode)
+        self.mode_combo_box.setToolTip(
+            "Commit Each Statement: statements before a failure are kept\n"
+            "Single Transaction: nothing is kept if a statement fails\n"
+            "Batched: statements without results are sent together, "
+            "one round trip each batch"
+        )
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.clicked.connect(self.stop)
+        self.stop_button.setEnabled(False)
+        self.status_label = QLabel()
+        controls.addWidget(self.mode_combo_box)
+        controls.addWidget(self.stop_button)
+        controls.addWidget(self.status_label, 1)
+        layout.addLayout(controls)
+
+        self.tabs = QTabWidget()
+        self.statements = QTableWidget(0, len(STATEMENT_COLUMNS))
+        self.statements.setHorizontalHeaderLabels(STATEMENT_COLUMNS)
+        self.statements.horizontalHeader().setSectionResizeMode(
+            1, QHeaderView.ResizeMode.Stretch
+        )
+        self.statements.verticalHeader().hide()
+        self.tabs.addTab(self.statements, "Statements")
+        layout.addWidget(self.tabs)
+
+        self.resize(900, 600)
+        self.setLayout(layout)
+
+    def get_mode(self) -> ScriptMode:
+        return self.mode_combo_box.currentData()
+
+    def run(self, database: str, script: str) -> None:
+        """
+        Split the script into statements and run them on `database`
+        """
+        self.stop()
+        # A run still going was stopped, its transaction is rolled back
+        self._end_transaction(False)
+        self._generation += 1
+        generation = self._generation
+        self._database = database
+        self._mode = self.get_mode()
+        self._total = 0.0
+        self.statements.setRowCount(0)
+        while self.tabs.count() > 1:
+            widget = self.tabs.widget(1)
+            self.tabs.removeTab(1)
+            widget.deleteLater()
+
+        statements = split_statements(script)
+        if not statements:
+            self.status_label.setText("Nothing to run")
+            return
+        if not self.runner_db_manager.same_server(self.db_manager):
+            self.runner_db_manager = self.db_manager.copy()
+        worker = StreamWorker(
+            self.runner_db_manager.run_script, database, statements, self._mode
+        )
+        worker.signals.item.connect(
+            lambda result: self._on_statement(generation, result)
+        )
+        worker.signals.finished.connect(
+            lambda complete: self._on_finished(generation, complete)
+        )
+        worker.signals.error.connect(lambda error: self._on_error(generation, error))
+        self._worker = worker
+        self.thread_pool.start(worker)
+        self.stop_button.setEnabled(True)
+        self.status_label.setText(f"Running {len(statements)} statements...")
+
+    def stop(self) -> None:
+        if worker := self._worker:
+            worker.stop()
+            self.runner_db_manager.cancel()
+
+    def _on_statement(self, generation: int, result: StatementResult) -> None:
+        if generation != self._generation:
+            return
+        self._total += result.duration
+        if self._mode == ScriptMode.TRANSACTION:
+            self._uncommitted.append(result)
+        else:
+            self._record(result)
+        row = self.statements.rowCount()
+        self.statements.insertRow(row)
+        preview = " ".join(result.statement.split())
+        if len(preview) > STATEMENT_PREVIEW_CHARS:
+            preview = preview[: STATEMENT_PREVIEW_CHARS - 3] + "..."
+        cells: List[str] = [
+            str(row + 1),
+            preview,
+            f"{result.duration * 1000:,.1f}",
+            f"{result.rows:,}" if result.rows >= 0 else "",
+            "\n".join(result.notices),
+            result.error or "",
+        ]
+        for column, text in enumerate(cells):
+            item = QTableWidgetItem(text)
+            if column == 1:
+                item.setToolTip(result.statement)
+            elif column in (4, 5) and text:
+                item.setToolTip(text)
+            self.statements.setItem(row, column, item)
+
+        if result.frame is not None:
+            view = TableView()
+            view.update_content(result.frame, complete=True)
+            self.tabs.addTab(view, f"Result {row + 1}")
+
+    def _record(self, result: StatementResult, error: str | None = None) -> None:
+        """
+        Record a statement in the history, and report it if it succeeded
+        """
+        error = result.error or error
+        if self.history is not None:
+            frame = result.frame
+            self.history.record(
+                self._database,
+                result.statement,
+                result.duration,
+                frame.height if frame is not None else None,
+                frame.estimated_size() if frame is not None else None,
+                error,
+            )
+        if error is None:
+            self.statement_run.emit(self._database, result.statement)
+
+    def _end_transaction(self, committed: bool) -> None:
+        """
+        Record the statements of a single transaction run, as rolled back
+        unless it committed
+        """
+        for result in self._uncommitted:
+            self._record(result, None if committed else ROLLED_BACK)
+        self._uncommitted = []
+
+    def _on_finished(self, generation: int, complete: bool) -> None:
+        if generation != self._generation:
+            return
+        self._worker = None
+        self.stop_button.setEnabled(False)
+        count = self.statements.rowCount()
+        failed = any(
+            (item := self.statements.item(row, 5)) is not None and item.text()
+            for row in range(count)
+        )
+        # Stopped early, the transaction is rolled back as well
+        self._end_transaction(complete and not failed)
+        if failed and self._mode == ScriptMode.TRANSACTION:
+            outcome = "failed, the transaction was rolled back"
+        elif failed:
+            outcome = "stopped at an error"
+        elif not complete:
+            outcome = "stopped"
+        else:
+            outcome = "finished"
+        self.status_label.setText(
+            f"{count} run in {self._total * 1000:,.0f} ms, {outcome}"
+        )
+
+    def _on_error(self, generation: int, error: str) -> None:
+        if generation != self._generation:
+            return
+        self._worker = None
+        self.stop_button.setEnabled(False)
+        # e.g. the commit failed
+        self._end_transaction(False)
+        self.status_label.setText(error)
@@ -1,44 +1,545 @@
-from PySide6.QtWidgets import QApplication, QComboBox, QHBoxLayout, QLineEdit, QWidget
-from gui_components import TableView
+from PySide6.QtCore import QStringListModel, Qt, QThreadPool, QTimer
+from PySide6.QtWidgets import (
+    QApplication,
+    QComboBox,
+    QCompleter,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QMessageBox,
+    QProgressBar,
+    QPushButton,
+    QWidget,
+)
+from gui_components import DataFrameModel, TableView
 import sys
-from database_manager.pgsql import DatabaseManager
-from warning_types import issue_warning, DatabaseWarning
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Tuple
+import polars as pl
+import psycopg2
+from database_manager.pgsql import DatabaseManager, ResultCursor
+from database_manager import search
+from warning_types import issue_warning, DatabaseWarning, QueryWarning, UserError
 from gui_components import DBTablesTree
+from workers import Worker
+from frame_ops import filter_rows
+from result_cache import FrameCache, QueryKey
+from query_history import QueryHistory
 
-from data_types import DBItemType
+from data_types import DBItemType, SearchMode
+
+# Wait this long after the last keystroke before searching
+SEARCH_DEBOUNCE_MS = 300
+
+# Completions wait for a shorter pause than searches
+COMPLETION_DEBOUNCE_MS = 150
+
+# Search modes that need an index on the field to avoid scanning the table
+INDEXED_MODES = (SearchMode.FULL_TEXT, SearchMode.SIMILAR)
+
+
+@dataclass
+class SearchPages:
+    """
+    The search whose results are shown, and how far they have been fetched
+    """
+
+    database: str
+    table: str
+    query: search.SearchQuery
+    # Whether pages may be served from the result cache
+    use_cache: bool = True
+    # Whether pages may be kept in the result cache at all
+    cacheable: bool = False
+    # Whether the first page was served from the cache
+    cached: bool = False
+    offset: int = 0
+    more: bool = False
+    fetching: bool = True
+    # The planner's estimate of the total matches
+    estimate: int | None = None
+    # The model the pages are appended to
+    model: DataFrameModel | None = None
+    # Held open between pages, see `_fetch_page`
+    cursor: ResultCursor | None = None
+
+
+def _fetch_page(
+    db_manager: DatabaseManager,
+    cache: FrameCache | None,
+    history: QueryHistory | None,
+    pages: SearchPages,
+    limit: int,
+    estimate: bool,
+) -> Tuple[str | pl.DataFrame, int | None, bool]:
+    """
+    The next page of a search. Pages are read from one cursor held open on
+    `db_manager`, so the query runs once and pages never overlap. Pages are
+    cached by the LIMIT/OFFSET query that returns the same rows.
+    """
+    # Runs on a worker thread
+    database = pages.database
+    page = search.paged_query(pages.query, limit, pages.offset)
+    key = QueryKey.of(database, *page)
+    if not pages.cacheable:
+        cache = None
+    frame = cache.get(key) if cache is not None and pages.use_cache else None
+    cached = frame is not None
+    # Planned before the cursor is declared, which holds the connection
+    rows = db_manager.estimate_query_rows(database, *pages.query) if estimate else None
+    if frame is None:
+        started = time.perf_counter()
+        try:
+            if pages.cursor is None:
+                pages.cursor = db_manager.open_cursor(database, *pages.query)
+            # Past any pages that came from the cache
+            pages.cursor.skip_to(pages.offset)
+            frame = pages.cursor.fetch(limit)
+        except psycopg2.Error as e:
+            _close_cursor(pages)
+            frame = f"Error executing query: {e}"
+        duration = time.perf_counter() - started
+        if history is not None and pages.offset == 0:
+            if isinstance(frame, str):
+                history.record(database, pages.query[0], duration, error=frame)
+            else:
+                history.record(
+                    database,
+                    pages.query[0],
+                    duration,
+                    frame.height,
+                    frame.estimated_size(),
+                )
+        if cache is not None and not isinstance(frame, str):
+            cache.put(key, frame, tables=[(database, pages.table)])
+    if not isinstance(frame, str) and frame.height < limit:
+        # The last page, nothing more to read from the cursor
+        _close_cursor(pages)
+    return frame, rows, cached
+
+
+def _close_cursor(pages: SearchPages) -> None:
+    # Runs on the search thread, the only one using the search connection
+    if cursor := pages.cursor:
+        pages.cursor = None
+        cursor.close()
+
+
+# The database, table, field and mode a lookup was made for, so a result the
+# user has moved on from is dropped
+FieldKey = Tuple[str, str, str, SearchMode]
+
+
+def _index_status(
+    db_manager: DatabaseManager, key: FieldKey
+) -> Tuple[FieldKey, bool, bool]:
+    """
+    Whether an index supports the search on the field, and whether pg_trgm
+    is installed (only looked up for similarity searches)
+    """
+    # Runs on a worker thread
+    database, table, field, mode = key
+    indexes = db_manager.get_table_indexes(database, table)
+    if mode == SearchMode.FULL_TEXT:
+        return key, search.has_full_text_index(indexes, field), False
+    trigram = db_manager.has_extension(database, "pg_trgm")
+    return key, trigram and search.has_trigram_index(indexes, field), trigram
+
+
+def _field_completions(
+    db_manager: DatabaseManager, key: FieldKey
+) -> Tuple[FieldKey, List[str], bool]:
+    """
+    The field's common values from pg_stats, and whether an index can answer
+    a prefix query on it
+    """
+    # Runs on a worker thread
+    database, table, field, _ = key
+    values = db_manager.get_common_values(database, table, field)
+    prefix_search = search.supports_prefix_search(
+        db_manager.get_table_indexes(database, table), field
+    )
+    return key, values, prefix_search
+
+
+def _prefix_values(
+    db_manager: DatabaseManager,
+    database: str,
+    table: str,
+    field: str,
+    prefix: str,
+) -> Tuple[Tuple[str, str, str], List[str]]:
+    # Runs on a worker thread
+    result = db_manager.execute_custom_query(
+        database, *search.prefix_query(table, field, prefix)
+    )
+    if isinstance(result, str):
+        return (table, field, prefix), []
+    return (table, field, prefix), [row[0] for row in result[1] if row[0] is not None]
+
+
+def _index_build_progress(
+    db_manager: DatabaseManager, database: str, table: str
+) -> Tuple[str, float] | None:
+    # Runs on a worker thread
+    return db_manager.get_index_build_progress(database, table)
+
+
+def _build_index(
+    db_manager: DatabaseManager,
+    database: str,
+    name: str,
+    table: str,
+    method: str,
+    expression: str,
+    extension: str | None,
+) -> bool:
+    # Runs on a worker thread
+    if extension and not db_manager.create_extension(database, extension):
+        return False
+    return db_manager.create_index_concurrently(
+        database, name, table, method, expression
+    )
 
 
 class SearchWidget(QWidget):
     # search_performed = pyqtSignal(str, list)  # New signal
 
     def __init__(
-        self, db_manager: DatabaseManager, db_tree: DBTablesTree, table_view: TableView
+        self,
+        db_manager: DatabaseManager,
+        db_tree: DBTablesTree,
+        table_view: TableView,
+        limit: int = 1000,
+        cache: FrameCache | None = None,
+        history: QueryHistory | None = None,
+        cacheable: Callable[[str, str], bool] | None = None,
     ):
+        """
+        Args:
+            limit: Rows in each page of results
+            cache: Pages of results are kept in this, keyed by their query
+            history: Searches that reach the server are recorded in this
+            cacheable: Whether the results of a query on a database may be
+                cached, e.g. writes to its tables are noticed. Without it
+                nothing is cached.
+        """
         super().__init__()
         self.db_manager = db_manager
+        self.limit = limit
+        self.cache = cache
+        self.history = history
+        self.cacheable = cacheable
         self.db_tree = db_tree
         self.db_tree.itemSelectionChanged.connect(self.update_field_combo_box)
         self.table_view = table_view
+        self.table_view.scrolled_to_end.connect(self.fetch_next_page)
+        self._pages: SearchPages | None = None
+        # Searches run one at a time on their own connection, off the GUI thread
+        self.search_pool = QThreadPool()
+        self.search_pool.setMaxThreadCount(1)
+        self._search_db_manager: DatabaseManager | None = None
+        # Incremented for every search, results of older searches are dropped
+        self._generation = 0
+        # Index builds can take minutes, they get their own threads
+        self.index_pool = QThreadPool()
+        # Prefix lookups for completion, on their own connection so they
+        # never wait behind a search
+        self.completion_pool = QThreadPool()
+        self.completion_pool.setMaxThreadCount(1)
+        self._completion_db_manager: DatabaseManager | None = None
+        # Catalog lookups for the selected field (indexes, pg_stats), kept
+        # off the GUI thread so changing the field never holds up typing
+        self.lookup_pool = QThreadPool()
+        self.lookup_pool.setMaxThreadCount(1)
+        self._lookup_db_manager: DatabaseManager | None = None
+        # Values of the selected field from pg_stats, see `update_completions`
+        self._common_values: List[str] = []
+        self._prefix_search = False
         self.setup_ui()
 
     def setup_ui(self):
         layout = QHBoxLayout()
         self.search_bar = QLineEdit()
         # TODO, selecting a field in the `field_tree` should change the combo box
-        # TODO searching numbers doesn't work
         # TODO Selecting table name in `field_tree` should set to search all fields
         self.search_bar.setPlaceholderText("Search for a term")
-        self.search_bar.textChanged.connect(self.search_db)
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self.search_db)
+        self.search_bar.textChanged.connect(self.debounce_timer.start)
+        # Values of the selected field, from the planner's statistics and,
+        # if an index makes it cheap, a prefix query
+        self.completion_model = QStringListModel(self)
+        self.completer = QCompleter(self.completion_model, self)
+        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.completer.setModelSorting(QCompleter.ModelSorting.UnsortedModel)
+        self.search_bar.setCompleter(self.completer)
+        self.completion_timer = QTimer(self)
+        self.completion_timer.setSingleShot(True)
+        self.completion_timer.setInterval(COMPLETION_DEBOUNCE_MS)
+        self.completion_timer.timeout.connect(self._fetch_prefix_values)
+        self.search_bar.textEdited.connect(self.completion_timer.start)
         # TODO map this to CTL+SPACE
         self.search_bar.returnPressed.connect(self.select_nothing)
 
         self.field_combo_box = QComboBox()
         self.field_combo_box.setPlaceholderText("Select a field")
+        self.field_combo_box.currentTextChanged.connect(self.update_index_status)
+        self.field_combo_box.currentTextChanged.connect(self.update_completions)
+
+        self.mode_combo_box = QComboBox()
+        for mode in SearchMode:
+            self.mode_combo_box.addItem(mode.value, mode)
+        self.mode_combo_box.currentIndexChanged.connect(self.on_mode_changed)
+
+        # Whether an index supports the search, and a button to build one
+        self.index_label = QLabel()
+        self.index_button = QPushButton("Build Index")
+        self.index_button.clicked.connect(self.build_index)
+        self.index_label.hide()
+        self.index_button.hide()
+        self._index_available = False
+        # Whether pg_trgm is installed, without it a similarity search can
+        # only fall back to a substring match
+        self._trigram_available = False
+
+        # Progress of an index build, from pg_stat_progress_create_index
+        self.index_progress = QProgressBar()
+        self.index_progress.setRange(0, 100)
+        self.index_progress.hide()
+        self._index_build_target: Tuple[str, str] | None = None
+        # Polled on its own connection, the build holds the other one
+        self.progress_pool = QThreadPool()
+        self.progress_pool.setMaxThreadCount(1)
+        self._progress_db_manager: DatabaseManager | None = None
+        self._polling_progress = False
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(500)
+        self.progress_timer.timeout.connect(self._update_index_progress)
+
+        # How many results are loaded, out of the planner's estimate
+        self.count_label = QLabel()
+        self.count_label.hide()
 
         layout.addWidget(self.search_bar)
+        layout.addWidget(self.count_label)
         layout.addWidget(self.field_combo_box)
+        layout.addWidget(self.mode_combo_box)
+        layout.addWidget(self.index_label)
+        layout.addWidget(self.index_button)
+        layout.addWidget(self.index_progress)
         self.setLayout(layout)
 
+    def get_mode(self) -> SearchMode:
+        return self.mode_combo_box.currentData()
+
+    def on_mode_changed(self) -> None:
+        self.update_index_status()
+        self.debounce_timer.start()
+
+    def _selected_table(self) -> str | None:
+        if self.db_tree.get_current_item_type() == DBItemType.TABLE:
+            return self.db_tree.get_selected_table()
+        return None
+
+    def _field_key(self) -> FieldKey | None:
+        field = self.field_combo_box.currentText()
+        table = self._selected_table()
+        database = self.db_manager.current_database
+        if not (field and table and database):
+            return None
+        return database, table, field, self.get_mode()
+
+    def _lookup_manager(self) -> DatabaseManager:
+        if self._lookup_db_manager is None or not self._lookup_db_manager.same_server(
+            self.db_manager
+        ):
+            self._lookup_db_manager = self.db_manager.copy()
+        return self._lookup_db_manager
+
+    def update_index_status(self) -> None:
+        """
+        Show whether an index supports the search on the selected field,
+        looked up in the background
+        """
+        key = self._field_key()
+        self._index_available = False
+        self.index_label.hide()
+        self.index_button.hide()
+        if key is None or key[3] not in INDEXED_MODES:
+            return
+        worker = Worker(_index_status, self._lookup_manager(), key)
+        worker.signals.finished.connect(self._on_index_status)
+        self.lookup_pool.start(worker)
+
+    def _on_index_status(self, result: Tuple[FieldKey, bool, bool]) -> None:
+        key, indexed, trigram = result
+        if key != self._field_key():
+            # The user has moved on
+            return
+        _, _, field, mode = key
+        if mode == SearchMode.FULL_TEXT:
+            description = f"A GIN index on {search.tsvector_expression(field)}"
+            fallback = "searches scan the table"
+        else:
+            self._trigram_available = trigram
+            description = f"A pg_trgm index on {field}"
+            fallback = "searches only read a sample of the table"
+        self._index_available = indexed
+        self.index_label.setText("Indexed" if indexed else "No index")
+        self.index_label.setToolTip(
+            f"{description} " + ("exists" if indexed else f"does not exist, {fallback}")
+        )
+        self.index_label.show()
+        self.index_button.setVisible(not indexed)
+
+    def update_completions(self) -> None:
+        """
+        Offer the selected field's common values from pg_stats, which needs
+        no table scan, looked up in the background
+        """
+        self.completion_timer.stop()
+        self._common_values = []
+        self._prefix_search = False
+        self.completion_model.setStringList([])
+        if (key := self._field_key()) is None:
+            return
+        worker = Worker(_field_completions, self._lookup_manager(), key)
+        worker.signals.finished.connect(self._on_field_completions)
+        self.lookup_pool.start(worker)
+
+    def _on_field_completions(self, result: Tuple[FieldKey, List[str], bool]) -> None:
+        (database, table, field, _), values, prefix_search = result
+        if (key := self._field_key()) is None or key[:3] != (database, table, field):
+            # The user has moved on
+            return
+        self._common_values = values
+        # Only query the table when an index can answer `LIKE 'prefix%'`
+        self._prefix_search = prefix_search
+        self.completion_model.setStringList(values)
+
+    def _fetch_prefix_values(self) -> None:
+        prefix = self.search_bar.text()
+        field = self.field_combo_box.currentText()
+        table = self._selected_table()
+        database = self.db_manager.current_database
+        if not (self._prefix_search and prefix and field and table and database):
+            return
+        if (
+            self._completion_db_manager is None
+            or not self._completion_db_manager.same_server(self.db_manager)
+        ):
+            self._completion_db_manager = self.db_manager.copy()
+        # Only the latest lookup matters
+        self.completion_pool.clear()
+        worker = Worker(
+            _prefix_values,
+            self._completion_db_manager,
+            database,
+            table,
+            field,
+            prefix,
+        )
+        worker.signals.finished.connect(self._on_prefix_values)
+        self.completion_pool.start(worker)
+
+    def _on_prefix_values(self, result: Tuple[Tuple[str, str, str], List[str]]) -> None:
+        (table, field, prefix), values = result
+        current = (
+            self._selected_table(),
+            self.field_combo_box.currentText(),
+            self.search_bar.text(),
+        )
+        if (table, field, prefix) != current or not values:
+            # The user has moved on
+            return
+        # Values from the table first, they are known to match the prefix
+        merged = list(dict.fromkeys(values + self._common_values))
+        self.completion_model.setStringList(merged)
+        if self.search_bar.hasFocus():
+            self.completer.setCompletionPrefix(prefix)
+            self.completer.complete()
+
+    def build_index(self) -> None:
+        field = self.field_combo_box.currentText()
+        table = self._selected_table()
+        database = self.db_manager.current_database
+        if not (field and table and database):
+            return
+        if self.get_mode() == SearchMode.FULL_TEXT:
+            method, expression = search.full_text_index_definition(field)
+            name = search.index_name(table, field, "fts_idx")
+            extension = None
+        else:
+            method, expression = search.similar_index_definition(field)
+            name = search.index_name(table, field, "trgm_idx")
+            extension = "pg_trgm"
+        reply = QMessageBox.question(
+            self,
+            "Build Index",
+            f"Build the index '{name}' on {table} with\n\n"
+            f'CREATE INDEX CONCURRENTLY ON "{table}" USING {method} ({expression})\n\n'
+            "Writes to the table continue while it builds.",
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        self.index_button.setEnabled(False)
+        self.index_button.setText("Building Index...")
+        self._index_build_target = (database, table)
+        worker = Worker(
+            _build_index,
+            self.db_manager.copy(),
+            database,
+            name,
+            table,
+            method,
+            expression,
+            extension,
+        )
+        worker.signals.finished.connect(self._on_index_built)
+        worker.signals.error.connect(self._on_index_built)
+        self.index_pool.start(worker)
+        self.index_progress.setValue(0)
+        self.index_progress.show()
+        self.progress_timer.start()
+
+    def _update_index_progress(self) -> None:
+        if not self._index_build_target or self._polling_progress:
+            return
+        database, table = self._index_build_target
+        if (
+            self._progress_db_manager is None
+            or not self._progress_db_manager.same_server(self.db_manager)
+        ):
+            self._progress_db_manager = self.db_manager.copy()
+        self._polling_progress = True
+        worker = Worker(
+            _index_build_progress, self._progress_db_manager, database, table
+        )
+        worker.signals.finished.connect(self._on_index_progress)
+        worker.signals.error.connect(self._on_index_progress)
+        self.progress_pool.start(worker)
+
+    def _on_index_progress(self, progress: Tuple[str, float] | str | None) -> None:
+        self._polling_progress = False
+        # Ignore an error, or a poll that returned after the build finished
+        if self._index_build_target and isinstance(progress, tuple):
+            phase, fraction = progress
+            self.index_progress.setValue(int(fraction * 100))
+            self.index_progress.setFormat(f"{phase}: %p%")
+
+    def _on_index_built(self, _result) -> None:
+        self.progress_timer.stop()
+        self.index_progress.hide()
+        self._index_build_target = None
+        self.index_button.setEnabled(True)
+        self.index_button.setText("Build Index")
+        self.update_index_status()
+
     def setFieldifAvailable(self, text):
         for f in range(self.field_combo_box.count()):
             if self.field_combo_box.itemText(f) == text:
@@ -51,6 +552,9 @@ class SearchWidget(QWidget):
         self.field_combo_box.setCurrentIndex(-1)
 
     def update_field_combo_box(self):
+        # Results for the previous table must not replace the new one
+        self.debounce_timer.stop()
+        self.cancel_search()
         self.field_combo_box.clear()
         current_item_type = self.db_tree.get_current_item_type()
         if current_item_type == DBItemType.TABLE:
@@ -59,12 +563,10 @@ class SearchWidget(QWidget):
                 try:
                     db_name = self.db_manager.current_database
                     if db_name:
-                        tables_and_fields = self.db_manager.get_tables_and_fields(
-                            db_name
-                        )
-                        if selected_table in tables_and_fields:
-                            fields = tables_and_fields[selected_table]
-                            self.field_combo_box.addItems(fields)
+                        if fields := self.db_manager.get_column_types(
+                            db_name, selected_table
+                        ):
+                            self.field_combo_box.addItems([f.name for f in fields])
                             self.field_combo_box.setCurrentIndex(0)
                         else:
                             print(
@@ -88,47 +590,237 @@ class SearchWidget(QWidget):
         self.search_bar.setPlaceholderText("Search for a term")
         self.update_field_combo_box()
 
-    def search_db(self):
+    def _loaded_model(self, table: str | None) -> DataFrameModel | None:
+        """
+        The table view's model, if it holds every row to be searched
+        """
+        model = self.table_view.model()
+        if not isinstance(model, DataFrameModel) or not model.complete:
+            return None
+        # Ranked searches need the server
+        if self.get_mode() != SearchMode.CONTAINS:
+            return None
+        if model.source is None:
+            # Query results, search whatever they hold
+            return model
+        field = self.field_combo_box.currentText()
+        if model.source != (self.db_manager.current_database, table):
+            return None
+        if field and field not in model.frame.columns:
+            # A hidden column, it wasn't fetched
+            return None
+        return model
+
+    def _run_filter(self, model: DataFrameModel, term: str, field: str) -> None:
+        self.cancel_search()
+        if not term:
+            model.set_filter(None)
+            self.count_label.hide()
+            return
+        generation = self._generation
+        columns = [field] if field in model.frame.columns else None
+        worker = Worker(filter_rows, model.frame, term, columns)
+        worker.signals.finished.connect(
+            lambda rows: self._on_filter_finished(generation, model, rows)
+        )
+        worker.signals.error.connect(
+            lambda error: self._on_filter_failed(generation, error)
+        )
+        self.search_pool.start(worker)
+
+    def _on_filter_finished(
+        self, generation: int, model: DataFrameModel, rows: pl.Series
+    ) -> None:
+        if generation != self._generation or model is not self.table_view.model():
+            return
+        model.set_filter(rows)
+        self.count_label.setText(f"{rows.len():,} matches")
+        self.count_label.setToolTip("Matches among the loaded rows")
+        self.count_label.show()
+
+    def _on_filter_failed(self, generation: int, error: str) -> None:
+        if generation != self._generation:
+            return
+        self.count_label.hide()
+        issue_warning(f"Unable to filter the loaded rows: {error}", QueryWarning)
+
+    def search_db(self, use_cache: bool = True):
         search_term = self.search_bar.text().strip()
         field = self.field_combo_box.currentText()
-        table = self.db_tree.get_selected_table()
+        table = self._selected_table()
+
+        if model := self._loaded_model(table):
+            # Everything is already loaded, filter it without a round trip
+            self._run_filter(model, search_term, field)
+            return
 
         if not table:
             return  # Don't issue a warning, just return silently
 
         if database := self.db_manager.current_database:
             if not search_term:
-                # If search term is empty, fetch all rows
-                query = f'SELECT * FROM "{table}";'
-                params = None
-            else:
-                if field:
-                    # Search in a specific field
-                    query = f"""
-                    SELECT * FROM "{table}"
-                    WHERE "{field}" ILIKE %s;
-                    """
-                    params = (f"%{search_term}%",)
+                # If search term is empty, page through all rows
+                query, params = search.all_rows_query(table)
+            elif self.get_mode() in INDEXED_MODES and not field:
+                mode_name = self.get_mode().value
+                issue_warning(f"Select a field for a {mode_name} search", UserError)
+                return
+            elif self.get_mode() == SearchMode.FULL_TEXT:
+                query, params = search.full_text_query(table, field, search_term)
+            elif self.get_mode() == SearchMode.SIMILAR:
+                if self._index_available:
+                    query, params = search.similar_query(table, field, search_term)
                 else:
-                    # TODO this is not working
-                    # Search across all fields
-                    fields = self.db_manager.get_tables_and_fields(database)[table]
-                    conditions = [f'"{f}" ILIKE %s' for f in fields]
-                    query = f"""
-                    SELECT * FROM "{table}"
-                    WHERE {" OR ".join(conditions)};
-                    """
-                    params = tuple(f"%{search_term}%" for _ in fields)
-
-            result = self.db_manager.execute_custom_query(
-                database, query, params=params
-            )
-            if isinstance(result, tuple) and len(result) == 2:
-                columns, rows = result
-                self.table_view.update_content(columns, [list(row) for row in rows])
+                    # Don't scan a large table on every search, read a sample
+                    percent = search.sample_percent(
+                        self.db_manager.estimate_table_rows(database, table)
+                    )
+                    if percent < 100:
+                        self.index_label.setText(f"No index, sampled {percent:g}%")
+                        issue_warning(
+                            f"No trigram index on {field}, only searching "
+                            f"{percent:g}% of {table}",
+                            QueryWarning,
+                        )
+                    if self._trigram_available:
+                        query, params = search.sampled_similar_query(
+                            table, field, search_term, percent
+                        )
+                    else:
+                        query, params = search.sampled_contains_query(
+                            table, [field], search_term, percent
+                        )
+            elif field:
+                # Search in a specific field
+                query, params = search.contains_query(table, [field], search_term)
+            else:
+                # Search across all fields, comparing each by its type
+                fields = self.db_manager.get_column_types(database, table)
+                query, params = search.typed_search_query(table, fields, search_term)
+
+            self._run_search(database, table, query, params, use_cache)
         else:
             issue_warning("No database selected", DatabaseWarning)
 
+    def _worker_db_manager(self) -> DatabaseManager:
+        """
+        The manager searches run on, replaced if the connection settings change
+        """
+        if self._search_db_manager is None or not self._search_db_manager.same_server(
+            self.db_manager
+        ):
+            self._search_db_manager = self.db_manager.copy()
+        return self._search_db_manager
+
+    def cancel_search(self) -> None:
+        """
+        Drop queued searches and cancel the one in flight
+        """
+        self._generation += 1
+        pages, self._pages = self._pages, None
+        self.count_label.hide()
+        self.search_pool.clear()
+        if self._search_db_manager:
+            self._search_db_manager.cancel()
+        if pages is not None:
+            # Queued behind any fetch still running, which may open it
+            self.search_pool.start(Worker(_close_cursor, pages))
+
+    def _run_search(
+        self, database: str, table: str, query: str, params, use_cache: bool = True
+    ) -> None:
+        """
+        Show the first `limit` results, later pages are fetched on scroll
+        """
+        self.cancel_search()
+        cacheable = self.cacheable is not None and self.cacheable(database, query)
+        self._pages = SearchPages(
+            database, table, (query, params), use_cache, cacheable
+        )
+        self._start_page_fetch(estimate=True)
+
+    def fetch_next_page(self) -> None:
+        pages = self._pages
+        if not pages or not pages.more or pages.fetching:
+            return
+        if pages.model is not self.table_view.model():
+            # Something else, e.g. a table page, has replaced the results
+            self._pages = None
+            self.search_pool.start(Worker(_close_cursor, pages))
+            return
+        pages.fetching = True
+        self._start_page_fetch(estimate=False)
+
+    def _start_page_fetch(self, estimate: bool) -> None:
+        assert self._pages
+        generation = self._generation
+        worker = Worker(
+            _fetch_page,
+            self._worker_db_manager(),
+            self.cache,
+            self.history,
+            self._pages,
+            self.limit,
+            estimate,
+        )
+        worker.signals.finished.connect(
+            lambda result: self._on_search_finished(generation, result)
+        )
+        self.search_pool.start(worker)
+
+    def _on_search_finished(
+        self,
+        generation: int,
+        result: Tuple[str | pl.DataFrame, int | None, bool],
+    ) -> None:
+        pages = self._pages
+        if generation != self._generation or pages is None:
+            # A newer search has started, never paint stale results
+            return
+        frame, estimate, cached = result
+        pages.fetching = False
+        if isinstance(frame, str):
+            pages.more = False
+            issue_warning(frame, QueryWarning)
+            return
+        first_page = pages.offset == 0
+        pages.offset += frame.height
+        pages.more = frame.height >= self.limit
+        if first_page:
+            pages.estimate = estimate
+            pages.cached = cached
+            self.table_view.update_content(frame)
+            pages.model = self.table_view.model()  # type: ignore
+        elif pages.model is self.table_view.model() and pages.model:
+            pages.model.append_frame(frame)
+        self._update_count_label()
+
+    def _update_count_label(self) -> None:
+        pages = self._pages
+        if pages is None:
+            return
+        loaded = f"{pages.offset:,}"
+        if not pages.more:
+            self.count_label.setText(f"{loaded} matches")
+        elif pages.estimate is not None:
+            # The estimate can be below what has already been loaded
+            self.count_label.setText(
+                f"{loaded} of ~{max(pages.estimate, pages.offset):,}"
+            )
+        else:
+            self.count_label.setText(f"{loaded}+")
+        tooltip = (
+            "Matches loaded, of the planner's estimate of the total. "
+            "Scroll to the end to load more."
+            if pages.more
+            else "All matches are loaded"
+        )
+        if pages.cached:
+            self.count_label.setText(f"{self.count_label.text()} (cached)")
+            tooltip += "\nServed from the result cache, Ctrl+Alt+F searches again"
+        self.count_label.setToolTip(tooltip)
+        self.count_label.show()
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
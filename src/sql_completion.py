@@ -0,0 +1,205 @@
+"""
+Completion of SQL in the editor from an index of the schema, built once from
+the catalog and then updated table by table. Names are kept sorted so those
+starting with a prefix are found by binary search, which stays well under a
+frame even with tens of thousands of columns.
+"""
+
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from sql_text import SQL_KEYWORDS, referenced_tables, table_aliases
+
+# Suggestions shown at most
+COMPLETION_LIMIT = 50
+
+# Words after which only a table makes sense
+TABLE_CONTEXT = {"from", "join", "update", "into", "table", "truncate"}
+
+# The word being typed, optionally qualified by a table or alias
+_TOKEN = re.compile(
+    r'(?:(?P<qualifier>"[^"]+"|[A-Za-z_][\w$]*)\.)?(?P<prefix>"?[\w$]*)$'
+)
+_PREVIOUS_WORD = re.compile(r"(\w+)\s*$")
+_PLAIN_NAME = re.compile(r"[a-z_][a-z0-9_$]*")
+# DDL that only changes the columns of the tables it names
+_TABLE_DDL = re.compile(
+    r"\s*(?:create|alter|drop)\s+(?:(?:global|local|temp|temporary|unlogged)\s+)*table\b",
+    re.IGNORECASE,
+)
+
+
+def quote_name(name: str) -> str:
+    """
+    The name as typed in SQL, quoted if Postgres would otherwise fold it
+    """
+    if _PLAIN_NAME.fullmatch(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+def changed_tables(statement: str) -> Set[str] | None:
+    """
+    The tables whose columns a DDL statement changes, or None if it may
+    change more than that (a view, a function...) and the whole index needs
+    rebuilding
+    """
+    if not (match := _TABLE_DDL.match(statement)):
+        return None
+    if match.group().split()[0].lower() == "drop" and "," in statement:
+        # Only the first of a list of dropped tables is seen
+        return None
+    if re.search(r"\brename\s+to\b", statement, re.IGNORECASE):
+        # The new name of a renamed table isn't seen either
+        return None
+    return referenced_tables(statement) or None
+
+
+def _unquote(name: str) -> str:
+    if name.startswith('"'):
+        return name.strip('"')
+    return name.lower()
+
+
+class PrefixIndex:
+    """
+    Names sorted by their lowercase form, so the ones starting with a prefix
+    are a contiguous run
+    """
+
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        entries = {name.lower(): name for name in names}
+        self._keys = sorted(entries)
+        self._names = [entries[key] for key in self._keys]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def add(self, name: str) -> None:
+        key = name.lower()
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return
+        self._keys.insert(i, key)
+        self._names.insert(i, name)
+
+    def discard(self, name: str) -> None:
+        key = name.lower()
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+            del self._names[i]
+
+    def starting_with(self, prefix: str, limit: int = COMPLETION_LIMIT) -> List[str]:
+        prefix = prefix.lower()
+        i = bisect_left(self._keys, prefix)
+        end = min(i + limit, len(self._keys))
+        names = []
+        while i < end and self._keys[i].startswith(prefix):
+            names.append(self._names[i])
+            i += 1
+        return names
+
+
+class SchemaIndex:
+    """
+    The tables, columns and functions of a database, and the SQL keywords
+    """
+
+    def __init__(self, columns: Dict[str, List[str]], functions: Iterable[str]) -> None:
+        """
+        Args:
+            columns: The columns of each table, see
+                `DatabaseManager.get_completion_catalog`
+        """
+        self.tables = PrefixIndex(columns)
+        self.columns = {table: PrefixIndex(names) for table, names in columns.items()}
+        # Tables a column name is in, so it is only dropped with the last one
+        self._column_tables: Dict[str, int] = {}
+        self.all_columns = PrefixIndex()
+        for names in columns.values():
+            self._add_columns(names)
+        self.functions = PrefixIndex(functions)
+        self.keywords = PrefixIndex(keyword.upper() for keyword in SQL_KEYWORDS)
+
+    def _add_columns(self, names: Iterable[str]) -> None:
+        for name in {name.lower(): name for name in names}.values():
+            key = name.lower()
+            if key not in self._column_tables:
+                self.all_columns.add(name)
+            self._column_tables[key] = self._column_tables.get(key, 0) + 1
+
+    def _remove_columns(self, names: Iterable[str]) -> None:
+        for name in {name.lower(): name for name in names}.values():
+            key = name.lower()
+            self._column_tables[key] -= 1
+            if not self._column_tables[key]:
+                del self._column_tables[key]
+                self.all_columns.discard(name)
+
+    def set_table(self, table: str, columns: List[str]) -> None:
+        """
+        Add a table or replace its columns, e.g. after it was altered
+        """
+        self.remove_table(table)
+        self.tables.add(table)
+        self.columns[table] = PrefixIndex(columns)
+        self._add_columns(columns)
+
+    def remove_table(self, table: str) -> None:
+        if (old := self.columns.pop(table, None)) is not None:
+            self.tables.discard(table)
+            self._remove_columns(old)
+
+    def complete(
+        self, before: str, statement: str, limit: int = COMPLETION_LIMIT
+    ) -> Tuple[int, List[str]]:
+        """
+        Suggestions for the word before the cursor.
+
+        Args:
+            before: The text up to the cursor
+            statement: The text around the cursor, for the tables and aliases
+                the query uses
+
+        Returns:
+            How many characters before the cursor a suggestion replaces, and
+            the suggestions
+        """
+        token = _TOKEN.search(before)
+        assert token is not None  # Every part of the pattern is optional
+        prefix = token.group("prefix")
+        typed = prefix.lstrip('"')
+        if qualifier := token.group("qualifier"):
+            table = table_aliases(statement).get(
+                _unquote(qualifier), _unquote(qualifier)
+            )
+            if (columns := self.columns.get(table)) is None:
+                return 0, []
+            names = columns.starting_with(typed, limit)
+            return len(prefix), [quote_name(name) for name in names]
+        if not typed:
+            return 0, []
+
+        previous = _PREVIOUS_WORD.search(before[: token.start()])
+        if previous and previous.group(1).lower() in TABLE_CONTEXT:
+            names = [
+                quote_name(name) for name in self.tables.starting_with(typed, limit)
+            ]
+            return len(prefix), names
+
+        names = []
+        tables = referenced_tables(statement) or ()
+        # Columns of the tables the query uses first, any column otherwise
+        sources = [self.columns[t] for t in tables if t in self.columns]
+        for index in sources or [self.all_columns]:
+            names.extend(quote_name(n) for n in index.starting_with(typed, limit))
+        names.extend(quote_name(n) for n in self.tables.starting_with(typed, limit))
+        if not prefix.startswith('"'):
+            names.extend(self.keywords.starting_with(typed, limit))
+            names.extend(self.functions.starting_with(typed, limit))
+        return len(prefix), list(dict.fromkeys(names))[:limit]
@@ -0,0 +1,146 @@
+import re
+from typing import Dict
+
+from PySide6.QtGui import (
+    QColor,
+    QFont,
+    QSyntaxHighlighter,
+    QTextCharFormat,
+    QTextDocument,
+)
+
+from sql_text import SQL_KEYWORDS
+
+# Block states, a block ending inside a literal passes it on to the next one.
+# Dollar quotes are numbered from DOLLAR_STATE by their tag.
+NORMAL = -1
+IN_COMMENT = 1
+IN_STRING = 2
+IN_ESCAPE_STRING = 3
+IN_IDENTIFIER = 4
+DOLLAR_STATE = 16
+
+# Everything that starts a token, searched once per block from left to right
+_TOKENS = re.compile(
+    r"""
+    (?P<line_comment>--)
+    |(?P<comment>/\*)
+    |(?P<escape_string>[eE]')
+    |(?P<string>')
+    |(?P<identifier>")
+    |(?P<dollar>\$(?:[A-Za-z_][A-Za-z_0-9]*)?\$)
+    |(?P<number>\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b)
+    |(?P<word>\b[A-Za-z_][A-Za-z_0-9$]*)
+    """,
+    re.VERBOSE,
+)
+_ENDS = {
+    IN_COMMENT: re.compile(r".*?\*/"),
+    IN_STRING: re.compile(r"(?:[^']|'')*'"),
+    IN_ESCAPE_STRING: re.compile(r"(?:[^'\\]|''|\\.)*'"),
+    IN_IDENTIFIER: re.compile(r'(?:[^"]|"")*"'),
+}
+_OPENING_STATES = {
+    "comment": IN_COMMENT,
+    "string": IN_STRING,
+    "escape_string": IN_ESCAPE_STRING,
+    "identifier": IN_IDENTIFIER,
+}
+
+_KEYWORDS = frozenset(SQL_KEYWORDS)
+
+
+def _format(color: str, bold: bool = False, italic: bool = False) -> QTextCharFormat:
+    text_format = QTextCharFormat()
+    text_format.setForeground(QColor(color))
+    if bold:
+        text_format.setFontWeight(QFont.Weight.Bold)
+    text_format.setFontItalic(italic)
+    return text_format
+
+
+class SqlSyntaxHighlighter(QSyntaxHighlighter):
+    """
+    Highlight SQL keywords, literals, quoted identifiers and comments.
+
+    Each block is tokenized with one precompiled pattern, and strings,
+    comments and dollar quotes that span lines are carried over in the block
+    state. Qt then only re-highlights the edited block, and the blocks after
+    it only while their starting state changes, so typing in a large script
+    costs a line rather than the whole document.
+    """
+
+    def __init__(self, parent: QTextDocument) -> None:
+        super().__init__(parent)
+        self.keyword_format = _format("#CC7832", bold=True)
+        self.number_format = _format("#6897BB")
+        self.string_format = _format("#6A8759")
+        self.identifier_format = _format("#9876AA")
+        self.comment_format = _format("#808080", italic=True)
+        self._formats = {
+            IN_COMMENT: self.comment_format,
+            IN_STRING: self.string_format,
+            IN_ESCAPE_STRING: self.string_format,
+            IN_IDENTIFIER: self.identifier_format,
+        }
+        # Dollar quote tags by the state they are numbered with, and back
+        self._dollar_tags: Dict[int, str] = {}
+        self._dollar_states: Dict[str, int] = {}
+
+    def _dollar_state(self, tag: str) -> int:
+        if (state := self._dollar_states.get(tag)) is None:
+            state = DOLLAR_STATE + len(self._dollar_states)
+            self._dollar_states[tag] = state
+            self._dollar_tags[state] = tag
+        return state
+
+    def _close(self, text: str, start: int, search_from: int, state: int) -> int:
+        """
+        Format a literal opened at `start` up to where it closes.
+
+        Returns:
+            Where the literal ends, or -1 if it runs past the block
+        """
+        if state >= DOLLAR_STATE:
+            tag = self._dollar_tags[state]
+            end = text.find(tag, search_from)
+            end = end + len(tag) if end >= 0 else -1
+            text_format = self.string_format
+        else:
+            match = _ENDS[state].match(text, search_from)
+            end = match.end() if match else -1
+            text_format = self._formats[state]
+        if end < 0:
+            self.setFormat(start, len(text) - start, text_format)
+            self.setCurrentBlockState(state)
+        else:
+            self.setFormat(start, end - start, text_format)
+        return end
+
+    def highlightBlock(self, text: str) -> None:
+        self.setCurrentBlockState(NORMAL)
+        position = 0
+        if (state := self.previousBlockState()) != NORMAL:
+            position = self._close(text, 0, 0, state)
+            if position < 0:
+                return
+
+        while match := _TOKENS.search(text, position):
+            kind = match.lastgroup
+            start, position = match.span()
+            if kind == "word":
+                if match.group().lower() in _KEYWORDS:
+                    self.setFormat(start, position - start, self.keyword_format)
+            elif kind == "number":
+                self.setFormat(start, position - start, self.number_format)
+            elif kind == "line_comment":
+                self.setFormat(start, len(text) - start, self.comment_format)
+                return
+            else:
+                if kind == "dollar":
+                    state = self._dollar_state(match.group())
+                else:
+                    state = _OPENING_STATES[kind or ""]
+                position = self._close(text, start, position, state)
+                if position < 0:
+                    return
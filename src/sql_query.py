@@ -11,8 +11,10 @@ from PySide6.QtWidgets import (
     QTreeWidget,
     QTreeWidgetItem,
     QComboBox,
+    QCompleter,
 )
-from PySide6.QtCore import QUrl
+from PySide6.QtCore import QStringListModel, Qt, QUrl
+from PySide6.QtGui import QKeyEvent, QTextCursor
 from PySide6.QtQuickWidgets import QQuickWidget
 
 from data_types import Database, Table
@@ -20,6 +22,12 @@ from database_manager.pgsql import DatabaseManager
 from gui_components import DBFieldsView
 from ai_search_bar import AiSearchBar
 from data_types import DBElement
+from sql_completion import SchemaIndex
+from sql_highlighter import SqlSyntaxHighlighter
+
+# Characters either side of the cursor searched for the tables and aliases a
+# completion may refer to, so a huge script isn't scanned on every key
+COMPLETION_CONTEXT_CHARS = 4000
 
 
 class DBTreeDisplay(QTreeWidget):
@@ -94,6 +102,91 @@ class SQLQueryEditor(QTextEdit):
     def __init__(self, parent: Optional[QWidget] = None) -> None:
         super().__init__(parent)
         self.setPlaceholderText("Enter your SQL query here...")
+        # Pasted dumps are kept as plain text, formatting comes from the
+        # highlighter
+        self.setAcceptRichText(False)
+        self.highlighter = SqlSyntaxHighlighter(self.document())
+        # The schema of the selected database, no completion until it is set
+        self.completion_index: SchemaIndex | None = None
+        self.completion_model = QStringListModel(self)
+        self.completer = QCompleter(self.completion_model, self)
+        self.completer.setWidget(self)
+        self.completer.setCompletionMode(
+            QCompleter.CompletionMode.UnfilteredPopupCompletion
+        )
+        self.completer.activated.connect(self.insert_completion)
+        # Characters before the cursor the chosen completion replaces
+        self._replaced_chars = 0
+
+    def keyPressEvent(self, event: QKeyEvent) -> None:
+        popup = self.completer.popup()
+        if popup.isVisible() and event.key() in (
+            Qt.Key.Key_Return,
+            Qt.Key.Key_Enter,
+            Qt.Key.Key_Tab,
+            Qt.Key.Key_Escape,
+        ):
+            # Handled by the completer
+            event.ignore()
+            return
+        if (
+            event.key() == Qt.Key.Key_Space
+            and event.modifiers() == Qt.KeyboardModifier.ControlModifier
+        ):
+            self.update_completions()
+            return
+        super().keyPressEvent(event)
+        text = event.text()
+        if text and (text[-1].isalnum() or text[-1] in '_."$'):
+            self.update_completions()
+        elif popup.isVisible() and event.key() != Qt.Key.Key_Shift:
+            popup.hide()
+
+    def update_completions(self) -> None:
+        """
+        Show the completions of the word before the cursor, see
+        `SchemaIndex.complete`
+        """
+        if self.completion_index is None:
+            return
+        popup = self.completer.popup()
+        cursor = self.textCursor()
+        before = cursor.block().text()[: cursor.positionInBlock()]
+        # Only the text near the cursor is copied out of the document
+        position = cursor.position()
+        around = QTextCursor(self.document())
+        around.setPosition(max(position - COMPLETION_CONTEXT_CHARS, 0))
+        around.setPosition(
+            min(
+                position + COMPLETION_CONTEXT_CHARS,
+                self.document().characterCount() - 1,
+            ),
+            QTextCursor.MoveMode.KeepAnchor,
+        )
+        # Paragraphs are separated by U+2029 in a selection
+        context = around.selectedText().replace("\u2029", "\n")
+        replaced, names = self.completion_index.complete(before, context)
+        if not names:
+            popup.hide()
+            return
+        self._replaced_chars = replaced
+        self.completion_model.setStringList(names)
+        rect = self.cursorRect()
+        rect.setWidth(
+            popup.sizeHintForColumn(0) + popup.verticalScrollBar().sizeHint().width()
+        )
+        self.completer.complete(rect)
+        popup.setCurrentIndex(self.completion_model.index(0, 0))
+
+    def insert_completion(self, completion: str) -> None:
+        cursor = self.textCursor()
+        cursor.movePosition(
+            QTextCursor.MoveOperation.Left,
+            QTextCursor.MoveMode.KeepAnchor,
+            self._replaced_chars,
+        )
+        cursor.insertText(completion)
+        self.setTextCursor(cursor)
 
     def set_default_query(self, database: Database) -> None:
         self.setText(
@@ -115,7 +208,6 @@ class SQLQuery(QWidget):
         super().__init__(parent)
         self.db_manager = db_manager
         self.read_only_tree = DBFieldsView(db_manager=self.db_manager)
-        # TODO add SQL Syntax Highlighting
         self.query_edit = SQLQueryEditor()
         self.status_bar = status_bar
         self.current_database = (
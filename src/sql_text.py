@@ -0,0 +1,486 @@
+"""
+Lexical helpers for SQL text typed by the user. They only tokenize, the
+server remains the parser, so the results are conservative rather than exact.
+"""
+
+import re
+from typing import Dict, Iterator, List, Set, Tuple
+
+# Literals and comments the other tokens must not be matched inside.
+# Dollar quotes are matched with their tag, e.g. $fn$ ... $fn$
+_LITERAL = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<string>(?<![\w$])[eE]'(?:[^'\\]|''|\\.)*'|'(?:[^']|'')*')
+    |(?P<dollar>\$\$.*?\$\$|\$(?P<tag>[A-Za-z_][A-Za-z_0-9]*)\$.*?\$(?P=tag)\$)
+    |(?P<identifier>"(?:[^"]|"")*")
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Statements that can't change data or schema
+READ_ONLY_STATEMENTS = ("select", "values", "table", "show", "explain")
+
+# Statements whose result set a script runner has to fetch on its own
+ROW_RETURNING_STATEMENTS = READ_ONLY_STATEMENTS + ("with", "fetch")
+
+# Statements that can be wrapped in `COPY (...) TO STDOUT` or declared as a
+# cursor, unlike SHOW, EXPLAIN or FETCH which also return rows
+QUERY_STATEMENTS = ("select", "with", "values", "table")
+
+# Words that make a read write, e.g. a data modifying CTE or SELECT INTO
+WRITE_KEYWORDS = {"insert", "update", "delete", "merge", "into"}
+
+# Schema changes invalidate more than the rows of the tables they name
+DDL_KEYWORDS = {"create", "alter", "drop", "truncate", "comment", "grant", "revoke"}
+
+# Keywords offered by completion and shown by the highlighter
+SQL_KEYWORDS = (
+    "all",
+    "alter",
+    "analyze",
+    "and",
+    "any",
+    "as",
+    "asc",
+    "begin",
+    "between",
+    "by",
+    "case",
+    "cast",
+    "check",
+    "column",
+    "commit",
+    "constraint",
+    "create",
+    "cross",
+    "current_date",
+    "current_timestamp",
+    "default",
+    "delete",
+    "desc",
+    "distinct",
+    "drop",
+    "else",
+    "end",
+    "except",
+    "exists",
+    "explain",
+    "false",
+    "fetch",
+    "filter",
+    "first",
+    "following",
+    "for",
+    "foreign",
+    "from",
+    "full",
+    "function",
+    "grant",
+    "group",
+    "having",
+    "if",
+    "ilike",
+    "in",
+    "index",
+    "inner",
+    "insert",
+    "intersect",
+    "interval",
+    "into",
+    "is",
+    "join",
+    "key",
+    "last",
+    "lateral",
+    "left",
+    "like",
+    "limit",
+    "materialized",
+    "natural",
+    "not",
+    "null",
+    "nulls",
+    "offset",
+    "on",
+    "only",
+    "or",
+    "order",
+    "outer",
+    "over",
+    "partition",
+    "preceding",
+    "primary",
+    "range",
+    "recursive",
+    "references",
+    "returning",
+    "revoke",
+    "right",
+    "rollback",
+    "rows",
+    "schema",
+    "select",
+    "set",
+    "show",
+    "table",
+    "tablesample",
+    "then",
+    "to",
+    "transaction",
+    "true",
+    "truncate",
+    "union",
+    "unique",
+    "update",
+    "using",
+    "values",
+    "view",
+    "when",
+    "where",
+    "window",
+    "with",
+)
+
+_NAME = r'(?:"(?:[^"]|"")+"|[A-Za-z_][A-Za-z_0-9$]*)'
+# Tables named outside FROM lists, which are walked by `_from_list`
+_TABLE_REFERENCE = re.compile(
+    rf"""
+    \b(?:update|into|truncate|table)
+    \s+(?:(?:if\s+(?:not\s+)?exists|only|table)\s+)*
+    (?P<name>{_NAME}(?:\s*\.\s*{_NAME})?)
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+# A table in a FROM list or join and the alias it may be given
+_TABLE_ALIAS = re.compile(
+    rf"""
+    (?:\b(?:from|join)|,)\s+(?:only\s+)?
+    (?P<name>{_NAME}(?:\s*\.\s*{_NAME})?)
+    (?:\s+(?:as\s+)?(?!(?:{"|".join(SQL_KEYWORDS)})\b)(?P<alias>{_NAME}))?
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+
+def _segments(query: str) -> Iterator[Tuple[str, str]]:
+    """
+    Split the query into ("code", text) and (literal kind, text) segments
+    """
+    position = 0
+    for match in _LITERAL.finditer(query):
+        if match.start() > position:
+            yield "code", query[position : match.start()]
+        yield match.lastgroup or "", match.group()
+        position = match.end()
+    if position < len(query):
+        yield "code", query[position:]
+
+
+def normalize_sql(query: str) -> str:
+    """
+    A canonical form of the query for use as a cache key: comments removed,
+    whitespace collapsed and everything outside literals and quoted
+    identifiers lowercased (Postgres folds unquoted names anyway).
+    """
+    parts: List[str] = []
+    for kind, text in _segments(query):
+        if kind == "comment":
+            parts.append(" ")
+        elif kind == "code":
+            parts.append(text.lower())
+        else:
+            parts.append(text)
+    return " ".join("".join(parts).split()).rstrip("; ")
+
+
+_NUMBER = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\$\d+")
+_IN_LIST = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+def fingerprint(query: str) -> str:
+    """
+    `normalize_sql` with constants and parameters replaced by `?`, so runs of
+    a query with different values are grouped together
+    """
+    parts: List[str] = []
+    for kind, text in _segments(query):
+        if kind == "comment":
+            parts.append(" ")
+        elif kind in ("string", "dollar"):
+            parts.append("?")
+        elif kind == "identifier":
+            parts.append(text)
+        else:
+            code = _PLACEHOLDER.sub("?", text.lower())
+            parts.append(_NUMBER.sub("?", code))
+    text = " ".join("".join(parts).split()).rstrip("; ")
+    return _IN_LIST.sub("in (?)", text)
+
+
+def _code(query: str) -> str:
+    """
+    The query with literals and comments blanked out, quoted identifiers kept
+    """
+    return " ".join(
+        text if kind in ("code", "identifier") else " "
+        for kind, text in _segments(query)
+    )
+
+
+def _words(query: str) -> List[str]:
+    return re.findall(r"[a-z_]+", _code(query).lower())
+
+
+def is_read_only(query: str) -> bool:
+    """
+    Whether the query can be answered from a cache, i.e. it starts like a
+    read and no writing keyword appears anywhere in it. Functions with side
+    effects (e.g. nextval) can't be seen.
+    """
+    words = _words(query)
+    if not words:
+        return False
+    if words[0] not in READ_ONLY_STATEMENTS and words[0] != "with":
+        return False
+    if words[0] == "explain" and "analyze" in words:
+        # EXPLAIN ANALYZE runs the statement
+        return False
+    return not WRITE_KEYWORDS.intersection(words[1:])
+
+
+# Built in functions whose result changes from call to call, or with the
+# server's state. Functions named pg_* read server state and count as well.
+VOLATILE_FUNCTIONS = frozenset(
+    {
+        "now",
+        "clock_timestamp",
+        "statement_timestamp",
+        "transaction_timestamp",
+        "timeofday",
+        "random",
+        "random_normal",
+        "setseed",
+        "gen_random_uuid",
+        "uuid_generate_v1",
+        "uuid_generate_v4",
+        "nextval",
+        "currval",
+        "lastval",
+        "setval",
+        "txid_current",
+        "inet_client_addr",
+        "inet_server_addr",
+        "version",
+    }
+)
+# Called without parentheses
+VOLATILE_KEYWORDS = frozenset(
+    {"current_timestamp", "current_date", "current_time", "localtime", "localtimestamp"}
+)
+_FUNCTION_CALL = re.compile(r"([a-z_][a-z0-9_$]*)\s*\(")
+
+
+def calls_volatile_function(query: str) -> bool:
+    """
+    Whether the query calls a built in function that may return something
+    different each time it runs, e.g. now() or random(). User defined
+    functions can't be seen.
+    """
+    code = _code(query).lower()
+    if VOLATILE_KEYWORDS.intersection(re.findall(r"[a-z_]+", code)):
+        return True
+    return any(
+        name in VOLATILE_FUNCTIONS or name.startswith("pg_")
+        for name in _FUNCTION_CALL.findall(code)
+    )
+
+
+def returns_rows(statement: str) -> bool:
+    """
+    Whether the statement may return a result set, a DML statement can with
+    RETURNING
+    """
+    words = _words(statement)
+    return bool(words) and (
+        words[0] in ROW_RETURNING_STATEMENTS or "returning" in words
+    )
+
+
+def is_query(query: str) -> bool:
+    """
+    Whether the text is a single query, see `QUERY_STATEMENTS`
+    """
+    words = _words(query)
+    return (
+        bool(words)
+        and words[0] in QUERY_STATEMENTS
+        and len(split_statements(query)) == 1
+    )
+
+
+def split_statements(script: str) -> List[str]:
+    """
+    Split a script on the semicolons that end statements, ignoring those in
+    strings, dollar quoted bodies, quoted identifiers and comments. Pieces
+    that are only comments are dropped.
+
+    SQL standard function bodies (BEGIN ATOMIC ... END) are not recognised,
+    use a dollar quoted body in scripts.
+    """
+    statements: List[str] = []
+    current: List[str] = []
+    has_code = False
+    for kind, text in _segments(script):
+        if kind != "code":
+            current.append(text)
+            has_code = has_code or kind != "comment"
+            continue
+        *ended, rest = text.split(";")
+        for part in ended:
+            current.append(part)
+            if has_code or part.strip():
+                statements.append("".join(current).strip())
+            current, has_code = [], False
+        current.append(rest)
+        has_code = has_code or bool(rest.strip())
+    if has_code:
+        statements.append("".join(current).strip())
+    return statements
+
+
+def is_ddl(query: str) -> bool:
+    words = _words(query)
+    return bool(words) and words[0] in DDL_KEYWORDS
+
+
+def _unquote(name: str) -> str:
+    if name.startswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name.lower()
+
+
+def name_parts(name: str) -> List[str]:
+    """
+    The parts of a possibly schema qualified name, e.g. `public."Users"` is
+    `["public", '"Users"']`, each still quoted as written. Dots inside
+    quotes are part of the name.
+    """
+    return re.split(r'\s*\.\s*(?=["A-Za-z_])(?=(?:[^"]*"[^"]*")*[^"]*$)', name.strip())
+
+
+_TOKEN = re.compile(r'"(?:[^"]|"")*"|[A-Za-z_][A-Za-z_0-9$]*|\S')
+_NAME_TOKEN = re.compile(_NAME)
+# Keywords that end a FROM list
+_FROM_LIST_END = frozenset(
+    {
+        "where",
+        "group",
+        "having",
+        "window",
+        "order",
+        "limit",
+        "offset",
+        "fetch",
+        "for",
+        "union",
+        "intersect",
+        "except",
+        "returning",
+    }
+)
+# Functions whose arguments use FROM, e.g. extract(year from created)
+_FROM_FUNCTIONS = frozenset({"extract", "substring", "trim", "overlay", "position"})
+
+
+def _from_list(tokens: List[str], start: int) -> Set[str] | None:
+    """
+    The tables of the FROM list starting at `tokens[start]`, its comma
+    separated items and joins. None if an item isn't a plain table: a
+    subquery, a parenthesised join, a LATERAL item or a function.
+    """
+    tables = set()
+    expect_item = True
+    depth = 0
+    position = start
+    while position < len(tokens):
+        token = tokens[position]
+        word = token.lower()
+        if expect_item:
+            if word == "only":
+                position += 1
+                continue
+            if word in SQL_KEYWORDS or not _NAME_TOKEN.fullmatch(token):
+                return None
+            name = [token]
+            position += 1
+            while position + 1 < len(tokens) and tokens[position] == ".":
+                name.append(tokens[position + 1])
+                position += 2
+            if position < len(tokens) and tokens[position] == "(":
+                return None
+            tables.add(_unquote(name[-1]))
+            expect_item = False
+            continue
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            if depth == 0:
+                break
+            depth -= 1
+        elif depth == 0:
+            if token == "," or word == "join":
+                expect_item = True
+            elif token == ";" or word in _FROM_LIST_END:
+                break
+        position += 1
+    return None if expect_item else tables
+
+
+def referenced_tables(query: str) -> Set[str] | None:
+    """
+    Names of the tables a query reads or writes, without their schema. None
+    if a FROM list has items other than tables (see `_from_list`), as the
+    tables they read can't be told.
+    """
+    code = _code(query)
+    tables = set()
+    for match in _TABLE_REFERENCE.finditer(code):
+        name = name_parts(match.group("name"))[-1]
+        tables.add(_unquote(name))
+    tokens = _TOKEN.findall(code)
+    # The word before each open parenthesis
+    calls: List[str] = []
+    for position, token in enumerate(tokens):
+        word = token.lower()
+        if token == "(":
+            calls.append(tokens[position - 1].lower() if position else "")
+        elif token == ")":
+            calls = calls[:-1]
+        elif word == "from" and not (calls and calls[-1] in _FROM_FUNCTIONS):
+            if position and tokens[position - 1].lower() == "distinct":
+                # IS DISTINCT FROM
+                continue
+            if (items := _from_list(tokens, position + 1)) is None:
+                return None
+            tables |= items
+    return tables
+
+
+def table_aliases(query: str) -> Dict[str, str]:
+    """
+    The tables a query names in FROM lists and joins, by their alias. A table
+    without an alias is listed under its own name.
+    """
+    aliases = {}
+    for match in _TABLE_ALIAS.finditer(_code(query)):
+        name = name_parts(match.group("name"))[-1]
+        table = _unquote(name)
+        if table in SQL_KEYWORDS:
+            # e.g. the comma of a select list followed by a keyword
+            continue
+        if alias := match.group("alias"):
+            aliases[_unquote(alias)] = table
+        aliases.setdefault(table, table)
+    return aliases
@@ -0,0 +1,424 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Iterator, List, Tuple
+
+import polars as pl
+import psycopg2
+from PySide6.QtCore import QThreadPool
+from PySide6.QtWidgets import (
+    QDialog,
+    QFormLayout,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QPushButton,
+    QSpinBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from database_manager.diff import (
+    MAX_PREFIX_LENGTH,
+    PREFIX_STEP,
+    bucket_query,
+    row_hash_query,
+    source_expression,
+)
+from database_manager.pgsql import DatabaseManager
+from sql_query import DBChooser
+from sql_text import is_query
+from warning_types import UserError, issue_warning
+from workers import StreamWorker
+
+# Buckets with at most this many rows on either side are compared row by row
+LEAF_ROWS = 5_000
+# Keys of each kind of change kept for the report, the counts are exact
+MAX_REPORTED_KEYS = 10_000
+
+
+class DiffError(Exception):
+    pass
+
+
+@dataclass
+class DiffSide:
+    """
+    A table, or a query, on a database
+    """
+
+    database: str
+    table: str | None = None
+    query: str | None = None
+
+    @property
+    def source(self) -> str:
+        return source_expression(self.table, self.query)
+
+
+@dataclass
+class DiffProgress:
+    level: int
+    buckets: int
+    differing: int
+
+
+@dataclass
+class TableDiff:
+    """
+    Keys only on the right (added), only on the left (removed), and on both
+    sides with different rows (changed)
+    """
+
+    added: int = 0
+    removed: int = 0
+    changed: int = 0
+    keys: List[Tuple[str, str]] = field(default_factory=list)
+
+    def record(self, change: str, key: str) -> None:
+        """
+        Count a change ("added", "removed" or "changed") and keep its key if
+        fewer than `MAX_REPORTED_KEYS` of its kind are kept
+        """
+        count = getattr(self, change) + 1
+        setattr(self, change, count)
+        if count <= MAX_REPORTED_KEYS:
+            self.keys.append((change.capitalize(), key))
+
+    @property
+    def truncated(self) -> bool:
+        return max(self.added, self.removed, self.changed) > MAX_REPORTED_KEYS
+
+
+def _run(db_manager: DatabaseManager, database: str, query: Tuple[str, Any]) -> List:
+    result = db_manager.execute_custom_query(database, *query)
+    if isinstance(result, str):
+        raise DiffError(result)
+    return result[1]
+
+
+def _both(
+    executor: ThreadPoolExecutor,
+    managers: Tuple[DatabaseManager, DatabaseManager],
+    sides: Tuple[DiffSide, DiffSide],
+    queries: Tuple[Tuple[str, Any], Tuple[str, Any]],
+) -> Tuple[List, List]:
+    """
+    Run a query on each side at once, each on its own connection
+    """
+    left, right = (
+        executor.submit(_run, manager, side.database, query)
+        for manager, side, query in zip(managers, sides, queries)
+    )
+    return left.result(), right.result()
+
+
+class _RowHashes:
+    """
+    The rows of a side's cursor, fetching its next batch in the background
+    while the current one is compared
+    """
+
+    def __init__(
+        self, executor: ThreadPoolExecutor, batches: Iterator[pl.DataFrame]
+    ) -> None:
+        self._executor = executor
+        self._batches = batches
+        self._future = executor.submit(next, batches, None)
+        self._rows: Iterator[Tuple[str, str, str]] = iter(())
+
+    def __iter__(self) -> "_RowHashes":
+        return self
+
+    def __next__(self) -> Tuple[str, str, str]:
+        while (row := next(self._rows, None)) is None:
+            try:
+                batch = self._future.result()
+            except psycopg2.Error as e:
+                raise DiffError(str(e)) from e
+            if batch is None:
+                raise StopIteration
+            self._future = self._executor.submit(next, self._batches, None)
+            self._rows = batch.iter_rows()
+        return row
+
+    def close(self) -> None:
+        # The cursor's generator can only be closed once it isn't fetching
+        self._future.exception()
+        self._batches.close()
+
+
+def _compare_rows(
+    diff: TableDiff,
+    left: Iterator[Tuple[str, str, str]],
+    right: Iterator[Tuple[str, str, str]],
+) -> None:
+    """
+    Merge the rows of both sides, each ordered by the md5 of its key and the
+    key, recording keys found on one side or with different row hashes
+    """
+    left_row, right_row = next(left, None), next(right, None)
+    while left_row is not None or right_row is not None:
+        if right_row is None or (left_row is not None and left_row[:2] < right_row[:2]):
+            diff.record("removed", left_row[1])  # type: ignore
+            left_row = next(left, None)
+        elif left_row is None or right_row[:2] < left_row[:2]:
+            diff.record("added", right_row[1])
+            right_row = next(right, None)
+        else:
+            if left_row[2] != right_row[2]:
+                diff.record("changed", left_row[1])
+            left_row, right_row = next(left, None), next(right, None)
+
+
+def diff_sides(
+    managers: Tuple[DatabaseManager, DatabaseManager],
+    sides: Tuple[DiffSide, DiffSide],
+    key_columns: List[str],
+    leaf_rows: int = LEAF_ROWS,
+) -> Iterator[DiffProgress | TableDiff]:
+    """
+    Compare two tables or queries by key, moving only hashes over the network.
+
+    Both sides are summarised into buckets (see `database_manager.diff`),
+    buckets that differ are split until they are small enough to compare the
+    hash of each row. Yields the progress of each level, then the diff. Rows
+    written while the diff runs may be reported as changed.
+
+    Raises:
+        DiffError: If a query fails
+    """
+    diff = TableDiff()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        prefixes: List[str] | None = None
+        length = PREFIX_STEP
+        leaves: List[str] = []
+        level = 1
+        while True:
+            rows = _both(
+                executor,
+                managers,
+                sides,
+                tuple(
+                    bucket_query(side.source, key_columns, length, prefixes)
+                    for side in sides
+                ),  # type: ignore
+            )
+            left, right = ({r[0]: (r[1], r[2]) for r in side} for side in rows)
+            drill = []
+            for bucket in left.keys() | right.keys():
+                summary = left.get(bucket, (0, Decimal(0)))
+                other = right.get(bucket, (0, Decimal(0)))
+                if summary == other:
+                    continue
+                if (
+                    max(summary[0], other[0]) <= leaf_rows
+                    or length >= MAX_PREFIX_LENGTH
+                ):
+                    leaves.append(bucket)
+                else:
+                    drill.append(bucket)
+            yield DiffProgress(level, len(left.keys() | right.keys()), len(drill))
+            if not drill:
+                break
+            prefixes = drill
+            length += PREFIX_STEP
+            level += 1
+
+        if leaves:
+            # Every leaf bucket is read through one cursor on each side
+            left_rows, right_rows = (
+                _RowHashes(
+                    executor,
+                    manager.stream_query(
+                        side.database, *row_hash_query(side.source, key_columns, leaves)
+                    ),
+                )
+                for manager, side in zip(managers, sides)
+            )
+            try:
+                _compare_rows(diff, left_rows, right_rows)
+            finally:
+                left_rows.close()
+                right_rows.close()
+    yield diff
+
+
+DIFF_COLUMNS = ["Change", "Key"]
+
+
+class TableDiffDialog(QDialog):
+    """
+    Compare two tables or queries, which may be on different databases, and
+    list the rows added, removed and changed between them
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        current_database: str,
+        parent: QWidget | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Compare Tables")
+        self.db_manager = db_manager
+        self.current_database = current_database
+        # One connection for each side
+        self.managers = (db_manager.copy(), db_manager.copy())
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self._worker: StreamWorker | None = None
+        # Incremented for every diff, late results of older ones are dropped
+        self._generation = 0
+        self.initUI()
+
+    def initUI(self) -> None:
+        layout = QVBoxLayout()
+
+        form = QFormLayout()
+        self.left_database = DBChooser(db_manager=self.db_manager)
+        self.left_database.setCurrentText(self.current_database)
+        self.left_source = QLineEdit()
+        self.left_source.setPlaceholderText("Table name or SELECT query")
+        self.right_database = DBChooser(db_manager=self.db_manager)
+        self.right_database.setCurrentText(self.current_database)
+        self.right_source = QLineEdit()
+        self.right_source.setPlaceholderText("Table name or SELECT query")
+        self.key_columns = QLineEdit()
+        self.key_columns.setPlaceholderText("id")
+        self.key_columns.setToolTip(
+            "Columns that identify a row on both sides, separated by commas"
+        )
+        self.leaf_rows = QSpinBox()
+        self.leaf_rows.setRange(100, 1_000_000)
+        self.leaf_rows.setSingleStep(1000)
+        self.leaf_rows.setValue(LEAF_ROWS)
+        self.leaf_rows.setToolTip(
+            "Buckets that differ are split until they have at most this many "
+            "rows, then the hashes of their rows are compared"
+        )
+        form.addRow("Left database:", self.left_database)
+        form.addRow("Left:", self.left_source)
+        form.addRow("Right database:", self.right_database)
+        form.addRow("Right:", self.right_source)
+        form.addRow("Key columns:", self.key_columns)
+        form.addRow("Rows per bucket:", self.leaf_rows)
+        layout.addLayout(form)
+
+        buttons = QHBoxLayout()
+        self.compare_button = QPushButton("Compare")
+        self.compare_button.clicked.connect(self.compare)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel)
+        self.cancel_button.setEnabled(False)
+        buttons.addWidget(self.compare_button)
+        buttons.addWidget(self.cancel_button)
+        layout.addLayout(buttons)
+
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        self.results = QTableWidget(0, len(DIFF_COLUMNS))
+        self.results.setHorizontalHeaderLabels(DIFF_COLUMNS)
+        self.results.horizontalHeader().setSectionResizeMode(
+            1, QHeaderView.ResizeMode.Stretch
+        )
+        self.results.verticalHeader().hide()
+        self.results.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.results)
+
+        self.resize(800, 600)
+        self.setLayout(layout)
+
+    @staticmethod
+    def _side(database: str, text: str) -> DiffSide:
+        text = text.strip()
+        if is_query(text):
+            return DiffSide(database, query=text)
+        return DiffSide(database, table=text)
+
+    def compare(self) -> None:
+        key_columns = [
+            c.strip() for c in self.key_columns.text().split(",") if c.strip()
+        ]
+        left_text, right_text = self.left_source.text(), self.right_source.text()
+        if not (left_text.strip() and right_text.strip() and key_columns):
+            issue_warning("Enter both sides and the key columns", UserError)
+            return
+        self.cancel()
+        self._generation += 1
+        generation = self._generation
+        sides = (
+            self._side(self.left_database.currentText(), left_text),
+            self._side(self.right_database.currentText(), right_text),
+        )
+        if not all(m.same_server(self.db_manager) for m in self.managers):
+            self.managers = (self.db_manager.copy(), self.db_manager.copy())
+        worker = StreamWorker(
+            diff_sides, self.managers, sides, key_columns, self.leaf_rows.value()
+        )
+        worker.signals.item.connect(lambda item: self._on_item(generation, item))
+        worker.signals.finished.connect(
+            lambda complete: self._on_finished(generation, complete)
+        )
+        worker.signals.error.connect(lambda error: self._on_error(generation, error))
+        self._worker = worker
+        self.thread_pool.start(worker)
+        self.results.setRowCount(0)
+        self.status_label.setText("Hashing both sides...")
+        self.compare_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+
+    def cancel(self) -> None:
+        if worker := self._worker:
+            worker.stop()
+            for manager in self.managers:
+                manager.cancel()
+
+    def _on_item(self, generation: int, item: DiffProgress | TableDiff) -> None:
+        if generation != self._generation:
+            return
+        if isinstance(item, DiffProgress):
+            self.status_label.setText(
+                f"Level {item.level}: {item.buckets:,} buckets compared, "
+                f"{item.differing:,} split further..."
+            )
+            return
+        self.status_label.setText(
+            f"{item.added:,} added, {item.removed:,} removed, "
+            f"{item.changed:,} changed"
+            + (
+                f" (the first {MAX_REPORTED_KEYS:,} of each are listed)"
+                if item.truncated
+                else ""
+            )
+        )
+        self.results.setRowCount(len(item.keys))
+        for row, (change, key) in enumerate(sorted(item.keys)):
+            self.results.setItem(row, 0, QTableWidgetItem(change))
+            self.results.setItem(row, 1, QTableWidgetItem(key))
+
+    def _on_finished(self, generation: int, complete: bool) -> None:
+        if generation != self._generation:
+            return
+        self._worker = None
+        self.compare_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        if not complete:
+            self.status_label.setText("Cancelled")
+
+    def _on_error(self, generation: int, error: str) -> None:
+        if generation != self._generation:
+            return
+        self._worker = None
+        self.compare_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.status_label.setText(error)
+
+    def closeEvent(self, event) -> None:
+        self.cancel()
+        super().closeEvent(event)
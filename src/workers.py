@@ -0,0 +1,115 @@
+import threading
+import traceback
+from typing import Any, Callable, Iterator
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+
+class WorkerSignals(QObject):
+    """
+    Signals for a Worker, a QRunnable is not a QObject so can't define them
+    """
+
+    finished = Signal(object)
+    error = Signal(str)
+
+
+class Worker(QRunnable):
+    """
+    Run a callable on a QThreadPool and report the result through signals.
+
+    The callable must not touch any widgets, connect to `signals.finished`
+    to update the GUI (the signal is queued back onto the GUI thread).
+    Each worker should be given its own DatabaseManager (see
+    `DatabaseManager.copy`) as a psycopg2 connection can't be shared
+    between threads that run queries concurrently.
+    """
+
+    def __init__(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    def run(self) -> None:
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except BaseException as e:
+            # Including panics from Rust extensions (e.g. polars), which
+            # aren't Exceptions and would otherwise never be reported
+            traceback.print_exc()
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+class StreamSignals(QObject):
+    """
+    Signals for a StreamWorker
+    """
+
+    # Each item the iterator yields
+    item = Signal(object)
+    # True if the iterator was exhausted, False if it was stopped
+    finished = Signal(bool)
+    error = Signal(str)
+
+
+class StreamWorker(QRunnable):
+    """
+    Run a callable that returns an iterator (e.g.
+    `DatabaseManager.stream_query`) on a QThreadPool, emitting each item as
+    it is produced. It can be paused between items or stopped, both are
+    safe to call from the GUI thread.
+    """
+
+    def __init__(
+        self, fn: Callable[..., Iterator[Any]], *args: Any, **kwargs: Any
+    ) -> None:
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = StreamSignals()
+        self._running = threading.Event()
+        self._running.set()
+        self._stopped = threading.Event()
+
+    def pause(self) -> None:
+        self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        # A paused stream must wake up to stop
+        self._running.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped.is_set()
+
+    def run(self) -> None:
+        iterator = None
+        try:
+            iterator = self.fn(*self.args, **self.kwargs)
+            for item in iterator:
+                self.signals.item.emit(item)
+                self._running.wait()
+                if self.stopped:
+                    break
+        except BaseException as e:
+            # Including panics, see `Worker.run`
+            if self.stopped:
+                # e.g. the query was cancelled to stop it
+                self.signals.finished.emit(False)
+            else:
+                traceback.print_exc()
+                self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(not self.stopped)
+        finally:
+            if close := getattr(iterator, "close", None):
+                close()
@@ -0,0 +1,53 @@
+import datetime
+
+import polars as pl
+
+from frame_ops import ROW_INDEX, filter_rows
+
+
+def rows(frame, term, columns=None):
+    found = filter_rows(frame, term, columns)
+    assert found.name == ROW_INDEX
+    assert found.dtype == pl.UInt32
+    return found.to_list()
+
+
+FRAME = pl.DataFrame(
+    {
+        "name": ["Alice", "bob", None, "a.b"],
+        "age": [30, 42, 7, None],
+        "score": [1.5, 42.0, None, 0.0],
+        "active": [True, False, None, True],
+        "born": [
+            datetime.date(1994, 1, 2),
+            datetime.date(1982, 5, 6),
+            None,
+            datetime.date(2017, 3, 4),
+        ],
+        "tags": [["x", "admin"], [], None, ["y"]],
+    }
+)
+
+
+def test_strings_match_case_insensitive_substrings():
+    assert rows(FRAME, "ALI") == [0]
+    # The term is literal text, not a pattern
+    assert rows(FRAME, ".", ["name"]) == [3]
+
+
+def test_numbers_match_by_value():
+    assert rows(FRAME, "42") == [1]
+    assert rows(FRAME, "1.5") == [0]
+
+
+def test_booleans_and_dates():
+    assert rows(FRAME, "true", ["active"]) == [0, 3]
+    assert rows(FRAME, "1982-05-06") == [1]
+
+
+def test_nested_columns_match_their_text():
+    assert rows(FRAME, "admin") == [0]
+
+
+def test_no_comparable_column():
+    assert rows(FRAME, "abc", ["age", "score"]) == []
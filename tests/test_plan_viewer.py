@@ -0,0 +1,67 @@
+import pytest
+
+from plan_viewer import plan_stats
+
+
+def test_plan_stats_costs():
+    plan = {
+        "Node Type": "Hash Join",
+        "Total Cost": 100.0,
+        "Plans": [
+            {"Node Type": "Seq Scan", "Total Cost": 30.0},
+            {
+                "Node Type": "Hash",
+                "Total Cost": 50.0,
+                "Plans": [{"Node Type": "Seq Scan", "Total Cost": 45.0}],
+            },
+        ],
+    }
+    stats = plan_stats(plan, analyzed=False)
+    assert [s.self_cost for s in stats.walk()] == [20.0, 30.0, 5.0, 45.0]
+    assert all(s.estimate_ratio is None for s in stats.walk())
+
+
+def test_plan_stats_analyzed_times_and_estimates():
+    plan = {
+        "Node Type": "Nested Loop",
+        "Actual Total Time": 10.0,
+        "Actual Loops": 1,
+        "Actual Rows": 100,
+        "Plan Rows": 10,
+        "Plans": [
+            {
+                "Node Type": "Index Scan",
+                "Actual Total Time": 0.5,
+                "Actual Loops": 10,
+                "Actual Rows": 0,
+                "Plan Rows": 1,
+            },
+        ],
+    }
+    stats = plan_stats(plan, analyzed=True)
+    assert stats.self_cost == pytest.approx(5.0)
+    assert stats.estimate_ratio == pytest.approx(10.0)
+    child = stats.children[0]
+    assert child.self_cost == pytest.approx(5.0)
+    assert child.estimate_ratio == pytest.approx(0.1)
+
+
+def test_plan_stats_never_negative():
+    # Parallel children can report more time than their parent
+    plan = {
+        "Node Type": "Gather",
+        "Actual Total Time": 1.0,
+        "Actual Loops": 1,
+        "Plans": [
+            {"Node Type": "Seq Scan", "Actual Total Time": 1.0, "Actual Loops": 3}
+        ],
+    }
+    stats = plan_stats(plan, analyzed=True)
+    assert stats.self_cost == 0.0
+    # Without rows the estimate is compared against at least one
+    assert stats.estimate_ratio == 1.0
+
+
+def test_plan_stats_not_run():
+    plan = {"Node Type": "Seq Scan", "Actual Loops": 0, "Plan Rows": 50}
+    assert plan_stats(plan, analyzed=True).estimate_ratio is None
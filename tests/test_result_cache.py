@@ -0,0 +1,77 @@
+import polars as pl
+import pytest
+
+import result_cache
+from result_cache import FrameCache, ModificationTracker
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache.time, "monotonic", clock)
+    return clock
+
+
+def frame(rows: int = 10) -> pl.DataFrame:
+    return pl.DataFrame({"id": range(rows)})
+
+
+def test_entries_expire(clock):
+    cache = FrameCache(ttl=60)
+    cache.put("q", frame())
+    clock.now += 60
+    assert cache.get("q") is not None
+    clock.now += 1
+    assert cache.get("q") is None
+    assert "q" not in cache
+
+
+def test_least_recently_used_evicted(clock):
+    size = frame().estimated_size()
+    cache = FrameCache(max_bytes=2 * size)
+    cache.put("a", frame())
+    cache.put("b", frame())
+    cache.get("a")
+    cache.put("c", frame())
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_frames_bigger_than_the_cache_are_skipped(clock):
+    cache = FrameCache(max_bytes=frame().estimated_size())
+    cache.put("small", frame())
+    cache.put("big", frame(1000))
+    assert "small" in cache
+    assert "big" not in cache
+
+
+def test_invalidation(clock):
+    cache = FrameCache()
+    cache.put("a", frame(), [("db", "a")])
+    cache.put("ab", frame(), [("db", "a"), ("db", "b")])
+    cache.put("b", frame(), [("db", "b")])
+    cache.put("other", frame(), [("other", "a")])
+    cache.invalidate_tables("db", ["a"])
+    assert [k for k in ("a", "ab", "b", "other") if k in cache] == ["b", "other"]
+    cache.invalidate_database("db")
+    assert "b" not in cache
+    assert "other" in cache
+
+
+def test_modification_tracker():
+    tracker = ModificationTracker()
+    assert not tracker.tracks("db", ["a"])
+    assert tracker.changed_tables("db", {"a": (1, 0), "b": (0, 0)}) == []
+    assert tracker.tracks("db", ["a", "b"])
+    assert not tracker.tracks("db", ["a", "pg_class"])
+    changed = tracker.changed_tables("db", {"a": (2, 0), "c": (0, 0)})
+    assert sorted(changed) == ["a", "b", "c"]
@@ -0,0 +1,57 @@
+import pytest
+
+from sql_completion import PrefixIndex, SchemaIndex, changed_tables
+
+
+def test_prefix_index_is_case_insensitive():
+    index = PrefixIndex(["users", "User_Roles", "orders", "USERS"])
+    assert len(index) == 3
+    assert index.starting_with("us") == ["User_Roles", "USERS"]
+    assert index.starting_with("USER_") == ["User_Roles"]
+    assert index.starting_with("x") == []
+
+
+def test_prefix_index_limit():
+    index = PrefixIndex(f"t{i:02}" for i in range(20))
+    assert index.starting_with("t", limit=3) == ["t00", "t01", "t02"]
+
+
+def test_prefix_index_add_and_discard():
+    index = PrefixIndex(["b"])
+    index.add("a")
+    index.add("c")
+    index.add("A")
+    assert list(index) == ["a", "b", "c"]
+    index.discard("B")
+    index.discard("missing")
+    assert list(index) == ["a", "c"]
+
+
+@pytest.mark.parametrize(
+    "statement, tables",
+    [
+        ("alter table foo add column x int", {"foo"}),
+        ("alter table foo rename column a to b", {"foo"}),
+        ("create temporary table foo (id int)", {"foo"}),
+        ('create table "Foo" (id int)', {"Foo"}),
+        ("drop table foo", {"foo"}),
+        # The new name isn't seen, nor are the rest of a list of tables
+        ("alter table foo rename to bar", None),
+        ("ALTER TABLE foo RENAME\n TO bar", None),
+        ("drop table a, b", None),
+        ("create view v as select 1", None),
+        ("create function f() returns int as 'select 1' language sql", None),
+    ],
+)
+def test_changed_tables(statement, tables):
+    assert changed_tables(statement) == tables
+
+
+def test_schema_index_set_and_remove_table():
+    index = SchemaIndex({"a": ["id", "name"], "b": ["id"]}, [])
+    index.set_table("b", ["id", "total"])
+    assert index.all_columns.starting_with("t") == ["total"]
+    index.remove_table("a")
+    # id is still a column of b
+    assert list(index.all_columns) == ["id", "total"]
+    assert index.tables.starting_with("") == ["b"]
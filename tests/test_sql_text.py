@@ -0,0 +1,132 @@
+import pytest
+
+from sql_text import (
+    calls_volatile_function,
+    fingerprint,
+    is_query,
+    is_read_only,
+    normalize_sql,
+    referenced_tables,
+    split_statements,
+)
+
+
+@pytest.mark.parametrize(
+    "query, tables",
+    [
+        ("select * from a", {"a"}),
+        ("select * from a, b", {"a", "b"}),
+        ("select * from public.a x, b as y where x.id = y.id", {"a", "b"}),
+        ("select * from a join b on a.id = b.id, c", {"a", "b", "c"}),
+        ("select * from a left join b using (id) order by 1", {"a", "b"}),
+        ('select * from "Mixed"', {"Mixed"}),
+        ("select * from a where id in (select id from b, c)", {"a", "b", "c"}),
+        ("select extract(year from created) from a", {"a"}),
+        ("select * from a where x is distinct from y", {"a"}),
+        ("update a set x = 1 from b, c where b.id = a.id", {"a", "b", "c"}),
+        ("select 1", set()),
+    ],
+)
+def test_referenced_tables(query, tables):
+    assert referenced_tables(query) == tables
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "select * from (a cross join b)",
+        "select * from (select * from a) s, b",
+        "select * from a, lateral (select * from b where b.id = a.id) l",
+        "select * from generate_series(1, 10)",
+        "select * from",
+    ],
+)
+def test_referenced_tables_unknown_from_list(query):
+    assert referenced_tables(query) is None
+
+
+def test_split_statements():
+    script = """
+        insert into t values (E'it\\'s; here', 'a''b;c');
+        create function f() returns int as $$ select 1; $$ language sql;
+        do $body$ begin perform 1; end $body$;
+        select ";" from "a;b" -- trailing; comment
+    """
+    assert split_statements(script) == [
+        "insert into t values (E'it\\'s; here', 'a''b;c')",
+        "create function f() returns int as $$ select 1; $$ language sql",
+        "do $body$ begin perform 1; end $body$",
+        'select ";" from "a;b" -- trailing; comment',
+    ]
+
+
+def test_split_statements_drops_comment_only_pieces():
+    assert split_statements("select 1; -- done;\n/* ; */ ;") == ["select 1"]
+
+
+def test_split_statements_plain_string_backslash():
+    # Outside E'' strings a backslash is an ordinary character
+    assert split_statements(r"select 'a\'; select 2") == [
+        r"select 'a\'",
+        "select 2",
+    ]
+
+
+def test_fingerprint_groups_constants():
+    assert fingerprint(
+        "SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x' -- c"
+    ) == fingerprint("select *  from t where id in (4) and name = $1")
+
+
+def test_normalize_sql_keeps_literals_and_quoted_names():
+    assert normalize_sql("SELECT  'A'\n FROM \"T\" ;") == "select 'A' from \"T\""
+
+
+@pytest.mark.parametrize(
+    "query, read_only",
+    [
+        ("select * from t", True),
+        ("  -- comment\n(select 1)", True),
+        ("with x as (select 1) select * from x", True),
+        ("with x as (delete from t returning *) select * from x", False),
+        ("select * into t2 from t", False),
+        ("explain select 1", True),
+        ("explain analyze select 1", False),
+        ("update t set x = 1", False),
+        ("select 'insert'", True),
+        ("", False),
+    ],
+)
+def test_is_read_only(query, read_only):
+    assert is_read_only(query) is read_only
+
+
+@pytest.mark.parametrize(
+    "query, volatile",
+    [
+        ("select now()", True),
+        ("select current_timestamp", True),
+        ("select * from t order by random()", True),
+        ("select pg_backend_pid()", True),
+        ("select lower(name) from t", False),
+        ("select 'now()'", False),
+    ],
+)
+def test_calls_volatile_function(query, volatile):
+    assert calls_volatile_function(query) is volatile
+
+
+@pytest.mark.parametrize(
+    "query, query_like",
+    [
+        ("select 1", True),
+        ("-- c\n(select 1);", True),
+        ("table t", True),
+        ("select 1; select 2", False),
+        ("set search_path to x; select 1", False),
+        ("show work_mem", False),
+        ("insert into t values (1) returning id", False),
+    ],
+)
+def test_is_query(query, query_like):
+    assert is_query(query) is query_like
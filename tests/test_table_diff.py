@@ -0,0 +1,71 @@
+import pytest
+
+from database_manager.diff import quote_table, row_hash_query, source_expression
+from table_diff import MAX_REPORTED_KEYS, TableDiff, _compare_rows
+
+
+def compare(left, right) -> TableDiff:
+    diff = TableDiff()
+    _compare_rows(diff, iter(left), iter(right))
+    return diff
+
+
+def test_compare_rows():
+    left = [("01", "k1", "a"), ("02", "k2", "b"), ("04", "k4", "d")]
+    right = [("02", "k2", "B"), ("03", "k3", "c"), ("04", "k4", "d"), ("05", "k5", "e")]
+    diff = compare(left, right)
+    assert (diff.added, diff.removed, diff.changed) == (2, 1, 1)
+    assert diff.keys == [
+        ("Removed", "k1"),
+        ("Changed", "k2"),
+        ("Added", "k3"),
+        ("Added", "k5"),
+    ]
+
+
+def test_compare_rows_with_equal_key_hashes():
+    # Keys whose md5 prefixes collide are told apart by the key itself
+    left = [("aa", "k1", "x"), ("aa", "k3", "z")]
+    right = [("aa", "k2", "y"), ("aa", "k3", "z")]
+    diff = compare(left, right)
+    assert diff.keys == [("Removed", "k1"), ("Added", "k2")]
+
+
+def test_compare_rows_one_side_empty():
+    rows = [(f"{i:02}", f"k{i}", "r") for i in range(3)]
+    assert compare(rows, []).removed == 3
+    assert compare([], rows).added == 3
+    assert compare(rows, rows).keys == []
+
+
+def test_reported_keys_are_capped():
+    rows = [(f"{i:08}", f"k{i}", "r") for i in range(MAX_REPORTED_KEYS + 5)]
+    diff = compare([], rows)
+    assert diff.added == MAX_REPORTED_KEYS + 5
+    assert len(diff.keys) == MAX_REPORTED_KEYS
+    assert diff.truncated
+
+
+@pytest.mark.parametrize(
+    "name, quoted",
+    [
+        ("orders", '"orders"'),
+        ("Sales.Orders", '"Sales"."Orders"'),
+        ('public."Odd.Name"', '"public"."Odd.Name"'),
+        ('we"ird', '"we""ird"'),
+    ],
+)
+def test_quote_table(name, quoted):
+    assert quote_table(name) == quoted
+
+
+def test_row_hash_query_groups_prefixes_by_length():
+    query, params = row_hash_query("t AS t", ["id"], ["ab", "cd", "abcd"])
+    assert params == (["ab", "cd"], ["abcd"])
+    assert query.count("= ANY(%s)") == 2
+    assert 'left(md5(ROW(t."id")::text), 2)' in query
+    assert 'left(md5(ROW(t."id")::text), 4)' in query
+
+
+def test_source_expression_escapes_query_parameters():
+    assert source_expression(query="select '5%';") == "(select '5%%') AS t"